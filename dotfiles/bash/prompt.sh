@@ -0,0 +1,96 @@
+######################################################################
+#
+#   Prompt helper: git branch for the prompt without spawning processes.
+#
+#   The branch is read straight from .git/HEAD (no git, no awk) and
+#   cached per repository. A cached branch is reused until .git/HEAD
+#   is no longer older than the stamp file written at the last read.
+#   Only bash builtins run per prompt, which matters most on Git Bash
+#   for Windows where every fork is expensive.
+#
+#   Sets SAMPONG_GIT_BRANCH on every prompt via PROMPT_COMMAND, e.g.
+#   PS1='${SAMPONG_GIT_BRANCH:+($SAMPONG_GIT_BRANCH)} \W \$ '
+#
+######################################################################
+
+declare -gA __sampong_git_dirs=()       # directory -> git dir
+declare -gA __sampong_git_branches=()   # git dir -> branch
+__sampong_stamp_prefix="${TMPDIR:-/tmp}/.sampong_prompt_$$_"
+
+# Find the git dir for $PWD (sets REPLY). Positive results are cached
+# per directory; misses walk up again so a later `git init` is seen.
+function __sampong_find_git_dir() {
+    local dir=$PWD line
+    REPLY=${__sampong_git_dirs[$PWD]}
+    if [[ -n $REPLY && -f $REPLY/HEAD ]]; then
+        return 0
+    fi
+
+    while :; do
+        if [[ -d $dir/.git ]]; then
+            REPLY=$dir/.git
+            break
+        elif [[ -f $dir/.git ]]; then
+            # Worktrees and submodules: ".git" file with "gitdir: <path>"
+            read -r line < "$dir/.git"
+            line=${line#gitdir: }
+            [[ $line == /* ]] || line=$dir/$line
+            REPLY=$line
+            break
+        fi
+        if [[ -z $dir ]]; then
+            REPLY=
+            return 1
+        fi
+        dir=${dir%/*}
+    done
+
+    __sampong_git_dirs[$PWD]=$REPLY
+    return 0
+}
+
+# PROMPT_COMMAND hook: set SAMPONG_GIT_BRANCH for the current directory.
+function __sampong_git_branch() {
+    local git_dir head_line stamp
+    SAMPONG_GIT_BRANCH=
+    __sampong_find_git_dir || return 0
+    git_dir=$REPLY
+
+    stamp=$__sampong_stamp_prefix${git_dir//[^[:alnum:]]/_}
+    if [[ -n ${__sampong_git_branches[$git_dir]+x} && $stamp -nt $git_dir/HEAD ]]; then
+        SAMPONG_GIT_BRANCH=${__sampong_git_branches[$git_dir]}
+        return 0
+    fi
+
+    read -r head_line < "$git_dir/HEAD" 2> /dev/null || return 0
+    if [[ $head_line == "ref: refs/heads/"* ]]; then
+        SAMPONG_GIT_BRANCH=${head_line#ref: refs/heads/}
+    else
+        SAMPONG_GIT_BRANCH=${head_line:0:7}   # detached HEAD: short hash
+    fi
+    __sampong_git_branches[$git_dir]=$SAMPONG_GIT_BRANCH
+    : > "$stamp"
+}
+
+if [[ ";${PROMPT_COMMAND[*]};" != *";__sampong_git_branch;"* ]]; then
+    PROMPT_COMMAND="__sampong_git_branch${PROMPT_COMMAND:+;$PROMPT_COMMAND}"
+fi
+
+# Remove this shell's stamps on exit, after any EXIT trap already set
+function __sampong_prompt_cleanup() {
+    rm -f "$__sampong_stamp_prefix"*
+}
+
+function __sampong_chain_exit_trap() {
+    local previous
+    previous=$(trap -p EXIT)
+    [[ $previous == *__sampong_prompt_cleanup* ]] && return 0
+    if [[ -n $previous ]]; then
+        eval "set -- $previous"   # trap -- '<command>' EXIT
+        trap "$3"$'\n'__sampong_prompt_cleanup EXIT
+    else
+        trap __sampong_prompt_cleanup EXIT
+    fi
+}
+__sampong_chain_exit_trap
+unset -f __sampong_chain_exit_trap
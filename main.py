@@ -2,9 +2,23 @@ import sys
 import argparse
 
 def main():
+    # Deploy flags are accepted both before and after a subcommand
+    deploy_flags = argparse.ArgumentParser(add_help=False)
+    deploy_flags.add_argument(
+        "--link",
+        action="store_true",
+        help="Deploy dotfiles as symlinks (falls back to hardlink/copy)"
+    )
+    deploy_flags.add_argument(
+        "--hardlink",
+        action="store_true",
+        help="Deploy dotfiles as hardlinks (falls back to copy)"
+    )
+
     parser = argparse.ArgumentParser(
         description="Dev Environment Setup Tool",
-        epilog="Default: Runs GUI. Use --cli for command-line mode."
+        epilog="Default: Runs GUI. Use --cli for command-line mode.",
+        parents=[deploy_flags],
     )
     parser.add_argument(
         "--cli",
@@ -16,6 +30,307 @@ def main():
         action="store_true",
         help="Show CLI-specific help"
     )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Install selected apps with one winget import instead of one by one"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted 'run all steps', skipping completed steps"
+    )
+    parser.add_argument(
+        "--install-timeout",
+        type=float,
+        metavar="MINUTES",
+        help="Stop an app install that runs longer than this (default: 60)"
+    )
+    parser.add_argument(
+        "--stall-timeout",
+        type=float,
+        metavar="MINUTES",
+        help="Stop an installer that prints nothing for this long (default: 10)"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        metavar="PATH",
+        help="Keep downloaded installers in this directory or network share and reuse them"
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        metavar="GB",
+        help="Evict least recently used installers above this total (default: 20)"
+    )
+    parser.add_argument(
+        "--max-bandwidth",
+        type=float,
+        metavar="MBIT",
+        help="Cap every download the tool makes, in megabits per second"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        metavar="N",
+        help="Install up to N apps at once (default: 1)"
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Vary concurrency between 1 and --concurrency with throughput and load"
+    )
+    parser.add_argument(
+        "--mirror",
+        action="append",
+        metavar="URL",
+        help="Catalog/dotfile mirror raced against GitHub, e.g. a 'serve' host (repeatable)"
+    )
+    parser.add_argument(
+        "--catalog",
+        action="append",
+        metavar="PATH_OR_URL",
+        help="Overlay that adds, overrides or removes apps over apps.json (repeatable, in order)"
+    )
+
+    commands = parser.add_subparsers(dest="command")
+
+    watch_parser = commands.add_parser(
+        "watch",
+        parents=[deploy_flags],
+        help="Redeploy dotfiles as soon as they change in dotfiles/"
+    )
+    watch_parser.add_argument(
+        "--debounce",
+        type=float,
+        default=0.03,
+        help="Quiet period in seconds before redeploying (default: 0.03)"
+    )
+    watch_parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Force mtime polling instead of inotify"
+    )
+
+    bench_parser = commands.add_parser(
+        "bench-shells",
+        help="Measure startup time of shells with the deployed profiles"
+    )
+    bench_parser.add_argument(
+        "-n", "--runs",
+        type=int,
+        default=10,
+        help="Timed runs per shell (default: 10)"
+    )
+    bench_parser.add_argument(
+        "--shell",
+        action="append",
+        choices=["bash", "pwsh", "nu"],
+        help="Only benchmark this shell (repeatable)"
+    )
+    bench_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=50.0,
+        help="Median slowdown in ms vs baseline that counts as a regression"
+    )
+    bench_parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store this run as the new baseline"
+    )
+    bench_parser.add_argument(
+        "--breakdown",
+        action="store_true",
+        help="Show per-line startup cost (bash only)"
+    )
+    bench_parser.add_argument(
+        "--prompt",
+        action="store_true",
+        help="Time bash prompt rendering with and without the branch cache"
+    )
+
+    plan_parser = commands.add_parser(
+        "plan",
+        help="Dry run: show versions, sizes and estimated time, install nothing"
+    )
+    plan_parser.add_argument(
+        "--app",
+        action="append",
+        metavar="ID",
+        help="Only plan this winget id (repeatable; default: whole catalog)"
+    )
+    plan_parser.add_argument(
+        "--section",
+        action="append",
+        metavar="NAME",
+        help="Only plan apps in this apps.json section (repeatable)"
+    )
+    plan_parser.add_argument(
+        "--ttl",
+        type=float,
+        default=24.0,
+        help="Hours before cached winget metadata is refetched (default: 24)"
+    )
+    plan_parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Refetch metadata for every selected app"
+    )
+    plan_parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Use cached metadata only, never call winget show"
+    )
+    plan_parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Concurrent winget show lookups (default: 8)"
+    )
+
+    bench_install_parser = commands.add_parser(
+        "bench-install",
+        help="Compare per-app winget install against one batch winget import"
+    )
+    bench_install_parser.add_argument(
+        "--app",
+        action="append",
+        metavar="ID",
+        help="Benchmark with this (already installed) winget id (repeatable)"
+    )
+    bench_install_parser.add_argument(
+        "-n", "--runs",
+        type=int,
+        default=1,
+        help="Timed runs per mode (default: 1)"
+    )
+
+    serve_parser = commands.add_parser(
+        "serve",
+        help="Serve json/ and dotfiles/ over HTTP as a LAN mirror"
+    )
+    serve_parser.add_argument(
+        "--host",
+        default="0.0.0.0",
+        help="Address to listen on (default: all interfaces)"
+    )
+    serve_parser.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="Port to listen on (default: 8000)"
+    )
+
+    manifest_parser = commands.add_parser(
+        "manifest",
+        help="Regenerate json/manifest.json after editing the catalogs"
+    )
+    manifest_parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit with status 1 if the manifest is out of date instead of writing it"
+    )
+
+    link_parser = commands.add_parser(
+        "bench-link",
+        help="Check bandwidth shaping and adaptive concurrency on a simulated link"
+    )
+    link_parser.add_argument(
+        "--rate",
+        type=float,
+        default=20.0,
+        metavar="MBIT",
+        help="Simulated link speed in megabits per second (default: 20)"
+    )
+    link_parser.add_argument(
+        "--seconds",
+        type=float,
+        default=4.0,
+        help="Length of the shaped download test (default: 4)"
+    )
+    link_parser.add_argument(
+        "--knee",
+        type=int,
+        default=3,
+        help="Installs that fill the simulated link (default: 3)"
+    )
+
+    download_parser = commands.add_parser(
+        "bench-download",
+        help="Check ranged downloads: throughput, resume and SHA-256, on a local server"
+    )
+    download_parser.add_argument(
+        "--size",
+        type=float,
+        default=64.0,
+        metavar="MB",
+        help="Size of the test payload in megabytes (default: 64)"
+    )
+    download_parser.add_argument(
+        "--connections",
+        type=int,
+        default=4,
+        help="Parallel range requests (default: 4)"
+    )
+
+    search_parser = commands.add_parser(
+        "search",
+        help="Search the winget repository offline, e.g. to find ids for apps.json"
+    )
+    search_parser.add_argument(
+        "query",
+        nargs="*",
+        help="Words to look for in package ids, names, monikers and tags"
+    )
+    search_parser.add_argument(
+        "-n", "--limit",
+        type=int,
+        default=10,
+        help="Results to show (default: 10)"
+    )
+    search_parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Check the winget source for changes now instead of once a day"
+    )
+    search_parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Use the local index as it is, without checking the source"
+    )
+    search_parser.add_argument(
+        "--source",
+        metavar="PATH",
+        help="Index this source.msix or index.db instead of downloading it"
+    )
+    search_parser.add_argument(
+        "--add-to",
+        metavar="SECTION",
+        help="Append the picked result(s) to this catalog section"
+    )
+    search_parser.add_argument(
+        "--pick",
+        type=int,
+        action="append",
+        metavar="N",
+        help="Result number to add with --add-to (repeatable, default: 1)"
+    )
+    search_parser.add_argument(
+        "--file",
+        metavar="PATH",
+        help="Catalog or overlay file --add-to edits (default: json/apps.json)"
+    )
+
+    lint_parser = commands.add_parser(
+        "lint-dotfiles",
+        help="Report dotfile constructs that slow down shell start or prompt"
+    )
+    lint_parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Exit with status 1 if anything is reported"
+    )
 
     args = parser.parse_args()
 
@@ -24,6 +339,37 @@ def main():
         show_cli_help()
         return
 
+    if args.command == "watch":
+        run_watch(args)
+        return
+
+    if args.command == "bench-shells":
+        sys.exit(run_bench_shells(args))
+
+    if args.command == "bench-install":
+        sys.exit(run_bench_install(args))
+
+    if args.command == "serve":
+        run_serve(args)
+        return
+
+    if args.command == "manifest":
+        sys.exit(run_manifest(args))
+
+    if args.command == "bench-link":
+        sys.exit(run_bench_link(args))
+
+    if args.command == "bench-download":
+        sys.exit(run_bench_download(args))
+    if args.command == "plan":
+        sys.exit(run_plan(args))
+
+    if args.command == "lint-dotfiles":
+        sys.exit(run_lint_dotfiles(args))
+
+    if args.command == "search":
+        sys.exit(run_search(args))
+
     # Run in CLI mode
     if args.cli:
         run_cli()
@@ -57,15 +403,138 @@ def run_cli():
     cli_main()
 
 
+def run_watch(args):
+    """Watch dotfiles/ and redeploy changed files incrementally."""
+    from python.watch import watch
+    watch(debounce=args.debounce, polling=args.poll)
+
+
+def run_serve(args):
+    """Serve the catalog and dotfiles as a mirror for other machines."""
+    from python.serve import serve
+    serve(host=args.host, port=args.port)
+
+
+def run_manifest(args) -> int:
+    """Write (or --check) the catalog version manifest."""
+    from python.manifest import write_manifest
+    return 0 if write_manifest(check=args.check) else 1
+
+
+def run_bench_shells(args) -> int:
+    """Benchmark shell startup; exit code 1 on regression."""
+    from python.bench import bench_prompt, bench_shells
+    if args.runs < 1:
+        print("[ERROR] -n/--runs must be at least 1")
+        return 1
+    if args.prompt:
+        return 0 if bench_prompt(renders=args.runs * 10) else 1
+    outcome = bench_shells(
+        shells=args.shell,
+        runs=args.runs,
+        threshold_ms=args.threshold,
+        save_baseline=args.save_baseline,
+        breakdown=args.breakdown,
+    )
+    return 1 if outcome["regressions"] else 0
+
+
+def run_bench_install(args) -> int:
+    """Per-app install loop vs one winget import, on installed apps only."""
+    from python.apps import load_apps
+    from python.bench import bench_install
+    from python.metadata import select_apps
+    apps = select_apps(load_apps(), ids=args.app)
+    return 0 if bench_install(apps, runs=args.runs) else 1
+
+
+def run_bench_link(args) -> int:
+    """Shaping and concurrency control on a simulated link; 1 if either fails."""
+    from python.bench import bench_link
+    outcome = bench_link(rate_mbit=args.rate, seconds=args.seconds, knee=args.knee,
+                         maximum=max(args.concurrency or 0, args.knee + 4))
+    return 0 if outcome["shaping_ok"] and outcome["control_ok"] else 1
+
+
+def run_bench_download(args) -> int:
+    """Clean, interrupted and resumed downloads from a local server; 1 on failure."""
+    from python.bench import bench_download
+    if args.size <= 0 or args.connections < 1:
+        print("[ERROR] --size must be positive and --connections at least 1")
+        return 1
+    return 0 if bench_download(size_mb=args.size, connections=args.connections)["ok"] else 1
+
+
+def run_plan(args) -> int:
+    """Dry-run plan of an install; exit code 1 if nothing matched."""
+    from python.apps import load_apps
+    from python.metadata import select_apps
+    from python.planner import dry_run
+    apps = select_apps(load_apps(), ids=args.app, sections=args.section)
+    if not apps:
+        print("[ERROR] No apps match the given --app/--section")
+        return 1
+    dry_run(apps, ttl=args.ttl * 3600, refresh=args.refresh,
+            offline=args.offline, workers=args.workers)
+    return 0
+
+
+def run_lint_dotfiles(args) -> int:
+    """Static startup-cost analysis of dotfiles/."""
+    from python.startup_lint import lint_tree, print_findings
+    findings = lint_tree()
+    print_findings(findings)
+    if not findings:
+        print("[OK] No startup-cost findings")
+    return 1 if findings and args.strict else 0
+
+
+def run_search(args) -> int:
+    """Offline winget package search; exit code 1 if it could not run."""
+    from python.search import run_search as search
+    options = {"catalog": args.file} if args.file else {}
+    ok = search(" ".join(args.query), limit=args.limit, source=args.source,
+                refresh_now=args.refresh, offline=args.offline,
+                add_to=args.add_to, picks=args.pick, **options)
+    return 0 if ok else 1
+
+
 def show_cli_help():
     """Show CLI-specific help."""
     print("=" * 60)
     print("    DEV ENVIRONMENT SETUP - CLI MODE")
     print("=" * 60)
-    print("\nUsage: python main.py [--cli] [--help-cli]")
+    print("\nUsage: python main.py [--cli] [--help-cli] [--link | --hardlink] [--batch]")
+    print("                      [--resume] [--install-timeout MINUTES] [--stall-timeout MINUTES]")
+    print("                      [--cache-dir PATH] [--cache-size GB]")
+    print("                      [--max-bandwidth MBIT] [--concurrency N] [--adaptive]")
+    print("                      [--mirror URL ...] [--catalog PATH_OR_URL ...]")
+    print("       python main.py watch [--debounce SECONDS] [--poll]")
+    print("       python main.py serve [--host ADDRESS] [--port PORT]")
+    print("       python main.py bench-shells [-n RUNS] [--shell NAME] [--save-baseline] [--prompt]")
+    print("       python main.py plan [--app ID] [--section NAME] [--offline] [--refresh]")
+    print("       python main.py bench-link [--rate MBIT] [--seconds S] [--knee N]")
+    print("       python main.py bench-download [--size MB] [--connections N]")
+    print("       python main.py manifest [--check]")
+    print("       python main.py lint-dotfiles [--strict]")
+    print("       python main.py search QUERY [-n N] [--refresh | --offline] [--source PATH]")
+    print("                             [--add-to SECTION [--pick N ...] [--file PATH]]")
     print("\nOptions:")
     print("  --cli           Force CLI mode (no GUI)")
     print("  --help-cli      Show this help message")
+    print("  --link          Deploy dotfiles as symlinks instead of copies")
+    print("  --hardlink      Deploy dotfiles as hardlinks instead of copies")
+    print("  --batch         Install apps with one winget import (no per-app loop)")
+    print("  --resume        Continue an interrupted 'run all steps' where it stopped")
+    print("  --install-timeout MINUTES  Kill an app install running longer (default 60)")
+    print("  --stall-timeout MINUTES    Kill an installer silent this long (default 10)")
+    print("  --cache-dir PATH           Reuse installers cached here (local or share)")
+    print("  --cache-size GB            Cache size before old installers go (default 20)")
+    print("  --max-bandwidth MBIT       Cap all downloads the tool makes (Mbit/s)")
+    print("  --concurrency N            Install up to N apps at once (default 1)")
+    print("  --adaptive                 Let throughput and load pick 1..N")
+    print("  --mirror URL               Also fetch catalog/dotfiles here; fastest wins")
+    print("  --catalog PATH_OR_URL      Org/team app overlay applied over apps.json")
     print("  -h, --help      Show general help")
     print("\nDefault Behavior:")
     print("  - Runs GUI if available")
@@ -73,6 +542,21 @@ def show_cli_help():
     print("\nExamples:")
     print("  python main.py              # Run GUI (default)")
     print("  python main.py --cli        # Force CLI mode")
+    print("  python main.py --cli --link # Link dotfiles, edits are live")
+    print("  python main.py --cli --resume # Finish a run that was interrupted")
+    print("  python main.py --cli --cache-dir \\\\nas\\installers # Share downloads")
+    print("  python main.py watch        # Redeploy dotfiles on save")
+    print("  python main.py serve        # Mirror catalog/dotfiles for the LAN")
+    print("  python main.py manifest     # Republish catalog hashes after editing json/")
+    print("  python main.py bench-shells # Measure shell startup latency")
+    print("  python main.py bench-shells --prompt # Per-prompt git branch cost")
+    print("  python main.py plan --section Browsers # Sizes and time, no install")
+    print("  python main.py bench-install # Per-app loop vs batch import overhead")
+    print("  python main.py bench-link   # Verify bandwidth cap and adaptive concurrency")
+    print("  python main.py bench-download # Download throughput, resume and checksum")
+    print("  python main.py lint-dotfiles # Find slow startup/prompt code")
+    print("  python main.py search chromium # Find winget ids offline")
+    print("  python main.py search vivaldi --add-to Browsers # ...and add the top one")
     print("\nFeatures:")
     print("  ✓ Interactive menu system")
     print("  ✓ App selection with checkboxes")
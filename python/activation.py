@@ -0,0 +1,166 @@
+"""
+Pre-rendered shell activation scripts.
+
+main.sh and posh_profile.ps1 used to run `oh-my-posh init`, `ng completion
+script` and `vfox activate` on every shell start, spawning one process per
+tool per terminal. We run those generators once at deploy time and store
+their output under DOTFILE_ROOT/cache, which the profiles source directly.
+
+A cache is regenerated when any tool's binary (path, size, mtime) or
+reported version changes, or when the generator command line changes.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+from typing import Any, Dict, List, Optional
+
+from .config import DOTFILE_ROOT
+from .rcfile import atomic_write_text
+
+CACHE_DIR = os.path.join(DOTFILE_ROOT, "cache")
+FINGERPRINT_FILE = os.path.join(CACHE_DIR, "activate.json")
+
+
+def _posh_themes_dir() -> str:
+    """Oh-My-Posh themes folder, as the profiles resolve it."""
+    return os.getenv("POSH_THEMES_PATH") or os.path.join(
+        os.getenv("LOCALAPPDATA") or os.path.expanduser("~"),
+        "Programs", "oh-my-posh", "themes",
+    )
+
+
+# Generators per shell, in the order the profiles used to run them.
+# "version" is the argument list that prints the tool version, or None
+# when asking is too slow (ng boots the whole Angular CLI) and the
+# binary's mtime is the only signal.
+GENERATORS: Dict[str, Dict[str, Any]] = {
+    "bash": {
+        "file": "activate.bash",
+        "steps": [
+            {
+                "tool": "oh-my-posh",
+                "args": ["init", "bash", "--print", "--config",
+                         os.path.join(_posh_themes_dir(), "darkblood.omp.json")],
+                "version": ["--version"],
+            },
+            {
+                "tool": "ng",
+                "args": ["completion", "script"],
+                "version": None,
+            },
+            {
+                "tool": "vfox",
+                "args": ["activate", "bash"],
+                "version": ["--version"],
+            },
+        ],
+    },
+    "pwsh": {
+        "file": "activate.ps1",
+        "steps": [
+            {
+                "tool": "oh-my-posh",
+                "args": ["init", "pwsh", "--print", "--config",
+                         os.path.join(_posh_themes_dir(), "kali.omp.json")],
+                "version": ["--version"],
+            },
+            {
+                "tool": "vfox",
+                "args": ["activate", "pwsh"],
+                "version": ["--version"],
+            },
+        ],
+    },
+}
+
+
+def cache_path(shell: str) -> str:
+    """Path of the cached activation script for `shell` ("bash"/"pwsh")."""
+    return os.path.join(CACHE_DIR, GENERATORS[shell]["file"])
+
+
+def _run(cmd: List[str], timeout: int = 60) -> Optional[str]:
+    try:
+        result = subprocess.run(
+            cmd, capture_output=True, text=True, timeout=timeout, check=True
+        )
+        return result.stdout
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"[WARN] {' '.join(cmd[:3])} failed: {e}")
+        return None
+
+
+def tool_fingerprint(step: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Identify the installed tool binary, or None if it is not installed."""
+    path = shutil.which(step["tool"])
+    if not path:
+        return None
+    st = os.stat(path)
+    version = None
+    if step.get("version"):
+        output = _run([path] + step["version"], timeout=15)
+        version = output.strip() if output else None
+    return {
+        "path": path,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "version": version,
+        "args": step["args"],
+    }
+
+
+def _load_fingerprints() -> Dict[str, Any]:
+    try:
+        with open(FINGERPRINT_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def build_activation_cache(shell: str, force: bool = False) -> Optional[str]:
+    """
+    (Re)generate the cached activation script for `shell` if stale.
+
+    Returns the cache path, or None when no generator tool is installed
+    (the profile then falls back to live activation).
+    """
+    spec = GENERATORS[shell]
+    target = cache_path(shell)
+
+    fingerprints = {
+        step["tool"]: tool_fingerprint(step) for step in spec["steps"]
+    }
+    if not any(fingerprints.values()):
+        print(f"[SKIP] No activation tools found for {shell}")
+        return None
+
+    stored = _load_fingerprints()
+    if not force and os.path.exists(target) and stored.get(shell) == fingerprints:
+        print(f"[SKIP] Activation cache up to date → {target}")
+        return target
+
+    parts = [
+        f"# Generated by Sampong_dotfile at deploy time for {shell}. Do not edit;",
+        "# rerun the shell configuration to refresh.",
+    ]
+    for step in spec["steps"]:
+        fp = fingerprints[step["tool"]]
+        if fp is None:
+            parts.append(f"# {step['tool']}: not installed, skipped")
+            continue
+        output = _run([fp["path"]] + step["args"])
+        if output is None:
+            # Leave it out of the fingerprint so the next deploy retries
+            fingerprints[step["tool"]] = None
+            parts.append(f"# {step['tool']}: generator failed, skipped")
+            continue
+        parts.append(f"# --- {step['tool']} {' '.join(step['args'][:2])} ---")
+        parts.append(output.rstrip("\n"))
+
+    atomic_write_text(target, "\n".join(parts) + "\n")
+    stored[shell] = fingerprints
+    atomic_write_text(FINGERPRINT_FILE, json.dumps(stored, indent=2))
+    print(f"[OK] Rendered {shell} activation cache → {target}")
+    return target
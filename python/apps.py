@@ -1,7 +1,12 @@
 from python.config import APPS_JSON_URL, fetch_json, APPS_JSON_LOCAL
+from python.layers import merged_sections
 
 
-def load_apps(online_mode = False):
+def load_apps(online_mode = False, layers = None):
+    """
+    The flat app catalog: apps.json with the catalog overlays applied
+    (--catalog and apps.user.json, or `layers`; see python/layers.py).
+    """
     sections = fetch_json(APPS_JSON_URL, APPS_JSON_LOCAL, online_mode)
 
     if isinstance(sections, dict):
@@ -14,8 +19,11 @@ def load_apps(online_mode = False):
     if not isinstance(sections, list):
         raise ValueError(f"apps.json must be a list, got: {type(sections)}")
 
+    sections = merged_sections(sections, layers)
+
     print(f"[DEBUG] Loaded {len(sections)} sections")
-    print("[DEBUG] First item:", sections[0])
+    if sections:
+        print("[DEBUG] First item:", sections[0])
 
     catalog = []
     for section in sections:
@@ -31,12 +39,14 @@ def load_apps(online_mode = False):
             }
         )
         for app in section["apps"]:
-            catalog.append(
-                {
-                    "section": section["section"],
-                    "name": app["name"],
-                    "id": app["id"],
-                    "is_section_toggle": False,
-                }
-            )
+            entry = {
+                "section": section["section"],
+                "name": app["name"],
+                "id": app["id"],
+                "is_section_toggle": False,
+            }
+            # Optional per-app install deadlines in minutes (python/engine.py)
+            if "deadlines" in app:
+                entry["deadlines"] = app["deadlines"]
+            catalog.append(entry)
     return catalog
\ No newline at end of file
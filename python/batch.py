@@ -0,0 +1,199 @@
+"""
+Batch install through a single `winget import`.
+
+Running `winget install` once per app pays process start, source checks
+and agreement handling N times. With --batch the selection is written to
+a winget import manifest (the `winget export` JSON format) and installed
+in one invocation. winget prints one block per package, starting with
+"Found <name> [<id>]"; a block containing one of winget's result lines
+(success, already installed, installer exit code...) is classified into
+the same [OK] / [FAILED] reporting install_apps uses, and every other
+block is settled by checking what is installed afterwards.
+
+The import streams through python/procio.py like a single install: its
+output shows as it arrives, and a Watchdog kills it when it exceeds the
+summed per-app deadlines or goes silent for longer than the longest
+per-app stall limit.
+"""
+
+import asyncio
+import json
+import os
+import re
+import subprocess
+import tempfile
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from python.engine import deadlines_for, parse_download_size
+from python.metadata import installed_ids
+from python.procio import ProcessTimeout, Watchdog, stream_process
+
+WINGET_SOURCE = {
+    "Argument": "https://cdn.winget.microsoft.com/cache",
+    "Identifier": "Microsoft.Winget.Source_8wekyb3d8bbwe",
+    "Name": "winget",
+    "Type": "Microsoft.PreIndexed.Package",
+}
+
+_FOUND_RE = re.compile(r"Found .*\[(?P<id>[^\]]+)\]")
+# Starts of winget's per-package result lines (lowercased). Anything else,
+# e.g. installer chatter mentioning "error", leaves the outcome open.
+_OK_LINES = ("successfully installed", "package is already installed",
+             "found an existing package already installed",
+             "no available upgrade found", "no newer package versions are available")
+_FAIL_LINES = ("installer failed with exit code", "installation abandoned",
+               "installer hash does not match")
+
+
+def winget_version() -> Optional[str]:
+    """winget's version as `winget --version` reports it (without the v), or None."""
+    try:
+        out = subprocess.run(["winget", "--version"], capture_output=True,
+                             text=True, timeout=30).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r"\d+(?:\.\d+)+", out)
+    return match.group(0) if match else None
+
+
+def build_import_manifest(apps: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """winget import JSON for the given catalog apps."""
+    manifest = {
+        "$schema": "https://aka.ms/winget-packages.schema.2.0.json",
+        "CreationDate": datetime.now().isoformat(timespec="seconds"),
+        "Sources": [{
+            "Packages": [
+                {"PackageIdentifier": app["id"]}
+                for app in apps if not app.get("is_section_toggle")
+            ],
+            "SourceDetails": WINGET_SOURCE,
+        }],
+    }
+    version = winget_version()
+    if version:
+        manifest["WinGetVersion"] = version
+    return manifest
+
+
+def parse_import_output(output: str) -> Dict[str, Optional[bool]]:
+    """
+    Split `winget import` output into per-package blocks.
+
+    Returns id (lowercased) → True (installed or already present),
+    False (failed) or None (block seen but outcome unclear).
+    """
+    results: Dict[str, Optional[bool]] = {}
+    current: Optional[str] = None
+    block: List[str] = []
+
+    def close() -> None:
+        if current is None:
+            return
+        lines = [line.strip().lower() for line in block]
+        if any(line.startswith(_OK_LINES) for line in lines):
+            results[current] = True
+        elif any(line.startswith(_FAIL_LINES) for line in lines):
+            results[current] = False
+        else:
+            results[current] = None
+
+    for line in output.splitlines():
+        match = _FOUND_RE.search(line)
+        if match:
+            close()
+            current, block = match.group("id").lower(), []
+        elif current is not None:
+            block.append(line)
+    close()
+    return results
+
+
+def import_watchdog(apps: List[Dict[str, Any]]) -> Watchdog:
+    """
+    Limits for one import of `apps`: the sum of their total deadlines and
+    the longest of their stall limits (None if any app disables it).
+    """
+    limits = [deadlines_for(app) for app in apps]
+    totals = [limit["total"] for limit in limits]
+    stalls = [limit["stall"] for limit in limits]
+    return Watchdog(total=None if None in totals else sum(totals),
+                    stall=None if None in stalls else max(stalls, default=None))
+
+
+def run_import(manifest: Dict[str, Any],
+               on_frame: Optional[Callable[[str, str], Any]] = None,
+               watchdog: Optional[Watchdog] = None) -> Tuple[int, str]:
+    """
+    Write `manifest` to a temp file and run `winget import`, passing each
+    output frame to `on_frame`. Returns (exit code, output); raises
+    ProcessTimeout when `watchdog` expires.
+    """
+    fd, path = tempfile.mkstemp(prefix="sampong_import_", suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    lines: List[str] = []
+
+    def collect(name: str, text: str) -> Any:
+        lines.append(text)
+        return on_frame(name, text) if on_frame else None
+
+    try:
+        code, _ = asyncio.run(stream_process(
+            ["winget", "import", "-i", path,
+             "--accept-package-agreements", "--accept-source-agreements",
+             "--ignore-unavailable", "--disable-interactivity"],
+            collect, watchdog=watchdog,
+        ))
+        return code, "\n".join(lines)
+    except ProcessTimeout as e:
+        e.output = "\n".join(lines)  # what finished before the kill still counts
+        raise
+    finally:
+        os.remove(path)
+
+
+def print_frame(name: str, text: str) -> None:
+    """Live terminal output of the import: progress redraws in place."""
+    text = text.strip()
+    if len(text) <= 1:  # blank lines and spinner frames
+        return
+    if parse_download_size(text) or text.endswith("%"):
+        print(f"   {text}", end="\r", flush=True)
+    else:
+        print(f"   {text}")
+
+
+def install_batch(apps: List[Dict[str, Any]]) -> Dict[str, bool]:
+    """
+    Install `apps` with one `winget import`; returns app id → success and
+    prints [OK] / [FAILED] per app like install_apps.
+    """
+    apps = [a for a in apps if not a.get("is_section_toggle")]
+    if not apps:
+        return {}
+
+    print(f"[*] Installing {len(apps)} application(s) in one winget import...")
+    try:
+        _, output = run_import(build_import_manifest(apps), print_frame,
+                               import_watchdog(apps))
+    except ProcessTimeout as e:
+        print(f"[TIMEOUT] winget import: {e.reason}; process tree killed")
+        output = e.output
+    except OSError as e:
+        print(f"[ERROR] winget import failed: {e}")
+        return {app["id"]: False for app in apps}
+
+    parsed = parse_import_output(output)
+    unclear = [app for app in apps if parsed.get(app["id"].lower()) is None]
+    installed = installed_ids() if unclear else set()
+
+    results = {}
+    for app in apps:
+        ok = parsed.get(app["id"].lower())
+        if ok is None:
+            ok = installed is not None and app["id"].lower() in installed
+        results[app["id"]] = ok
+        print(f"-> [{app['section']}] {app['name']}")
+        print("   [OK]" if ok else "   [FAILED]")
+    return results
@@ -0,0 +1,561 @@
+"""
+Shell startup benchmarks for the deployed dotfiles.
+
+`python main.py bench-shells` starts each configured shell N times
+non-interactively with our profile loaded, and again bare (no profile),
+and reports min / median / p95 startup latency. Results are appended to
+a history file under DOTFILE_ROOT/bench and compared against the saved
+baseline, so a profile change that adds noticeable latency is flagged as
+a regression. For bash, an xtrace run attributes time per sourced line.
+
+`bench-shells --prompt` instead times rendering a bash prompt that shows
+the git branch, once with the old fork-per-prompt git_branch and once
+with the cached prompt.sh helper.
+
+`bench-install` measures winget's fixed per-invocation cost: it installs
+apps that are already present (so winget only starts, checks sources and
+finds nothing to do) once per app, then all of them in one `winget import`.
+
+`bench-link` checks bandwidth shaping and adaptive concurrency
+(python/throttle.py) without a real network: two ranged downloads from a
+local HTTP server share one token bucket, and the concurrency controller
+is stepped through a simulated uplink whose throughput stops growing
+past a known number of installs while CPU load keeps rising.
+
+`bench-download` exercises python/download.py against the same local
+server: one clean download for a throughput baseline, then one that is
+interrupted halfway and resumed from its .part file while the server
+cuts one connection short. Both must match the payload's SHA-256.
+"""
+
+import hashlib
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from python.batch import build_import_manifest, run_import
+from python.config import DOTFILE_ROOT, DOTFILES_DIR
+from python.download import CONNECTIONS, DownloadError, download
+from python.metadata import installed_ids
+from python.rcfile import atomic_write_text
+from python.shells import (
+    BASH_DOTFILE,
+    BASH_PROMPT_DOTFILE,
+    nushell_config_path,
+    posh_profile_path,
+)
+from python.throttle import CHUNK_SIZE, CPU_HIGH, ConcurrencyController, TokenBucket
+
+BENCH_DIR = os.path.join(DOTFILE_ROOT, "bench")
+RESULTS_FILE = os.path.join(BENCH_DIR, "shell_startup.json")
+
+# Median increase (ms) over the baseline that counts as a regression
+DEFAULT_THRESHOLD_MS = 50.0
+# How many past runs to keep in the results file
+HISTORY_LIMIT = 50
+
+
+def _shell_commands() -> Dict[str, Dict[str, Any]]:
+    """Profile-loading and bare command lines for every supported shell."""
+    main_sh = os.path.join(DOTFILE_ROOT, BASH_DOTFILE)
+    posh_profile = posh_profile_path()
+    config_nu = nushell_config_path()
+    pwsh_flags = ["-NoLogo", "-NoProfile", "-NonInteractive", "-Command"]
+
+    return {
+        "bash": {
+            "exe": "bash",
+            "profile": main_sh,
+            "cmd": ["--noprofile", "--norc", "-c",
+                    f'source "{main_sh}"; exit 0'],
+            "bare": ["--noprofile", "--norc", "-c", "exit 0"],
+        },
+        "pwsh": {
+            "exe": "pwsh",
+            "profile": posh_profile,
+            "cmd": pwsh_flags + [f". '{posh_profile}'; exit 0"],
+            "bare": pwsh_flags + ["exit 0"],
+        },
+        "nu": {
+            "exe": "nu",
+            "profile": config_nu,
+            "cmd": ["--config", config_nu, "-c", "exit 0"],
+            "bare": ["--no-config-file", "-c", "exit 0"],
+        },
+    }
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """min / median / p95 / mean (all ms) of a list of samples."""
+    ordered = sorted(samples)
+    p95_index = max(0, int(round(0.95 * len(ordered))) - 1)
+    return {
+        "min": round(ordered[0], 1),
+        "median": round(statistics.median(ordered), 1),
+        "p95": round(ordered[p95_index], 1),
+        "mean": round(statistics.fmean(ordered), 1),
+        "runs": len(ordered),
+    }
+
+
+def time_command(cmd: List[str], runs: int, warmup: int = 1) -> List[float]:
+    """Wall-clock milliseconds for `runs` executions of `cmd`."""
+    samples = []
+    for i in range(warmup + runs):
+        started = time.perf_counter()
+        subprocess.run(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        elapsed = (time.perf_counter() - started) * 1000
+        if i >= warmup:
+            samples.append(elapsed)
+    return samples
+
+
+def bash_line_breakdown(main_sh: str, top: int = 10) -> List[Dict[str, Any]]:
+    """
+    Attribute bash startup time to individual lines of the sourced files.
+
+    Runs bash once with xtrace stamped by $EPOCHREALTIME (bash 5+) and
+    charges the gap between consecutive trace lines to the earlier one.
+    """
+    bash = shutil.which("bash")
+    if not bash:
+        return []
+
+    fd, trace_path = tempfile.mkstemp(prefix="sampong_xtrace_", suffix=".log")
+    os.close(fd)
+    script = (
+        f'exec 9>"{trace_path}"; BASH_XTRACEFD=9; '
+        "PS4='+${EPOCHREALTIME} ${BASH_SOURCE[0]##*/}:${LINENO} '; "
+        f'set -x; source "{main_sh}"; set +x'
+    )
+    try:
+        subprocess.run(
+            [bash, "--noprofile", "--norc", "-c", script],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        with open(trace_path, "r", encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+    finally:
+        os.remove(trace_path)
+
+    events = []
+    for line in lines:
+        parts = line.lstrip("+").split(" ", 2)
+        if len(parts) < 2:
+            continue
+        try:
+            stamp = float(parts[0].replace(",", "."))
+        except ValueError:
+            continue  # continuation of a multi-line command
+        events.append((stamp, parts[1]))
+
+    if not events:
+        return []  # bash < 5 has no EPOCHREALTIME
+
+    costs: Dict[str, float] = {}
+    for (stamp, where), (next_stamp, _) in zip(events, events[1:]):
+        costs[where] = costs.get(where, 0.0) + (next_stamp - stamp) * 1000
+
+    ranked = sorted(costs.items(), key=lambda kv: kv[1], reverse=True)
+    return [{"line": where, "ms": round(ms, 1)} for where, ms in ranked[:top]]
+
+
+# git_branch as main.sh had it before prompt.sh: git + awk on every render
+_FORKING_GIT_BRANCH = r"""
+git_branch() {
+    if [ -d .git ] ; then
+        printf "%s" "($(git branch 2> /dev/null | awk '/\*/{print $2}'))";
+    fi
+}
+"""
+
+_PROMPT_BENCH_SCRIPT = _FORKING_GIT_BRANCH + r"""
+renders=$1 helper=$2
+PS1='$(git_branch) \W \$ '
+t0=$EPOCHREALTIME
+for ((i = 0; i < renders; i++)); do rendered=${PS1@P}; done
+t1=$EPOCHREALTIME
+source "$helper"
+PS1='${SAMPONG_GIT_BRANCH:+($SAMPONG_GIT_BRANCH)} \W \$ '
+t2=$EPOCHREALTIME
+for ((i = 0; i < renders; i++)); do
+    __sampong_git_branch
+    rendered=${PS1@P}
+done
+t3=$EPOCHREALTIME
+echo "$t0 $t1 $t2 $t3"
+"""
+
+
+def bench_prompt(renders: int = 100, repo: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Per-prompt cost (ms) of the git branch segment, before and after.
+
+    Renders PS1 with ${PS1@P} inside one bash process (bash 5+), so only
+    the prompt expansion is timed, not shell startup. `repo` must be a git
+    checkout; defaults to this repository.
+    """
+    bash = shutil.which("bash")
+    if not bash:
+        print("[SKIP] bash not found on PATH")
+        return {}
+    repo = repo or os.path.dirname(DOTFILES_DIR)
+    if not os.path.exists(os.path.join(repo, ".git")):
+        print(f"[SKIP] {repo} is not a git checkout")
+        return {}
+
+    helper = os.path.join(DOTFILES_DIR, BASH_PROMPT_DOTFILE)
+    result = subprocess.run(
+        [bash, "--noprofile", "--norc", "-c", _PROMPT_BENCH_SCRIPT,
+         "bench", str(renders), helper],
+        cwd=repo,
+        capture_output=True,
+        text=True,
+        stdin=subprocess.DEVNULL,
+    )
+    try:
+        t0, t1, t2, t3 = (float(v.replace(",", "."))
+                          for v in result.stdout.split())
+    except ValueError:
+        print("[ERROR] Prompt benchmark needs bash 5+ (EPOCHREALTIME)")
+        return {}
+
+    before = (t1 - t0) * 1000 / renders
+    after = (t3 - t2) * 1000 / renders
+    print(f"[*] Rendered the prompt {renders}x in {repo}")
+    print(f"    git + awk per prompt : {before:8.3f} ms")
+    print(f"    cached prompt.sh     : {after:8.3f} ms")
+    if after > 0:
+        print(f"    speedup              : {before / after:8.0f}x")
+    return {"renders": renders, "before_ms": round(before, 3),
+            "after_ms": round(after, 3)}
+
+
+def _load_results() -> Dict[str, Any]:
+    try:
+        with open(RESULTS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"baseline": None, "history": []}
+
+
+def bench_shells(
+    shells: Optional[List[str]] = None,
+    runs: int = 10,
+    threshold_ms: float = DEFAULT_THRESHOLD_MS,
+    save_baseline: bool = False,
+    breakdown: bool = False,
+) -> Dict[str, Any]:
+    """Benchmark shell startup, store results and report regressions."""
+    if runs < 1:
+        raise ValueError("bench-shells needs at least one run")
+    commands = _shell_commands()
+    selected = shells or list(commands)
+    results: Dict[str, Any] = {}
+
+    for shell in selected:
+        spec = commands.get(shell)
+        if spec is None:
+            print(f"[WARN] Unknown shell for benchmark: {shell}")
+            continue
+        exe = shutil.which(spec["exe"])
+        if not exe:
+            print(f"[SKIP] {shell}: {spec['exe']} not found on PATH")
+            continue
+        if not os.path.exists(spec["profile"]):
+            print(f"[SKIP] {shell}: profile not deployed ({spec['profile']})")
+            continue
+
+        print(f"[*] Benchmarking {shell} ({runs} runs)...")
+        profile = summarize(time_command([exe] + spec["cmd"], runs))
+        bare = summarize(time_command([exe] + spec["bare"], runs))
+        results[shell] = {
+            "profile": profile,
+            "bare": bare,
+            "overhead_ms": round(profile["median"] - bare["median"], 1),
+        }
+        if breakdown and shell == "bash":
+            results[shell]["lines"] = bash_line_breakdown(spec["profile"])
+
+    stored = _load_results()
+    baseline = stored.get("baseline") or {}
+    regressions = report(results, baseline.get("results", {}), threshold_ms)
+
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+    stored.setdefault("history", []).append(record)
+    stored["history"] = stored["history"][-HISTORY_LIMIT:]
+    # Per shell: a shell measured for the first time becomes its own baseline
+    base_results = dict(baseline.get("results") or {})
+    fresh = [shell for shell in results if save_baseline or shell not in base_results]
+    if fresh:
+        base_results.update({shell: results[shell] for shell in fresh})
+        stored["baseline"] = {"timestamp": record["timestamp"], "results": base_results}
+        print(f"[OK] Saved as new baseline: {', '.join(fresh)}")
+    atomic_write_text(RESULTS_FILE, json.dumps(stored, indent=2))
+    print(f"[OK] Results stored in {RESULTS_FILE}")
+
+    return {"results": results, "regressions": regressions}
+
+
+def report(results: Dict[str, Any], baseline: Dict[str, Any],
+           threshold_ms: float) -> List[str]:
+    """Print a results table; return the shells that regressed."""
+    regressions = []
+    print("\n" + "=" * 70)
+    print(f"{'shell':<8}{'min':>9}{'median':>9}{'p95':>9}"
+          f"{'bare':>9}{'overhead':>10}{'vs base':>10}")
+    print("-" * 70)
+    for shell, data in results.items():
+        profile = data["profile"]
+        delta = ""
+        base = baseline.get(shell)
+        if base:
+            diff = profile["median"] - base["profile"]["median"]
+            delta = f"{diff:+.0f}"
+            if diff > threshold_ms:
+                regressions.append(shell)
+                delta += " !"
+        print(f"{shell:<8}{profile['min']:>9.0f}{profile['median']:>9.0f}"
+              f"{profile['p95']:>9.0f}{data['bare']['median']:>9.0f}"
+              f"{data['overhead_ms']:>10.0f}{delta:>10}")
+        for entry in data.get("lines", []):
+            print(f"    {entry['ms']:>8.1f} ms  {entry['line']}")
+    print("=" * 70)
+    print("All times in ms (median of bare shell shown as 'bare').")
+
+    for shell in regressions:
+        print(f"[REGRESSION] {shell} startup median is more than "
+              f"{threshold_ms:.0f} ms slower than the baseline")
+    return regressions
+
+
+def bench_install(apps: List[Dict[str, Any]], runs: int = 1) -> Dict[str, Any]:
+    """
+    Per-app `winget install` loop vs one `winget import` over the same
+    apps. Only apps that are already installed are used, so nothing on
+    the machine changes and the timings are pure winget overhead.
+    """
+    if not shutil.which("winget"):
+        print("[SKIP] winget not found on PATH")
+        return {}
+    installed = installed_ids() or set()
+    apps = [a for a in apps if a["id"].lower() in installed]
+    if not apps:
+        print("[SKIP] None of the selected apps are installed")
+        return {}
+
+    print(f"[*] Benchmarking {len(apps)} installed app(s), {runs} run(s) per mode...")
+    loop, batch = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        for app in apps:
+            subprocess.run(
+                ["winget", "install", "-e", "--id", app["id"],
+                 "--accept-source-agreements", "--accept-package-agreements",
+                 "--disable-interactivity"],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        loop.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        run_import(build_import_manifest(apps))
+        batch.append(time.perf_counter() - started)
+
+    loop_s, batch_s = statistics.median(loop), statistics.median(batch)
+    print(f"    per-app loop : {loop_s:8.1f} s ({loop_s / len(apps):.2f} s per app)")
+    print(f"    winget import: {batch_s:8.1f} s ({batch_s / len(apps):.2f} s per app)")
+    if batch_s > 0:
+        print(f"    speedup      : {loop_s / batch_s:8.1f}x")
+    return {"apps": len(apps), "loop_s": round(loop_s, 2),
+            "batch_s": round(batch_s, 2)}
+
+
+def _payload_server(payload: bytes) -> ThreadingHTTPServer:
+    """
+    Serve `payload` (with Range support) on a free localhost port. Setting
+    `server.drops` cuts that many later responses off halfway.
+    """
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            start, end = 0, len(payload) - 1
+            ranged = self.headers.get("Range", "").startswith("bytes=")
+            if ranged:
+                first, _, last = self.headers["Range"][6:].partition("-")
+                start, end = int(first), min(int(last or end), end)
+            self.send_response(206 if ranged else 200)
+            if ranged:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.end_headers()
+            body = payload[start:end + 1]
+            with lock:
+                drop = self.server.drops > 0 and len(body) > 1
+                self.server.drops -= drop
+            try:
+                self.wfile.write(body[:len(body) // 2] if drop else body)
+            except OSError:
+                pass
+            if drop:
+                self.close_connection = True  # short of its Content-Length
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.drops = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def simulate_uplink(rate: float, knee: int, maximum: int,
+                    intervals: int = 40) -> List[Dict[str, Any]]:
+    """
+    Step a ConcurrencyController through a simulated uplink of `rate`
+    bytes/s that `knee` concurrent installs fill; each install also adds
+    CPU load, so that knee + 2 of them saturate the CPU.
+    """
+    noise = random.Random(0)
+    controller = ConcurrencyController(slots=None, maximum=maximum, link_rate=None,
+                                       interval=1.0)
+    cpu_per_install = (CPU_HIGH - 10) / (knee + 1.5)
+    for _ in range(intervals):
+        active = controller.limit
+        throughput = min(rate, rate / knee * active) * noise.uniform(0.97, 1.03)
+        controller.decide(throughput, cpu=10 + cpu_per_install * active, disk_queue=0.3 * active)
+    return controller.history
+
+
+def bench_link(rate_mbit: float = 20.0, seconds: float = 4.0,
+               knee: int = 3, maximum: int = 8) -> Dict[str, Any]:
+    """
+    Shaping: two concurrent ranged downloads of `seconds` worth of data
+    at `rate_mbit` share one bucket; their combined rate must stay within
+    10% of the limit. Control: the simulated uplink must settle at `knee`
+    (or one above it, while probing) and never saturate the CPU.
+    """
+    rate = rate_mbit * 1000 ** 2 / 8
+    size = int(rate * seconds / 2)
+    payload = os.urandom(size)
+    server = _payload_server(payload)
+    url = f"http://127.0.0.1:{server.server_address[1]}/payload"
+    bucket = TokenBucket(rate)
+    folder = tempfile.mkdtemp(prefix="bench-link-")
+    results: List[Dict[str, Any]] = []
+
+    print(f"[*] Shaping: 2 downloads x {size / 1024 / 1024:.1f} MB through "
+          f"{rate_mbit:g} Mbit/s...")
+    started = time.perf_counter()
+    workers = [
+        threading.Thread(target=lambda n=n: results.append(
+            download(url, os.path.join(folder, f"payload{n}"), bucket=bucket)))
+        for n in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    shutil.rmtree(folder, ignore_errors=True)
+
+    # The bucket starts full: that first burst is allowed on top of the rate
+    shaped = sum(r["bytes"] for r in results) - bucket.burst
+    achieved = shaped / elapsed if len(results) == 2 else 0.0
+    shaping_ok = len(results) == 2 and achieved <= rate * 1.10 and achieved >= rate * 0.90
+    print(f"    limit     : {rate * 8 / 1000 ** 2:8.2f} Mbit/s")
+    print(f"    achieved  : {achieved * 8 / 1000 ** 2:8.2f} Mbit/s over {elapsed:.1f}s "
+          f"({(achieved / rate - 1) * 100:+.1f}%) {'[OK]' if shaping_ok else '[FAIL]'}")
+
+    print(f"[*] Adaptive concurrency: simulated uplink full at {knee} installs, max {maximum}...")
+    history = simulate_uplink(rate, knee, maximum)
+    limits = [step["next"] for step in history]
+    settled = limits[len(limits) // 2:]
+    peak_cpu = max(step["cpu"] for step in history)
+    control_ok = all(knee <= n <= knee + 1 for n in settled) and peak_cpu <= CPU_HIGH
+    print(f"    limits    : {' '.join(map(str, [1] + limits))}")
+    print(f"    settled   : {min(settled)}-{max(settled)} (link full at {knee}), "
+          f"peak CPU {peak_cpu:.0f}% {'[OK]' if control_ok else '[FAIL]'}")
+    return {"shaping_ok": shaping_ok, "achieved_bps": round(achieved),
+            "control_ok": control_ok, "limits": limits}
+
+
+class _Interrupted(Exception):
+    """Stands in for a killed process halfway through a download."""
+
+
+def bench_download(size_mb: float = 64.0, connections: int = CONNECTIONS) -> Dict[str, Any]:
+    """
+    Ranged download of `size_mb` of random data from a local server: a
+    clean run, then a run interrupted halfway and resumed through one
+    dropped connection. Both must match the payload's SHA-256, and the
+    resumed run must reuse the bytes of the interrupted one.
+    """
+    size = int(size_mb * 1024 * 1024)
+    payload = os.urandom(size)
+    digest = hashlib.sha256(payload).hexdigest()
+    server = _payload_server(payload)
+    url = f"http://127.0.0.1:{server.server_address[1]}/payload"
+    folder = tempfile.mkdtemp(prefix="bench-download-")
+
+    def interrupt(done: int, total: Optional[int], rate: float) -> None:
+        if done >= size // 2:
+            raise _Interrupted()
+
+    try:
+        print(f"[*] Clean download: {size / 1024 / 1024:.1f} MB over {connections} "
+              "connection(s)...")
+        clean = download(url, os.path.join(folder, "clean"), connections,
+                         expected_sha256=digest)
+        print(f"    throughput: {clean['bytes_per_second'] * 8 / 1000 ** 2:8.1f} Mbit/s "
+              f"in {clean['seconds']:.2f}s [OK]")
+
+        print("[*] Interrupted at half, then resumed through a dropped connection...")
+        dest = os.path.join(folder, "resumed")
+        try:
+            # Shaped to about a second, so progress reports come before the end
+            download(url, dest, connections, on_progress=interrupt,
+                     bucket=TokenBucket(size, burst=CHUNK_SIZE))
+        except _Interrupted:
+            pass
+        server.drops = 1
+        resumed = download(url, dest, connections, expected_sha256=digest)
+        dropped = server.drops == 0
+        resume_ok = resumed["resumed_bytes"] > 0 and dropped
+        print(f"    resumed   : {resumed['resumed_bytes'] / 1024 / 1024:8.1f} MB kept from "
+              f"the interrupted run, {'1 connection dropped' if dropped else 'no drop'}")
+        print(f"    throughput: {resumed['bytes_per_second'] * 8 / 1000 ** 2:8.1f} Mbit/s "
+              f"in {resumed['seconds']:.2f}s (retry backoff included) "
+              f"{'[OK]' if resume_ok else '[FAIL]'}")
+        print(f"    sha256    : {digest[:16]}... matches both downloads [OK]")
+    except DownloadError as e:
+        print(f"    [FAIL] {e}")
+        return {"ok": False, "error": str(e)}
+    finally:
+        server.shutdown()
+        shutil.rmtree(folder, ignore_errors=True)
+    return {"ok": resume_ok, "clean_bps": round(clean["bytes_per_second"]),
+            "resumed_bps": round(resumed["bytes_per_second"]),
+            "resumed_bytes": resumed["resumed_bytes"]}
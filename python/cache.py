@@ -0,0 +1,409 @@
+"""
+Content-addressed cache of winget installers (--cache-dir).
+
+Reprovisioning a machine, or several identical ones, used to download
+every installer from the internet again. With a cache directory (local,
+or a network share the machines have in common) each app is resolved
+first with `winget show`, which names the package version and the SHA-256
+of its installer. Installers are stored under that hash:
+
+    <cache>/objects/<sha256>/<installer file>   as `winget download` saved it
+    <cache>/objects/<sha256>/manifest.yaml      its merged winget manifest
+    <cache>/objects/<sha256>/entry.json         id, version, size, file name
+
+so an entry is only ever reused for exactly the installer winget would
+fetch, whichever package id or version points at it. A hit runs the
+cached installer directly with the silent switches from its manifest; a
+miss runs `winget download` into the cache first. Installers that cannot
+be run that way (zip, portable, store apps, exe without silent switches,
+manifests declaring Dependencies or switches we do not apply) go through
+`winget install` as before. After a cached install, registered() checks
+that winget lists the package before it counts as installed.
+
+Only one download per installer happens at a time: other installs of it
+in this process wait for the first one, and other machines wait on
+<cache>/locks/<sha256>.lock (taken over after LOCK_STALE seconds). Once
+the cache holds more than CACHE_MAX_BYTES, the least recently used
+entries are removed. Hits, misses and bytes saved are summarised by
+cache_report().
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+from python.config import CACHE_DIR, CACHE_MAX_BYTES
+from python.metadata import installed_ids
+from python.procio import FrameCallback, Watchdog, stream_process
+from python.rcfile import atomic_write_text
+from python.session import source_args
+
+# Seconds between checks while another install or machine downloads
+LOCK_POLL = 2.0
+# A lock file older than this is left over from a crashed run
+LOCK_STALE = 60 * 60
+HASH_CHUNK = 1024 * 1024
+
+# Installer exit codes that mean "installed" (3010/1641: reboot needed)
+SUCCESS_CODES = (0, 3010, 1641)
+
+# Silent switches winget itself uses when a manifest gives none
+DEFAULT_SWITCHES = {
+    "inno": ["/SP-", "/VERYSILENT", "/SUPPRESSMSGBOXES", "/NORESTART"],
+    "nullsoft": ["/S"],
+    "burn": ["/quiet", "/norestart"],
+}
+MSI_TYPES = ("msi", "wix")
+MSIX_TYPES = ("msix", "appx")
+# Installer types winget show reports that are never cached
+UNCACHEABLE_TYPES = ("zip", "portable", "msstore", "pwa")
+# InstallerSwitches keys that don't change an unattended install; any
+# other (Upgrade, Repair, newer schema keys) needs winget itself
+KNOWN_SWITCHES = ("Silent", "SilentWithProgress", "Custom", "Interactive",
+                  "InstallLocation", "Log")
+
+Note = Callable[[str], Awaitable[None]]
+
+_lock = threading.Lock()
+_flights: Dict[str, threading.Lock] = {}
+_stats = {"hits": 0, "misses": 0, "shared": 0, "bytes_saved": 0,
+          "bytes_downloaded": 0, "evicted": 0, "bypassed": 0}
+_cache: Dict[str, "InstallerCache"] = {}
+
+
+def parse_show(text: str) -> Dict[str, str]:
+    """`Key: value` fields of `winget show` output, lower-cased keys (first wins)."""
+    fields: Dict[str, str] = {}
+    for line in text.splitlines():
+        key, sep, value = line.strip().partition(":")
+        if sep and value.strip():
+            fields.setdefault(key.strip().lower(), value.strip())
+    return fields
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_installer(manifest: Dict[str, Any], sha256: str) -> Dict[str, Any]:
+    """The manifest's installer entry for `sha256`, with root-level defaults."""
+    installers = manifest.get("Installers") or [{}]
+    entry = next((i for i in installers
+                  if str(i.get("InstallerSha256", "")).lower() == sha256),
+                 installers[0])
+    merged = {k: v for k, v in manifest.items() if k != "Installers"}
+    merged.update(entry)
+    return merged
+
+
+def silent_command(installer: str, entry: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    Command line that installs `installer` unattended, as winget would,
+    or None when the installer type needs winget itself.
+    """
+    kind = str(entry.get("InstallerType", "")).lower()
+    switches = entry.get("InstallerSwitches") or {}
+    if entry.get("Dependencies") or any(k not in KNOWN_SWITCHES for k in switches):
+        return None  # winget installs dependencies / applies those switches
+    silent = switches.get("Silent") or switches.get("SilentWithProgress")
+    custom = str(switches.get("Custom") or "").split()
+
+    if kind in MSIX_TYPES:
+        return ["powershell", "-NoProfile", "-Command",
+                f"Add-AppxPackage -Path '{installer}'"]
+    if kind in MSI_TYPES:
+        args = str(silent).split() if silent else ["/quiet", "/norestart"]
+        return ["msiexec", "/i", installer] + args + custom
+    if silent:
+        return [installer] + str(silent).split() + custom
+    if kind in DEFAULT_SWITCHES:
+        return [installer] + DEFAULT_SWITCHES[kind] + custom
+    return None  # exe without silent switches, zip, portable...
+
+
+class InstallerCache:
+    """The installer cache at `root`, trimmed to `max_bytes`."""
+
+    def __init__(self, root: str, max_bytes: int = CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.objects = os.path.join(root, "objects")
+        self.locks = os.path.join(root, "locks")
+        self.tmp = os.path.join(root, "tmp")
+
+    # Entries
+
+    def _entry(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """The stored entry for `sha256`, or None."""
+        try:
+            with open(os.path.join(self.objects, sha256, "entry.json"), "r",
+                      encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _touch(self, sha256: str) -> None:
+        """Mark an entry as just used (LRU order is entry.json's mtime)."""
+        try:
+            os.utime(os.path.join(self.objects, sha256, "entry.json"))
+        except OSError:
+            pass
+
+    def _command(self, sha256: str, entry: Dict[str, Any]) -> Optional[List[str]]:
+        folder = os.path.join(self.objects, sha256)
+        try:
+            with open(os.path.join(folder, "manifest.yaml"), "r", encoding="utf-8") as f:
+                manifest = yaml.safe_load(f) or {}
+        except (OSError, yaml.YAMLError):
+            return None
+        return silent_command(os.path.join(folder, entry["file"]),
+                              manifest_installer(manifest, sha256))
+
+    def _intact(self, sha256: str, entry: Dict[str, Any]) -> bool:
+        """True if the stored installer still hashes to `sha256`; else drop it."""
+        try:
+            if file_sha256(os.path.join(self.objects, sha256, entry["file"])) == sha256:
+                return True
+        except OSError:
+            pass
+        shutil.rmtree(os.path.join(self.objects, sha256), ignore_errors=True)
+        return False
+
+    # Locking (single flight)
+
+    def _try_lock(self, sha256: str) -> bool:
+        """Take this installer's lock file; False while someone else holds it."""
+        os.makedirs(self.locks, exist_ok=True)
+        path = os.path.join(self.locks, sha256 + ".lock")
+        try:
+            if time.time() - os.path.getmtime(path) > LOCK_STALE:
+                os.remove(path)
+        except OSError:
+            pass
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            f.write(f"{os.getpid()}\n")
+        return True
+
+    def _unlock(self, sha256: str) -> None:
+        try:
+            os.remove(os.path.join(self.locks, sha256 + ".lock"))
+        except OSError:
+            pass
+
+    # Filling
+
+    async def _download(self, app: Dict[str, Any], sha256: str, version: str,
+                        on_frame: FrameCallback,
+                        watchdog: Optional[Watchdog]) -> Tuple[Optional[Dict[str, Any]], str]:
+        """`winget download` the installer into the cache: (entry, problem)."""
+        staging = os.path.join(self.tmp, f"{sha256}.{uuid.uuid4().hex[:8]}")
+        os.makedirs(staging)
+        try:
+            cmd = ["winget", "download", "-e", "--id", app["id"], "--version", version,
+                   "--download-directory", staging,
+                   "--accept-source-agreements", "--accept-package-agreements",
+                   ] + source_args()
+            code, error = await stream_process(cmd, on_frame, watchdog=watchdog)
+            if code != 0:
+                return None, f"winget download failed ({code}): {error}"
+
+            names = os.listdir(staging)
+            manifests = [n for n in names if n.lower().endswith((".yaml", ".yml"))]
+            installers = [n for n in names if n not in manifests]
+            if len(installers) != 1 or not manifests:
+                return None, f"unexpected download contents: {', '.join(names)}"
+            installer = installers[0]
+            actual = await asyncio.get_running_loop().run_in_executor(
+                None, file_sha256, os.path.join(staging, installer))
+            if actual != sha256:
+                return None, f"installer hash {actual} does not match the manifest"
+
+            os.replace(os.path.join(staging, manifests[0]),
+                       os.path.join(staging, "manifest.yaml"))
+            entry = {
+                "id": app["id"], "version": version, "file": installer,
+                "size": os.path.getsize(os.path.join(staging, installer)),
+                "stored": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            atomic_write_text(os.path.join(staging, "entry.json"), json.dumps(entry, indent=2))
+            os.makedirs(self.objects, exist_ok=True)
+            try:
+                os.replace(staging, os.path.join(self.objects, sha256))
+            except OSError:
+                pass  # stored meanwhile; the staging copy is dropped below
+            return self._entry(sha256), ""
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def evict(self, keep: str = "") -> int:
+        """Remove least recently used entries above max_bytes; bytes freed."""
+        try:
+            names = os.listdir(self.objects)
+        except OSError:
+            return 0
+        entries = []
+        for name in names:
+            folder = os.path.join(self.objects, name)
+            try:
+                used = os.path.getmtime(os.path.join(folder, "entry.json"))
+                size = sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder))
+            except OSError:
+                continue  # being written or removed by someone else
+            entries.append((used, size, name))
+
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for _, size, name in sorted(entries):
+            if total - freed <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(self.objects, name), ignore_errors=True)
+            freed += size
+        with _lock:
+            _stats["evicted"] += freed
+        return freed
+
+    # Entry points for the install engine
+
+    async def registered(self, app: Dict[str, Any]) -> bool:
+        """
+        True if winget lists `app` as installed after a cached install (or
+        winget cannot tell); a silent installer can exit 0 without it.
+        """
+        ids = await asyncio.get_running_loop().run_in_executor(None, installed_ids)
+        return ids is None or app["id"].lower() in ids
+
+    async def resolve(self, app: Dict[str, Any]) -> Dict[str, str]:
+        """`winget show` fields for the installer winget would pick for `app`."""
+        lines: List[str] = []
+
+        def collect(name: str, text: str) -> None:
+            if name == "stdout":
+                lines.append(text)
+
+        cmd = ["winget", "show", "-e", "--id", app["id"],
+               "--accept-source-agreements"] + source_args()
+        code, _ = await stream_process(cmd, collect)
+        return parse_show("\n".join(lines)) if code == 0 else {}
+
+    async def prepare(self, app: Dict[str, Any], on_frame: FrameCallback,
+                      note: Note, watchdog: Optional[Watchdog] = None) -> Optional[List[str]]:
+        """
+        Make sure the installer for `app` is cached and return the command
+        that installs it from the cache; None means use `winget install`.
+        """
+        def bypass() -> None:
+            with _lock:
+                _stats["bypassed"] += 1
+            return None
+
+        try:
+            info = await self.resolve(app)
+        except OSError:
+            return bypass()
+        sha256 = info.get("installer sha256", "").lower()
+        version = info.get("version", "")
+        if not sha256 or not version:
+            await note("[CACHE] No installer hash from winget show; installing directly")
+            return bypass()
+        if info.get("installer type", "").lower() in UNCACHEABLE_TYPES:
+            return bypass()
+
+        with _lock:
+            flight = _flights.setdefault(sha256, threading.Lock())
+        shared = False
+        while not flight.acquire(blocking=False):
+            shared = True  # another install here is downloading it
+            await asyncio.sleep(LOCK_POLL)
+        try:
+            while True:
+                entry = self._entry(sha256)
+                if entry:
+                    command = self._command(sha256, entry)
+                    if command is None:
+                        return bypass()  # stored, but only winget can install it
+                    loop = asyncio.get_running_loop()
+                    if await loop.run_in_executor(None, self._intact, sha256, entry):
+                        self._touch(sha256)
+                        with _lock:
+                            _stats["hits"] += 1
+                            _stats["shared"] += shared
+                            _stats["bytes_saved"] += entry["size"]
+                        await note(f"[CACHE] Hit: {app['id']} {version} "
+                                   f"({entry['size'] / 1024 / 1024:.1f} MB from {self.root})")
+                        return command
+                if self._try_lock(sha256):
+                    break
+                shared = True  # another machine is downloading it
+                await asyncio.sleep(LOCK_POLL)
+
+            try:
+                await note(f"[CACHE] Miss: downloading {app['id']} {version} into the cache")
+                entry, problem = await self._download(app, sha256, version, on_frame, watchdog)
+            finally:
+                self._unlock(sha256)
+            if not entry:
+                await note(f"[CACHE] {problem}; installing directly")
+                return bypass()
+            with _lock:
+                _stats["misses"] += 1
+                _stats["bytes_downloaded"] += entry["size"]
+            self.evict(keep=sha256)
+            return self._command(sha256, entry) or bypass()
+        except OSError as e:
+            await note(f"[CACHE] Cache unavailable ({e}); installing directly")
+            return bypass()
+        finally:
+            flight.release()
+
+
+def get_cache() -> Optional[InstallerCache]:
+    """The cache configured with --cache-dir, or None."""
+    if not CACHE_DIR:
+        return None
+    with _lock:
+        if CACHE_DIR not in _cache:
+            _cache[CACHE_DIR] = InstallerCache(CACHE_DIR)
+        return _cache[CACHE_DIR]
+
+
+def cache_stats() -> Dict[str, int]:
+    with _lock:
+        return dict(_stats)
+
+
+def cache_report() -> Optional[str]:
+    """One-line summary of cache use so far, or None without a cache."""
+    stats = cache_stats()
+    lookups = stats["hits"] + stats["misses"]
+    if not CACHE_DIR or not (lookups or stats["bypassed"]):
+        return None
+    report = (f"installer cache: {stats['hits']} hit(s), {stats['misses']} miss(es)"
+              f" ({stats['hits'] / lookups:.0%} hit rate), " if lookups else
+              "installer cache: no cacheable installers, ")
+    report += (f"{stats['bytes_saved'] / 1024 / 1024:.1f} MB not downloaded, "
+               f"{stats['bytes_downloaded'] / 1024 / 1024:.1f} MB added")
+    if stats["shared"]:
+        report += f", {stats['shared']} download(s) shared"
+    if stats["evicted"]:
+        report += f", {stats['evicted'] / 1024 / 1024:.0f} MB evicted"
+    if stats["bypassed"]:
+        report += f", {stats['bypassed']} installed without the cache"
+    return report
@@ -9,14 +9,15 @@ from typing import Any, Dict, List
 
 import python.config as config
 from python.apps import load_apps
+from python.mirrors import catalog_reachable
+from python.planner import run_all_steps
 from python.shells import configure_shell, load_shells
 from python.winget import install_apps, install_winget
-from python.check_network import internet_on
 
 
 def check_internet_on() -> bool:
     """Check if internet is available."""
-    return internet_on(url=config.APPS_JSON_URL)
+    return catalog_reachable(config.APPS_JSON_URL)
 
 
 def show_menu(online_mode: bool = False):
@@ -439,23 +440,11 @@ def main():
                 print("   ⚡ Running All Setup Steps")
                 print("=" * 70 + "\n")
 
-                print("[1/3] Installing winget...")
-                if install_winget():
-                    print("\n[2/3] Installing applications...")
-                    apps = load_apps()
-                    install_apps(
-                        [a for a in apps
-                         if not a.get("is_section_toggle")]
-                    )
-
-                print("\n[3/3] Configuring shells...")
+                apps = load_apps()
                 visible_shells = load_and_filter_shells(
                     online_mode=online_mode
                 )
-                if visible_shells:
-                    for shell in visible_shells:
-                        if shell["id"] != "all":
-                            configure_shell(shell["id"])
+                run_all_steps(apps, visible_shells)
 
                 print("\n" + "=" * 70)
                 print("   ✅ All steps completed!")
@@ -1,7 +1,6 @@
 # config.py
 import os
 import sys
-import requests
 import json
 
 # -------------------------------------------------------------------
@@ -9,6 +8,9 @@ import json
 # -------------------------------------------------------------------
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Repo dotfiles (deployed into DOTFILE_ROOT by python/shells.py)
+DOTFILES_DIR = os.path.join(BASE_DIR, "dotfiles")
+
 # Local JSON paths
 APPS_JSON_LOCAL = os.path.join(BASE_DIR, "json", "apps.json")
 SHELLS_JSON_LOCAL = os.path.join(BASE_DIR, "json", "shells.json")
@@ -17,8 +19,10 @@ SHELLS_JSON_LOCAL = os.path.join(BASE_DIR, "json", "shells.json")
 USERNAME = "Sampong-Starluck"
 REPOSITORY = "Sampong_dotfile"
 
-# Remote GitHub URLs
-GITHUB_BASE = f"https://raw.githubusercontent.com/{USERNAME}/{REPOSITORY}/master/json"
+# Remote GitHub URLs; REPO_RAW_BASE is one mirror among --mirror ones
+# (python/mirrors.py), which serve the same json/ and dotfiles/ paths
+REPO_RAW_BASE = f"https://raw.githubusercontent.com/{USERNAME}/{REPOSITORY}/master"
+GITHUB_BASE = f"{REPO_RAW_BASE}/json"
 APPS_JSON_URL = f"{GITHUB_BASE}/apps.json"
 SHELLS_JSON_URL = f"{GITHUB_BASE}/shells.json"
 
@@ -27,25 +31,101 @@ NU_PROFILE_URL = f"https://raw.githubusercontent.com/{USERNAME}/{REPOSITORY}/mas
 BASH_PROFILE_URL = f"https://raw.githubusercontent.com/{USERNAME}/{REPOSITORY}/master/dotfiles/bash/main.sh"
 POSH_PROFILE_URL = f"https://raw.githubusercontent.com/{USERNAME}/{REPOSITORY}/master/dotfiles/PowerShell/posh_profile.ps1"
 
-# Dotfile root in AppData
-DOTFILE_ROOT = os.path.join(os.getenv("APPDATA"), "Sampong_dotfile")
+# Dotfile root in AppData (~/.config outside Windows, e.g. for `watch`)
+DOTFILE_ROOT = os.path.join(
+    os.getenv("APPDATA") or os.path.expanduser("~/.config"), "Sampong_dotfile"
+)
 
 # Flags
 ONLINE_MODE = "--online" in sys.argv
 FORCE_LOCAL = "--force-local" in sys.argv
 RESET_PROFILES = "--reset-profiles" in sys.argv
+# Install apps with one `winget import` instead of one `winget install` each
+BATCH_INSTALL = "--batch" in sys.argv
+# Continue the last "run all steps" from its journal (python/journal.py)
+RESUME = "--resume" in sys.argv
+
+
+def _flag_values(name):
+    """Every `--name VALUE` (or `--name=VALUE`) in sys.argv, in order."""
+    values = []
+    for i, arg in enumerate(sys.argv):
+        if arg == name and i + 1 < len(sys.argv):
+            values.append(sys.argv[i + 1])
+        elif arg.startswith(name + "="):
+            values.append(arg.split("=", 1)[1])
+    return values
+
+
+def _flag_value(name):
+    """`--name VALUE` (or `--name=VALUE`) from sys.argv, else None."""
+    values = _flag_values(name)
+    return values[0] if values else None
+
+
+def _flag_number(name, scale, unit, default=None):
+    """`--name NUMBER` from sys.argv times `scale`, else `default`."""
+    value = _flag_value(name)
+    if value is None:
+        return default
+    try:
+        return float(value) * scale
+    except ValueError:
+        print(f"[WARN] Ignoring {name} {value!r}: not a number of {unit}")
+        return default
+
+
+def _flag_minutes(name, default=None):
+    """`--name MINUTES` (or `--name=MINUTES`) from sys.argv, in seconds."""
+    return _flag_number(name, 60, "minutes", default)
+
+
+# Per-app install deadline and hung-installer (no output) limit, in seconds;
+# None keeps the defaults in python/engine.py
+INSTALL_TIMEOUT = _flag_minutes("--install-timeout")
+STALL_TIMEOUT = _flag_minutes("--stall-timeout")
+
+# Content-addressed installer cache (python/cache.py): a local directory or
+# a network share several machines use; None disables it. --cache-size is
+# the total in GB kept before the least recently used installers go.
+CACHE_DIR = _flag_value("--cache-dir")
+CACHE_MAX_BYTES = int(_flag_number("--cache-size", 1024 ** 3, "GB", 20 * 1024 ** 3))
+
+# Limit for every download the tool makes itself, in bytes/s from
+# --max-bandwidth MBIT (megabits per second); None is unlimited
+MAX_BANDWIDTH = _flag_number("--max-bandwidth", 1000 ** 2 / 8, "Mbit/s")
+# Installs running at once (at most, with --adaptive; python/throttle.py)
+CONCURRENCY = max(1, int(_flag_number("--concurrency", 1, "installs", 1)))
+ADAPTIVE_CONCURRENCY = "--adaptive" in sys.argv
+
+# Extra catalog/dotfile mirrors (e.g. `main.py serve` on the LAN), raced
+# against REPO_RAW_BASE at startup; repeatable --mirror URL
+MIRRORS = [url.rstrip("/") for url in _flag_values("--mirror")]
+
+# Catalog overlays applied over apps.json in order (python/layers.py);
+# repeatable --catalog PATH_OR_URL
+CATALOG_LAYERS = _flag_values("--catalog")
+
+# Dotfile deploy mode: "copy" (default), "symlink" (--link) or "hardlink" (--hardlink).
+# Link modes fall back to copying where links are not allowed.
+if "--hardlink" in sys.argv:
+    DEPLOY_MODE = "hardlink"
+elif "--link" in sys.argv:
+    DEPLOY_MODE = "symlink"
+else:
+    DEPLOY_MODE = "copy"
 
 
 def fetch_text(url, local_fallback=None):
-    """Fetch text from GitHub if --online, else fallback to local file."""
+    """Fetch text from the fastest mirror if --online, else fallback to local file."""
+    from python.mirrors import fetch_mirrored  # needs the flags above
     if ONLINE_MODE and not FORCE_LOCAL:
         try:
-            resp = requests.get(url, timeout=5)
-            resp.raise_for_status()
-            print(f"[DEBUG] Loaded text from GitHub: {url}")
-            return resp.text
+            body, source = fetch_mirrored(url, timeout=5)
+            print(f"[DEBUG] Loaded text from {source}")
+            return body.decode("utf-8")
         except Exception as e:
-            print(f"[WARN] GitHub fetch failed ({e}), falling back to local")
+            print(f"[WARN] Remote fetch failed ({e}), falling back to local")
 
     if local_fallback and os.path.exists(local_fallback):
         with open(local_fallback, "r", encoding="utf-8") as f:
@@ -55,15 +135,19 @@ def fetch_text(url, local_fallback=None):
 
 
 def fetch_json(url, local_path, online_mode = False):
-    """Fetch JSON from GitHub if --online, else fallback to local file."""
+    """
+    Fetch JSON from the fastest mirror if online, else fallback to local
+    file. Catalogs are only downloaded when json/manifest.json says the
+    cached copy is stale (python/manifest.py).
+    """
+    from python.manifest import fetch_catalog  # these need the flags above
+    from python.mirrors import fetch_mirrored
     if online_mode and not FORCE_LOCAL:
         try:
-            resp = requests.get(url, timeout=5)
-            resp.raise_for_status()
-            print(f"[DEBUG] Loaded JSON from GitHub: {url}")
-            return resp.json()
+            return fetch_catalog(
+                url, lambda u, accept=None: fetch_mirrored(u, timeout=5, accept=accept))
         except Exception as e:
-            print(f"[WARN] GitHub fetch failed ({e}), falling back to local")
+            print(f"[WARN] Remote fetch failed ({e}), falling back to local")
 
     # Always fallback to local
     if os.path.exists(local_path):
@@ -0,0 +1,137 @@
+"""
+Deploy repo dotfiles into DOTFILE_ROOT.
+
+Three modes are supported:
+
+- "copy"     : copy the file (metadata preserved, so it can be verified
+               with a single lstat instead of reading the content)
+- "symlink"  : point DOTFILE_ROOT at the repo file; edits are live on the
+               next shell start
+- "hardlink" : same inode as the repo file; zero-copy, no symlink privilege
+               needed on Windows, but only works on the same volume
+
+Link modes fall back symlink → hardlink → copy when the OS refuses a link
+(Windows without Developer Mode, different drives, FAT volumes, ...).
+"""
+
+import os
+import shutil
+import stat
+from typing import Callable, Optional
+
+from .config import DEPLOY_MODE
+
+# Order in which link modes fall back when the OS refuses one
+_FALLBACKS = {
+    "symlink": ["symlink", "hardlink", "copy"],
+    "hardlink": ["hardlink", "copy"],
+    "copy": ["copy"],
+}
+
+
+def _same_inode(a: os.stat_result, b: os.stat_result) -> bool:
+    return a.st_ino == b.st_ino and a.st_dev == b.st_dev and a.st_ino != 0
+
+
+def deployed_mode(src: str, dst: str) -> Optional[str]:
+    """
+    Return how `dst` currently mirrors `src` ("symlink", "hardlink",
+    "copy") or None if it is missing or stale. Uses lstat/stat only.
+    """
+    try:
+        dst_st = os.lstat(dst)
+        src_st = os.stat(src)
+    except OSError:
+        return None
+
+    if stat.S_ISLNK(dst_st.st_mode):
+        try:
+            target = os.readlink(dst)
+        except OSError:
+            return None
+        if not os.path.isabs(target):
+            target = os.path.join(os.path.dirname(dst), target)
+        if os.path.normcase(os.path.abspath(target)) == \
+                os.path.normcase(os.path.abspath(src)):
+            return "symlink"
+        return None
+
+    if _same_inode(dst_st, src_st):
+        return "hardlink"
+
+    # copy2 preserves mtime, so size + mtime is a cheap freshness check
+    if (dst_st.st_size == src_st.st_size
+            and dst_st.st_mtime_ns == src_st.st_mtime_ns):
+        return "copy"
+    return None
+
+
+def is_deployed(src: str, dst: str, mode: Optional[str] = None) -> bool:
+    """True if `dst` is already an up-to-date deploy of `src`."""
+    current = deployed_mode(src, dst)
+    if current is None:
+        return False
+    wanted = _FALLBACKS[mode or DEPLOY_MODE]
+    # A copy never satisfies a link request: retry the link next time
+    return current in wanted and (current != "copy" or wanted[0] == "copy")
+
+
+def _place(dst: str, make: Callable[[str], None]) -> None:
+    """Create the new entry next to `dst` and atomically swap it in."""
+    tmp = f"{dst}.deploy-tmp"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    try:
+        make(tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def deploy_dotfile(
+    src: str,
+    dst: str,
+    mode: Optional[str] = None,
+    before_replace: Optional[Callable[[str], object]] = None,
+) -> str:
+    """
+    Deploy `src` to `dst` using `mode` (defaults to config.DEPLOY_MODE).
+
+    Returns the method that was actually used, or "unchanged" when `dst`
+    was already up to date. `before_replace(dst)` is called before a
+    regular file at `dst` gets replaced (e.g. to back it up).
+    """
+    mode = mode or DEPLOY_MODE
+    if mode not in _FALLBACKS:
+        raise ValueError(f"Unknown deploy mode: {mode}")
+
+    src = os.path.abspath(src)
+    if not os.path.exists(src):
+        raise FileNotFoundError(f"Dotfile not found: {src}")
+
+    if is_deployed(src, dst, mode):
+        return "unchanged"
+
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    if before_replace and os.path.isfile(dst) and not os.path.islink(dst):
+        before_replace(dst)
+
+    makers = {
+        "symlink": lambda tmp: os.symlink(src, tmp),
+        "hardlink": lambda tmp: os.link(src, tmp),
+        "copy": lambda tmp: shutil.copy2(src, tmp),
+    }
+
+    last_error = None
+    for method in _FALLBACKS[mode]:
+        try:
+            _place(dst, makers[method])
+        except OSError as e:
+            last_error = e
+            print(f"[WARN] {method} not allowed for {dst} ({e}), falling back")
+            continue
+        return method
+
+    raise last_error
@@ -0,0 +1,277 @@
+"""
+Multi-connection ranged downloads with resume.
+
+Used for the winget bootstrap bundle (~200 MB), which used to come down
+through a single stream that restarted from zero on any network error.
+
+The file is split into byte ranges fetched over several connections into
+a preallocated `<dest>.part`. Progress per range is kept in
+`<dest>.part.json`, so an interrupted download continues where each
+range stopped (as long as the server still reports the same size and
+validator). The SHA-256 is computed in file order while the ranges
+arrive: whenever the complete prefix of the file grows, the new bytes
+are read back from the page cache and hashed. Progress callbacks are
+throttled to PROGRESS_INTERVAL.
+
+Servers without range support get one plain stream (no resume). All
+connections together stay under --max-bandwidth (python/throttle.py).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from python.rcfile import atomic_write_text
+from python.throttle import TokenBucket, throttle
+
+# Parallel range requests per download
+CONNECTIONS = 4
+# Files are not split into ranges smaller than this
+MIN_SEGMENT = 4 * 1024 * 1024
+CHUNK_SIZE = 256 * 1024
+# Seconds between progress callbacks (and saves of the resume state)
+PROGRESS_INTERVAL = 0.25
+# Attempts per range before the download fails
+SEGMENT_ATTEMPTS = 4
+TIMEOUT = 30
+
+# on_progress(done_bytes, total_bytes or None, bytes_per_second)
+ProgressCallback = Callable[[int, Optional[int], float], None]
+
+
+class DownloadError(Exception):
+    """The download could not be completed or failed verification."""
+
+
+def probe(session: requests.Session, url: str,
+          timeout: float = TIMEOUT) -> Tuple[str, Optional[int], bool, str]:
+    """
+    (final url after redirects, size or None, ranges supported, validator)
+    from a one-byte range request.
+    """
+    with session.get(url, headers={"Range": "bytes=0-0"}, stream=True,
+                     allow_redirects=True, timeout=timeout) as resp:
+        resp.raise_for_status()
+        validator = resp.headers.get("ETag") or resp.headers.get("Last-Modified", "")
+        if resp.status_code == 206:
+            total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+            if total.isdigit():
+                return resp.url, int(total), True, validator
+        length = resp.headers.get("Content-Length")
+        return resp.url, int(length) if length and length.isdigit() else None, False, validator
+
+
+def split_ranges(size: int, connections: int = CONNECTIONS) -> List[Dict[str, int]]:
+    """Byte ranges (inclusive ends) covering `size` bytes, at most `connections`."""
+    count = max(1, min(connections, size // MIN_SEGMENT or 1))
+    step = -(-size // count)
+    return [
+        {"start": start, "end": min(size, start + step) - 1, "done": 0}
+        for start in range(0, size, step)
+    ]
+
+
+class RangedDownload:
+    """One download of `url` to `dest`; call run()."""
+
+    def __init__(self, url: str, dest: str, connections: int = CONNECTIONS,
+                 on_progress: Optional[ProgressCallback] = None,
+                 expected_sha256: Optional[str] = None,
+                 bucket: Optional[TokenBucket] = None):
+        self.url = url
+        self.dest = dest
+        self.part = dest + ".part"
+        self.state_file = self.part + ".json"
+        self.connections = max(1, connections)
+        self.on_progress = on_progress
+        self.expected_sha256 = (expected_sha256 or "").lower() or None
+        self.bucket = bucket
+        self.size: Optional[int] = None
+        self.ranged = False
+        self.segments: List[Dict[str, int]] = []
+        self._lock = threading.Lock()
+        self._hasher = hashlib.sha256()
+        self._hashed = 0
+        self._last_report = 0.0
+        self._started = 0.0
+        self._resumed = 0
+
+    # Resume state
+
+    def _load_state(self, validator: str) -> bool:
+        """Reuse the ranges of an earlier attempt at the same file."""
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if (state.get("size") != self.size or state.get("validator") != validator
+                or not os.path.exists(self.part)
+                or os.path.getsize(self.part) != self.size):
+            return False
+        self.segments = state["segments"]
+        return True
+
+    def _save_state(self, validator: str) -> None:
+        atomic_write_text(self.state_file, json.dumps({
+            "url": self.url, "size": self.size, "validator": validator,
+            "segments": self.segments,
+        }))
+
+    # Progress and hashing
+
+    def _done(self) -> int:
+        return sum(segment["done"] for segment in self.segments)
+
+    def _prefix(self) -> int:
+        """Bytes from the start of the file that are all on disk."""
+        prefix = 0
+        for segment in self.segments:
+            prefix += segment["done"]
+            if segment["done"] < segment["end"] - segment["start"] + 1:
+                break
+        return prefix
+
+    def _hash_prefix(self, reader) -> None:
+        """Hash newly completed bytes at the front of the file, in order."""
+        prefix = self._prefix()
+        if prefix <= self._hashed:
+            return
+        reader.seek(self._hashed)
+        while self._hashed < prefix:
+            data = reader.read(min(CHUNK_SIZE, prefix - self._hashed))
+            if not data:
+                break
+            self._hasher.update(data)
+            self._hashed += len(data)
+
+    def _report(self, validator: str, final: bool = False) -> None:
+        now = time.monotonic()
+        if not final and now - self._last_report < PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        if self.ranged:
+            self._save_state(validator)
+        if self.on_progress:
+            done = self._done()
+            elapsed = max(now - self._started, 1e-6)
+            self.on_progress(done, self.size, (done - self._resumed) / elapsed)
+
+    # Fetching
+
+    def _fetch(self, segment: Dict[str, int], validator: str) -> None:
+        """Fetch one range (or the whole file), resuming after errors."""
+        session = requests.Session()
+        attempt = 0
+        with open(self.part, "r+b") as f, open(self.part, "rb") as reader:
+            while self.size is None or segment["done"] < segment["end"] - segment["start"] + 1:
+                headers = {}
+                if self.ranged:
+                    headers["Range"] = f"bytes={segment['start'] + segment['done']}-{segment['end']}"
+                elif segment["done"]:
+                    # No ranges: start over
+                    with self._lock:
+                        segment["done"] = 0
+                        self._hasher, self._hashed = hashlib.sha256(), 0
+                    f.truncate(0)
+                try:
+                    with session.get(self.url, headers=headers, stream=True,
+                                     timeout=TIMEOUT) as resp:
+                        resp.raise_for_status()
+                        if self.ranged and resp.status_code != 206:
+                            raise DownloadError("server ignored the range request")
+                        f.seek(segment["start"] + segment["done"])
+                        for chunk in resp.iter_content(CHUNK_SIZE):
+                            if self.size is not None:
+                                room = segment["end"] - segment["start"] + 1 - segment["done"]
+                                chunk = chunk[:room]
+                            if not chunk:
+                                continue
+                            throttle(len(chunk), self.bucket)
+                            f.write(chunk)
+                            f.flush()
+                            with self._lock:
+                                segment["done"] += len(chunk)
+                                self._hash_prefix(reader)
+                                self._report(validator)
+                    if self.size is None:
+                        return  # unsized stream: EOF is the end
+                except (requests.RequestException, OSError) as e:
+                    attempt += 1
+                    if attempt >= SEGMENT_ATTEMPTS:
+                        raise DownloadError(f"range {segment['start']}-{segment['end']}: {e}") from e
+                    time.sleep(min(10, 2 ** attempt))
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Download, verify and move into place. Returns the path, size,
+        seconds, sha256, average bytes/s and how many bytes were resumed.
+        """
+        session = requests.Session()
+        self.url, self.size, self.ranged, validator = probe(session, self.url)
+        os.makedirs(os.path.dirname(os.path.abspath(self.dest)), exist_ok=True)
+
+        if not (self.ranged and self._load_state(validator)):
+            with open(self.part, "wb") as f:
+                if self.size:
+                    f.truncate(self.size)
+            if self.ranged:
+                self.segments = split_ranges(self.size, self.connections)
+            else:
+                self.segments = [{"start": 0, "end": (self.size or 0) - 1, "done": 0}]
+        self._resumed = self._done()
+        self._started = time.monotonic()
+        with open(self.part, "rb") as reader:
+            self._hash_prefix(reader)
+
+        pending = [s for s in self.segments
+                   if self.size is None or s["done"] < s["end"] - s["start"] + 1]
+        with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+            for future in [pool.submit(self._fetch, s, validator) for s in pending]:
+                future.result()
+
+        with open(self.part, "rb") as reader:
+            self._hash_prefix(reader)
+        self._report(validator, final=True)
+        seconds = time.monotonic() - self._started
+        size = self._done()
+        if self.size is not None and size != self.size:
+            raise DownloadError(f"got {size} of {self.size} bytes")
+
+        digest = self._hasher.hexdigest()
+        if self.expected_sha256 and digest != self.expected_sha256:
+            os.remove(self.part)
+            if os.path.exists(self.state_file):
+                os.remove(self.state_file)
+            raise DownloadError(f"SHA-256 mismatch: expected {self.expected_sha256}, got {digest}")
+
+        os.replace(self.part, self.dest)
+        if os.path.exists(self.state_file):
+            os.remove(self.state_file)
+        return {
+            "path": self.dest,
+            "bytes": size,
+            "seconds": seconds,
+            "sha256": digest,
+            "bytes_per_second": (size - self._resumed) / max(seconds, 1e-6),
+            "resumed_bytes": self._resumed,
+            "connections": len(pending),
+        }
+
+
+def download(url: str, dest: str, connections: int = CONNECTIONS,
+             on_progress: Optional[ProgressCallback] = None,
+             expected_sha256: Optional[str] = None,
+             bucket: Optional[TokenBucket] = None) -> Dict[str, Any]:
+    """
+    Download `url` to `dest` (see RangedDownload.run), within `bucket`
+    (default: the --max-bandwidth limit).
+    """
+    return RangedDownload(url, dest, connections, on_progress, expected_sha256,
+                          bucket).run()
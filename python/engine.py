@@ -0,0 +1,472 @@
+"""
+One asyncio install engine for every front end.
+
+The CLI (python/winget.py), the CustomTkinter GUI (python/gui.py) and the
+Tk installer (script/installer.py) used to run their own install loops.
+They now all hand the selected apps to InstallEngine and only translate
+its events into their own output, so concurrency, cancellation, history
+recording and backpressure live here.
+
+Events are plain dicts with a "type" plus the app, its 1-based "index",
+the batch "total", and overall "percent" / "eta" (python/progress.py):
+
+    queued       every app, before anything starts
+    started      winget launched for the app ("attempt", from 1)
+    output       a line of winget output ("stream", "text")
+    downloading  a progress redraw ("text", "fraction" of the download,
+                 "done_bytes" / "total_bytes" when winget shows sizes)
+    installing   the download is done and the installer runs
+    retrying     a transient failure ("attempt", "exit_code", "reason");
+                 the app runs again after "delay" seconds
+    done         success ("seconds", "bytes", "attempts")
+    failed       failure ("seconds", "exit_code", "error": stderr tail,
+                 "attempts")
+    timeout      a deadline expired and winget's process tree was killed
+                 ("seconds", "reason"); the batch moves on
+    cancelled    the app was skipped or stopped by cancel()
+    finished     the batch is over ("results": id -> bool, "timed_out":
+                 id -> reason, "retries": id -> {"attempts", "seconds"
+                 lost to failed attempts and backoff}, "concurrency":
+                 the adaptive limit after each adjustment or None,
+                 "seconds")
+
+Events are delivered in order through a bounded queue. Only progress
+redraws ("downloading") are dropped when the consumer falls behind;
+every other event waits for room, which in turn stops winget's pipes
+from being read until the consumer catches up.
+"""
+
+import asyncio
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+from python.cache import SUCCESS_CODES, InstallerCache, get_cache
+from python.config import (
+    ADAPTIVE_CONCURRENCY,
+    CONCURRENCY,
+    INSTALL_TIMEOUT,
+    STALL_TIMEOUT,
+)
+from python.history import load_history, record_run, save_history
+from python.procio import ProcessTimeout, Watchdog, stream_process
+from python.progress import WeightedProgress
+from python.session import ensure_source_session, record_overhead, source_args
+from python.throttle import AdaptiveSlots, ConcurrencyController
+
+# Events buffered between the engine and a slow consumer
+QUEUE_SIZE = 256
+# winget installs are serialised by Windows Installer, so one at a time
+# unless --concurrency says otherwise
+DEFAULT_CONCURRENCY = CONCURRENCY
+
+# winget exit codes a later attempt may well not hit again
+TRANSIENT_EXIT_CODES = {
+    0x8A150008: "download failed",
+    0x8A150011: "installer hash mismatch (stale CDN copy?)",
+    0x8A150101: "package in use",
+    0x8A150102: "another install in progress",
+    0x8A150103: "file in use",
+    0x8A150107: "no network",
+}
+# Attempts per app, and the backoff before attempt n + 1: a random delay
+# between half and all of min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2^(n-1))
+MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 15.0
+RETRY_MAX_DELAY = 120.0
+
+# Limits per install in seconds: each phase, the whole install ("total")
+# and the longest silence before the installer counts as hung ("stall").
+# --install-timeout / --stall-timeout change the last two for every app;
+# an apps.json entry can override any of them with "deadlines" in
+# minutes, e.g. {"install": 60}, null disabling that limit.
+DEFAULT_DEADLINES = {
+    "prepare": 5 * 60,
+    "download": 30 * 60,
+    "install": 30 * 60,
+    "total": 60 * 60,
+    "stall": 10 * 60,
+}
+
+# winget download progress, e.g. "12.5 MB / 48.0 MB" or "  ███▒▒  45%"
+_SIZE_RE = re.compile(r"([\d.]+)\s*(KB|MB|GB)\s*/\s*([\d.]+)\s*(KB|MB|GB)")
+_PERCENT_RE = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+_UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+_END = object()
+
+
+def parse_download_size(line: str):
+    """(done_bytes, total_bytes) from a winget progress line, else None."""
+    match = _SIZE_RE.search(line)
+    if not match:
+        return None
+    return (int(float(match.group(1)) * _UNITS[match.group(2)]),
+            int(float(match.group(3)) * _UNITS[match.group(4)]))
+
+
+def deadlines_for(app: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """Deadlines in seconds for one catalog app (see DEFAULT_DEADLINES)."""
+    limits: Dict[str, Optional[float]] = dict(DEFAULT_DEADLINES)
+    if INSTALL_TIMEOUT is not None:
+        limits["total"] = INSTALL_TIMEOUT
+    if STALL_TIMEOUT is not None:
+        limits["stall"] = STALL_TIMEOUT
+    for name, minutes in (app.get("deadlines") or {}).items():
+        if name in limits:
+            limits[name] = None if minutes is None else float(minutes) * 60
+    return limits
+
+
+def is_transient(code: Optional[int]) -> bool:
+    """True for winget exit codes worth retrying (see TRANSIENT_EXIT_CODES)."""
+    # Exit codes are DWORDs; normalise whatever sign the platform reports
+    return code is not None and (code & 0xFFFFFFFF) in TRANSIENT_EXIT_CODES
+
+
+def retry_delay(attempt: int) -> float:
+    """Backoff in seconds after failed attempt number `attempt` (from 1)."""
+    cap = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    return random.uniform(cap / 2, cap)
+
+
+def install_command(app: Dict[str, Any]) -> List[str]:
+    """The `winget install` command line for one catalog app."""
+    return [
+        "winget", "install", "-e", "--id", app["id"],
+        "--accept-source-agreements", "--accept-package-agreements",
+    ] + source_args()
+
+
+class InstallEngine:
+    """
+    Installs catalog apps with winget and reports progress as events.
+
+    `record` stores each run in the history (python/history.py); callers
+    that record runs themselves, like the planner, turn it off. `sizes`
+    (bytes per "app:<id>" key) helps weigh apps never installed before.
+    A caller-owned `progress` lets the overall percentage span more than
+    the apps (shell steps, for example). Transient winget failures are
+    retried up to `max_attempts` times in all. Installers come from
+    `cache` (default: the --cache-dir cache, python/cache.py) when set.
+    With `adaptive`, `concurrency` is only the ceiling: a controller in
+    python/throttle.py moves the number of running installs between 1
+    and it as throughput, CPU and disk load allow.
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY,
+                 history: Optional[Dict[str, Any]] = None,
+                 sizes: Optional[Dict[str, float]] = None,
+                 record: bool = True, queue_size: int = QUEUE_SIZE,
+                 progress: Optional[WeightedProgress] = None,
+                 max_attempts: int = MAX_ATTEMPTS,
+                 cache: Optional[InstallerCache] = None,
+                 adaptive: bool = ADAPTIVE_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self.adaptive = adaptive and self.concurrency > 1
+        self.controller: Optional[ConcurrencyController] = None
+        self.history = history if history is not None else load_history()
+        self.sizes = sizes
+        self.record = record
+        self.queue_size = queue_size
+        self.results: Dict[str, bool] = {}
+        self.timed_out: Dict[str, str] = {}
+        self.retries: Dict[str, Dict[str, float]] = {}
+        self.max_attempts = max(1, max_attempts)
+        self.progress = progress
+        self.cache = cache if cache is not None else get_cache()
+        self._own_progress = progress is None
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self._cancelled = False
+
+    # Event plumbing
+
+    def _event(self, kind: str, app: Dict[str, Any], index: int,
+               total: int, **fields: Any) -> Dict[str, Any]:
+        event = {"type": kind, "app": app, "index": index, "total": total,
+                 "key": f"app:{app['id']}"}
+        event.update(fields)
+        event["percent"] = self.progress.percent()
+        event["eta"] = self.progress.eta_text()
+        return event
+
+    async def _emit(self, event: Dict[str, Any]) -> None:
+        await self._queue.put(event)
+
+    def _offer(self, event: Dict[str, Any]) -> None:
+        """Queue a progress redraw unless the consumer is behind."""
+        if not self._queue.full():
+            self._queue.put_nowait(event)
+
+    # Installing
+
+    async def _install(self, app: Dict[str, Any], index: int, total: int,
+                       slots: Union[asyncio.Semaphore, AdaptiveSlots]) -> None:
+        """
+        Install one app, retrying transient winget failures. While a retry
+        waits out its backoff the slot is free, so other installs go on.
+        """
+        key = f"app:{app['id']}"
+        attempt = 1
+        while True:
+            outcome = await self._attempt(app, index, total, slots, attempt)
+            if outcome is None:
+                return  # cancelled or timed out, already reported
+            code, error, seconds, size = outcome
+            if (code != 0 and is_transient(code) and attempt < self.max_attempts
+                    and not self._cancelled):
+                delay = retry_delay(attempt)
+                retry = self.retries.setdefault(app["id"], {"attempts": 1, "seconds": 0.0})
+                retry["seconds"] += seconds + delay
+                await self._emit(self._event(
+                    "retrying", app, index, total, attempt=attempt,
+                    exit_code=code, reason=TRANSIENT_EXIT_CODES[code & 0xFFFFFFFF],
+                    delay=delay,
+                ))
+                await asyncio.sleep(delay)
+                attempt += 1
+                retry["attempts"] = attempt
+                continue
+
+            ok = code == 0
+            self.results[app["id"]] = ok
+            self.progress.finish(key)
+            if ok:
+                await self._emit(self._event("done", app, index, total, seconds=seconds,
+                                             bytes=size, attempts=attempt))
+            else:
+                await self._emit(self._event("failed", app, index, total, seconds=seconds,
+                                             exit_code=code, error=error, attempts=attempt))
+            return
+
+    async def _attempt(self, app: Dict[str, Any], index: int, total: int,
+                       slots: Union[asyncio.Semaphore, AdaptiveSlots], attempt: int) -> Optional[tuple]:
+        """
+        One winget run: (exit code, stderr tail, seconds, bytes), or None
+        when it was cancelled or timed out (reported here).
+        """
+        key = f"app:{app['id']}"
+        async with slots:
+            if self._cancelled:
+                self.results[app["id"]] = False
+                await self._emit(self._event("cancelled", app, index, total))
+                return None
+
+            await self._emit(self._event("started", app, index, total, attempt=attempt))
+            started = time.perf_counter()
+            state = {"found": False, "installing": False, "bytes": None, "done": 0}
+            limits = deadlines_for(app)
+            watchdog = Watchdog(total=limits.pop("total"),
+                                stall=limits.pop("stall"), phases=limits)
+            watchdog.enter("prepare")
+
+            def on_frame(name: str, line: str):
+                text = line.strip()
+                if len(text) <= 1:  # blank lines and spinner frames
+                    return None
+                if name == "stdout" and not state["found"] and text.startswith("Found "):
+                    state["found"] = True
+                    record_overhead(time.perf_counter() - started)
+
+                size = parse_download_size(text)
+                percent = _PERCENT_RE.search(text)
+                if not state["installing"] and text.startswith("Downloading"):
+                    watchdog.enter("download")
+                if not state["installing"] and (size or percent):
+                    watchdog.enter("download")
+                    fields = {"text": text}
+                    if size:
+                        if self.controller and size[0] > state["done"]:
+                            self.controller.record_bytes(size[0] - state["done"])
+                        state["bytes"], state["done"] = size[1], size[0]
+                        fields.update(done_bytes=size[0], total_bytes=size[1],
+                                      fraction=size[0] / size[1] if size[1] else 0.0)
+                        self.progress.update(key, done_bytes=size[0], total_bytes=size[1])
+                    else:
+                        fields["fraction"] = min(1.0, float(percent.group(1)) / 100)
+                        self.progress.update(key, download_fraction=fields["fraction"])
+                    self._offer(self._event("downloading", app, index, total, **fields))
+                    return None
+
+                if not state["installing"] and "starting package install" in text.lower():
+                    state["installing"] = True
+                    watchdog.enter("install")
+                    return self._emit_all([
+                        self._event("output", app, index, total, stream=name, text=text),
+                        self._event("installing", app, index, total),
+                    ])
+                return self._emit(self._event("output", app, index, total,
+                                              stream=name, text=text))
+
+            try:
+                command = install_command(app)
+                cached = None
+                stall = watchdog.stall
+                if self.cache:
+                    cached = await self.cache.prepare(
+                        app, on_frame, watchdog=watchdog,
+                        note=lambda text: self._emit(self._event(
+                            "output", app, index, total, stream="stdout", text=text)),
+                    )
+                if cached:
+                    # The installer runs by itself, silently: no winget
+                    # output to watch for, so no stall limit either
+                    command = cached
+                    state["installing"] = True
+                    watchdog.enter("install")
+                    watchdog.stall = None
+                    await self._emit(self._event("installing", app, index, total))
+                code, error = await stream_process(command, on_frame, watchdog=watchdog)
+                if cached and code in SUCCESS_CODES:
+                    code = 0
+                    if not await self.cache.registered(app):
+                        await self._emit(self._event(
+                            "output", app, index, total, stream="stdout",
+                            text="[CACHE] winget does not list it after the cached "
+                                 "install; installing with winget"))
+                        watchdog.stall = stall
+                        code, error = await stream_process(
+                            install_command(app), on_frame, watchdog=watchdog)
+            except OSError as e:
+                code, error = None, str(e)
+            except ProcessTimeout as e:
+                seconds = time.perf_counter() - started
+                self.results[app["id"]] = False
+                self.timed_out[app["id"]] = e.reason
+                if self.record:
+                    record_run(self.history, key, seconds, False, state["bytes"])
+                    save_history(self.history)
+                self.progress.finish(key)
+                await self._emit(self._event("timeout", app, index, total,
+                                             seconds=seconds, reason=e.reason))
+                return None
+            except asyncio.CancelledError:
+                self.results[app["id"]] = False
+                self.progress.finish(key)
+                await self._emit(self._event("cancelled", app, index, total))
+                return None
+
+            seconds = time.perf_counter() - started
+            if self.record:
+                record_run(self.history, key, seconds, code == 0, state["bytes"])
+                save_history(self.history)
+            return code, error, seconds, state["bytes"]
+
+    async def _emit_all(self, events: List[Dict[str, Any]]) -> None:
+        for event in events:
+            await self._emit(event)
+
+    async def _run_all(self, apps: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        total = len(apps)
+        try:
+            for index, app in enumerate(apps, start=1):
+                await self._emit(self._event("queued", app, index, total))
+            # Refresh the source once, off the loop, so every install (and
+            # the cache's winget calls) can pin it without blocking
+            if apps:
+                await asyncio.get_running_loop().run_in_executor(None, ensure_source_session)
+            adjuster = None
+            if self.adaptive:
+                slots = AdaptiveSlots(1)
+                self.controller = ConcurrencyController(slots, self.concurrency)
+                adjuster = asyncio.ensure_future(self.controller.run())
+            else:
+                slots = asyncio.Semaphore(self.concurrency)
+            self._tasks = [
+                asyncio.ensure_future(self._install(app, index, total, slots))
+                for index, app in enumerate(apps, start=1)
+            ]
+            try:
+                outcomes = await asyncio.gather(*self._tasks, return_exceptions=True)
+            finally:
+                if adjuster:
+                    adjuster.cancel()
+                    await asyncio.gather(adjuster, return_exceptions=True)
+            for index, (app, outcome) in enumerate(zip(apps, outcomes), start=1):
+                # A bug outside winget (cache, metadata...) fails only its app
+                if isinstance(outcome, Exception) and app["id"] not in self.results:
+                    self.results[app["id"]] = False
+                    self.progress.finish(f"app:{app['id']}")
+                    await self._emit(self._event(
+                        "failed", app, index, total, seconds=0.0, exit_code=None,
+                        error=f"{type(outcome).__name__}: {outcome}", attempts=1,
+                    ))
+            for index, app in enumerate(apps, start=1):
+                if app["id"] not in self.results:  # cancelled while waiting
+                    self.results[app["id"]] = False
+                    await self._emit(self._event("cancelled", app, index, total))
+            await self._emit({
+                "type": "finished", "results": dict(self.results),
+                "timed_out": dict(self.timed_out),
+                "retries": {k: dict(v) for k, v in self.retries.items()},
+                "concurrency": ([step["next"] for step in self.controller.history]
+                                if self.controller else None),
+                "seconds": time.perf_counter() - started, "total": total,
+                "percent": self.progress.percent(), "eta": self.progress.eta_text(),
+            })
+        except BaseException:
+            # The consumer has gone away; don't wait on a full queue
+            if not self._queue.full():
+                self._queue.put_nowait(_END)
+            raise
+        await self._queue.put(_END)
+
+    async def events(self, apps: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Install `apps` (section toggles skipped) and yield their events."""
+        apps = [a for a in apps if not a.get("is_section_toggle")]
+        self.results = {}
+        self.timed_out = {}
+        self.retries = {}
+        self._cancelled = False
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if self._own_progress:
+            self.progress = WeightedProgress.for_steps(
+                [f"app:{app['id']}" for app in apps], self.history, self.sizes
+            )
+
+        producer = asyncio.ensure_future(self._run_all(apps))
+        try:
+            while True:
+                event = await self._queue.get()
+                if event is _END:
+                    break
+                yield event
+        finally:
+            if not producer.done():
+                self._cancel_now()
+                producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+    def _cancel_now(self) -> None:
+        self._cancelled = True
+        for task in self._tasks:
+            task.cancel()
+
+    def cancel(self) -> None:
+        """Stop running installs and skip queued ones; safe from any thread."""
+        self._cancelled = True
+        if self._loop and not self._loop.is_closed():
+            try:
+                self._loop.call_soon_threadsafe(self._cancel_now)
+            except RuntimeError:  # the loop closed in between
+                pass
+
+    def run(self, apps: List[Dict[str, Any]],
+            on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, bool]:
+        """
+        Blocking front-end adapter: install `apps`, pass each event to
+        `on_event` (called on a worker thread, in order), return id -> success.
+        """
+        async def consume() -> None:
+            loop = asyncio.get_running_loop()
+            async for event in self.events(apps):
+                if on_event:
+                    await loop.run_in_executor(None, on_event, event)
+
+        asyncio.run(consume())
+        return dict(self.results)
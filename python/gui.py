@@ -2,9 +2,10 @@ import customtkinter as ctk
 import threading
 from typing import List, Dict, Any
 from python.apps import load_apps
+from python.mirrors import catalog_reachable
+from python.planner import run_all_steps as plan_run_all_steps
 from python.shells import load_shells, configure_shell
 from python.winget import install_winget, install_apps
-from python.check_network import internet_on
 import python.config as config
 
 ctk.set_appearance_mode("dark")
@@ -135,7 +136,7 @@ class SetupApp(ctk.CTk):
         self.minsize(600, 500)
 
         # Mode detection
-        self.online_mode = internet_on(url=config.APPS_JSON_URL)
+        self.online_mode = catalog_reachable(config.APPS_JSON_URL)
         mode_text = "🌐 ONLINE" if self.online_mode else "💾 LOCAL"
 
         # ===== HEADER =====
@@ -152,7 +153,12 @@ class SetupApp(ctk.CTk):
             font=("Helvetica", 11),
             text_color="gray",
         )
-        self.status_label.pack(pady=(0, 15))
+        self.status_label.pack(pady=(0, 5))
+
+        # Overall progress of running installs (weighted by expected time)
+        self.progress_bar = ctk.CTkProgressBar(main_container)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(fill="x", padx=40, pady=(0, 10))
 
         # ===== TABS =====
         self.tabview = ctk.CTkTabview(main_container)
@@ -512,17 +518,51 @@ class SetupApp(ctk.CTk):
                 if a["id"] in selected_ids and not a.get("is_section_toggle")
             ]
 
-            install_apps(selected_apps)
-            self.status_label.configure(
-                text="✅ Apps installed successfully!",
-                text_color="green"
-            )
+            hung = []
+
+            def on_event(event):
+                if event["type"] == "timeout":
+                    hung.append(event["app"]["name"])
+                self._on_install_event(event)
+
+            install_apps(selected_apps, on_event=on_event)
+            # Queued behind any pending progress updates
+            if hung:
+                self.after(0, lambda: self.status_label.configure(
+                    text=f"⚠️ Done, but timed out: {', '.join(hung)}",
+                    text_color="orange"
+                ))
+            else:
+                self.after(0, lambda: self.status_label.configure(
+                    text="✅ Apps installed successfully!",
+                    text_color="green"
+                ))
 
         except Exception as e:
             self.status_label.configure(
                 text=f"❌ Error: {str(e)}", text_color="red"
             )
 
+    def _on_install_event(self, event: Dict[str, Any]):
+        """Show install engine events (python/engine.py) in the status bar."""
+        kind = event["type"]
+        name = event["app"]["name"] if "app" in event else ""
+        if kind == "started":
+            text = f"⏳ Installing {name}..."
+        elif kind == "downloading":
+            text = f"⏳ Downloading {name} {event['fraction'] * 100:.0f}%..."
+        elif kind == "installing":
+            text = f"⏳ Running {name} installer..."
+        elif kind == "failed":
+            text = f"⚠️ {name} failed, continuing..."
+        elif kind == "retrying":
+            text = f"🔁 {name}: {event['reason']}, retrying in {event['delay']:.0f}s..."
+        elif kind == "timeout":
+            text = f"⚠️ {name} hung and was stopped, continuing..."
+        else:
+            return
+        self.show_progress(event["percent"], f"{text} {event['eta']}")
+
     def configure_selected_shells(self):
         """Thread-safe shell configuration."""
         selected = [
@@ -576,32 +616,45 @@ class SetupApp(ctk.CTk):
     def _all_steps_worker(self):
         """Background worker for all steps."""
         try:
-            self.status_label.configure(text="⏳ Running all steps...")
+            self.status_label.configure(
+                text="⏳ Resuming the last run..." if config.RESUME
+                else "⏳ Running all steps..."
+            )
 
-            install_winget()
             apps = load_apps(self.online_mode)
-            install_apps([a for a in apps if not a.get("is_section_toggle")])
-
             shells_data = load_shells(self.online_mode)
             if isinstance(shells_data, dict) and "shells" in shells_data:
                 shells = shells_data["shells"]
             else:
                 shells = shells_data
 
-            for shell in shells:
-                if not shell.get("hidden") and shell.get("id") != "all":
-                    configure_shell(shell["id"])
+            plan_run_all_steps(
+                apps,
+                shells,
+                on_update=lambda percent, eta, step: self.show_progress(
+                    percent, f"⏳ {step['label']}... {eta}"
+                ),
+            )
 
-            self.status_label.configure(
+            # Queued behind any pending progress updates
+            self.after(0, lambda: self.status_label.configure(
                 text="✅ All steps completed!",
                 text_color="green"
-            )
+            ))
 
         except Exception as e:
             self.status_label.configure(
                 text=f"❌ Error: {str(e)}", text_color="red"
             )
 
+    def show_progress(self, percent: float, text: str):
+        """Update the progress bar and status from a worker thread."""
+        def apply():
+            self.progress_bar.set(percent / 100)
+            self.status_label.configure(text=f"{text} ({percent:.0f}%)")
+
+        self.after(0, apply)
+
     def show_error(self, message: str):
         """Show error popup."""
         error_window = ctk.CTkToplevel(self)
@@ -0,0 +1,82 @@
+"""
+Local history of past setup steps.
+
+Every planned step (winget, an app install, a shell configuration) records
+how long it took and, for installs, how many bytes winget downloaded. The
+planner uses the median of recent successful runs as its estimate, so
+ordering and the predicted finish time improve with every run.
+
+Stored as JSON under DOTFILE_ROOT/history/steps.json.
+"""
+
+import json
+import os
+import statistics
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from python.config import DOTFILE_ROOT
+from python.rcfile import atomic_write_text
+
+HISTORY_FILE = os.path.join(DOTFILE_ROOT, "history", "steps.json")
+
+# Runs kept per step
+SAMPLE_LIMIT = 10
+
+# For steps whose size is known but duration is not: download time at
+# this rate on top of the caller's default cost
+ASSUMED_BYTES_PER_SECOND = 10 * 1024 * 1024
+
+
+def load_history() -> Dict[str, Any]:
+    """Read the history file; an empty history if missing or unreadable."""
+    try:
+        with open(HISTORY_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {"steps": {}}
+    data.setdefault("steps", {})
+    return data
+
+
+def save_history(history: Dict[str, Any]) -> None:
+    atomic_write_text(HISTORY_FILE, json.dumps(history, indent=2))
+
+
+def record_run(history: Dict[str, Any], key: str, seconds: float,
+               ok: bool, size: Optional[int] = None) -> None:
+    """Append one run of step `key` (e.g. "app:Git.Git") to `history`."""
+    runs = history["steps"].setdefault(key, [])
+    runs.append({
+        "when": datetime.now().isoformat(timespec="seconds"),
+        "seconds": round(seconds, 2),
+        "bytes": size,
+        "ok": ok,
+    })
+    del runs[:-SAMPLE_LIMIT]
+
+
+def estimate(history: Dict[str, Any], key: str) -> Dict[str, Optional[float]]:
+    """
+    Median duration and download size of past successful runs of `key`.
+
+    Either value is None when no successful run recorded it.
+    """
+    runs = [r for r in history["steps"].get(key, []) if r.get("ok")]
+    seconds = [r["seconds"] for r in runs if r.get("seconds") is not None]
+    sizes = [r["bytes"] for r in runs if r.get("bytes")]
+    return {
+        "seconds": statistics.median(seconds) if seconds else None,
+        "bytes": statistics.median(sizes) if sizes else None,
+    }
+
+
+def expected_seconds(history: Dict[str, Any], key: str, default: float) -> float:
+    """
+    Best guess of how long step `key` takes: the recorded median, else
+    `default` plus the download time of its recorded size.
+    """
+    past = estimate(history, key)
+    if past["seconds"] is not None:
+        return past["seconds"]
+    return default + (past["bytes"] or 0) / ASSUMED_BYTES_PER_SECOND
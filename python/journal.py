@@ -0,0 +1,108 @@
+"""
+Crash-safe journal of "run all steps".
+
+Each run appends one JSON line per event to DOTFILE_ROOT/journal/last_run.jsonl:
+the planned step keys first ("winget", "app:<id>", "shell:<id>"), then
+every step start and outcome, then an end marker. Each line is flushed
+and fsynced before the step goes on, so after a crash, a closed window
+or a reboot the journal still says which steps finished.
+
+With --resume the next run reads it back and skips the steps that
+completed, continuing from the first incomplete one. A half-written last
+line (the crash hit mid-write) is ignored.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from python.config import DOTFILE_ROOT
+
+JOURNAL_FILE = os.path.join(DOTFILE_ROOT, "journal", "last_run.jsonl")
+
+# Step outcomes written to the journal; only "done" is skipped on resume
+OUTCOMES = ("done", "failed", "timed_out", "skipped")
+
+
+class RunJournal:
+    """Append-only, fsynced journal of one run (see module docstring)."""
+
+    def __init__(self, path: str = JOURNAL_FILE):
+        self.path = path
+
+    def _append(self, record: Dict[str, Any], mode: str = "a") -> None:
+        record["when"] = datetime.now().isoformat(timespec="seconds")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, mode, encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def begin(self, steps: Iterable[str]) -> None:
+        """Start a fresh journal for a run of `steps`."""
+        self._append({"event": "plan", "steps": list(steps)}, mode="w")
+
+    def resume(self, steps: Iterable[str]) -> None:
+        """Continue the existing journal with the steps still to run."""
+        self._append({"event": "resume", "steps": list(steps)})
+
+    def start(self, step: str) -> None:
+        self._append({"event": "start", "step": step})
+
+    def outcome(self, step: str, state: str) -> None:
+        """Record how `step` ended: one of OUTCOMES."""
+        self._append({"event": state, "step": step})
+
+    def end(self) -> None:
+        self._append({"event": "end"})
+
+
+def load_journal(path: str = JOURNAL_FILE) -> Optional[Dict[str, Any]]:
+    """
+    Replay a journal: the planned steps, the last outcome of each step
+    and whether the run reached its end. None if there is no journal.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    steps: List[str] = []
+    status: Dict[str, str] = {}
+    finished = False
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue  # torn write at the crash
+        event = record.get("event")
+        if event == "plan":
+            steps, status, finished = list(record.get("steps", [])), {}, False
+        elif event == "start":
+            status[record["step"]] = "started"
+            finished = False
+        elif event in OUTCOMES:
+            status[record["step"]] = event
+        elif event == "end":
+            finished = True
+    return {"steps": steps, "status": status, "finished": finished}
+
+
+def completed_steps(path: str = JOURNAL_FILE) -> Set[str]:
+    """Steps the last journaled run completed; empty if there is none."""
+    journal = load_journal(path)
+    if journal is None:
+        return set()
+    return {step for step, state in journal["status"].items() if state == "done"}
+
+
+def describe_resume(done: Set[str], steps: Iterable[str]) -> str:
+    """One line for the user about what a resumed run will skip."""
+    steps = list(steps)
+    skipped = [step for step in steps if step in done]
+    if not skipped:
+        return "Nothing to resume from the last run; running every step"
+    return (f"Resuming: skipping {len(skipped)} step(s) completed last run, "
+            f"{len(steps) - len(skipped)} to go")
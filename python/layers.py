@@ -0,0 +1,182 @@
+"""
+Layered app catalogs.
+
+json/apps.json is the base layer. Org, team and personal additions are
+overlay files applied on top of it in order, so nobody has to fork the
+base catalog: every --catalog PATH_OR_URL (repeatable), then the user
+layer DOTFILE_ROOT/apps.user.json if it exists.
+
+An overlay is either a plain list of sections like apps.json, or
+
+    {
+      "name": "team-web",
+      "sections": [
+        {"section": "Browsers", "apps": [{"name": "Opera", "id": "Opera.Opera"}]},
+        {"section": "Games", "remove": true}
+      ],
+      "remove": ["Mozilla.Firefox"]
+    }
+
+An app whose id already exists replaces the earlier entry, moving to the
+overlay's section if that differs; new ids are appended to their section,
+and new sections to the catalog. "remove" drops app ids wherever they
+are; a section with "remove": true is dropped with its apps.
+
+The merged and validated sections are cached in DOTFILE_ROOT/catalog,
+keyed by the hashes of all layers in order, so a start where no layer
+changed skips merging and validation.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from python.config import CATALOG_LAYERS, DOTFILE_ROOT
+from python.rcfile import atomic_write_text
+
+USER_LAYER = os.path.join(DOTFILE_ROOT, "apps.user.json")
+INDEX_FILE = os.path.join(DOTFILE_ROOT, "catalog", "merged_index.json")
+# Bump when the merge rules change, so old indexes are not reused
+INDEX_FORMAT = 1
+
+Layer = Tuple[str, Any]  # (source name, parsed content)
+
+
+def layer_sources(extra: Optional[List[str]] = None) -> List[str]:
+    """Overlay sources in order: --catalog ones, then the user layer."""
+    sources = list(CATALOG_LAYERS if extra is None else extra)
+    if os.path.exists(USER_LAYER):
+        sources.append(USER_LAYER)
+    return sources
+
+
+def read_layer(source: str) -> Any:
+    """Parsed overlay from a local path or an http(s) URL."""
+    if source.startswith(("http://", "https://")):
+        from python.mirrors import conditional_fetch
+        return json.loads(conditional_fetch(source, timeout=5))
+    with open(source, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def layer_hash(content: Any) -> str:
+    data = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def index_key(layers: List[Layer]) -> str:
+    """Cache key of a layer stack: every layer's hash, in order."""
+    digest = hashlib.sha256(f"format {INDEX_FORMAT}".encode("utf-8"))
+    for name, content in layers:
+        digest.update(f"\n{name}\n{layer_hash(content)}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _overlay_parts(name: str, content: Any) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """(sections, removed app ids) of one layer, whichever form it has."""
+    if isinstance(content, list):
+        return content, []
+    if isinstance(content, dict):
+        sections = content.get("sections", [])
+        removed = content.get("remove", [])
+        if isinstance(sections, list) and isinstance(removed, list):
+            return sections, removed
+    raise ValueError(f"Catalog layer {name}: expected a list of sections or "
+                     f"an object with 'sections' / 'remove'")
+
+
+def validate_layer(name: str, content: Any) -> None:
+    """Raise ValueError if `content` is not a usable layer."""
+    overlay, removed = _overlay_parts(name, content)
+    if not all(isinstance(app_id, str) for app_id in removed):
+        raise ValueError(f"Catalog layer {name}: 'remove' must list app ids")
+    for section in overlay:
+        if not isinstance(section, dict) or not section.get("section"):
+            raise ValueError(f"Catalog layer {name}: invalid section object: {section}")
+        if section.get("remove"):
+            continue
+        if not isinstance(section.get("apps", []), list):
+            raise ValueError(f"Catalog layer {name}: 'apps' of {section['section']} must be a list")
+        for app in section.get("apps", []):
+            if not isinstance(app, dict) or not app.get("id") or not app.get("name"):
+                raise ValueError(f"Catalog layer {name}: app needs 'name' and 'id': {app}")
+
+
+def merge(layers: List[Layer]) -> List[Dict[str, Any]]:
+    """Apply `layers` (the first being the base catalog) in order."""
+    sections: Dict[str, List[Dict[str, Any]]] = {}  # insertion order = catalog order
+    where: Dict[str, str] = {}  # app id -> section
+
+    for name, content in layers:
+        validate_layer(name, content)
+        overlay, removed = _overlay_parts(name, content)
+        for app_id in removed:
+            section = where.pop(app_id, None)
+            if section is not None:
+                sections[section] = [a for a in sections[section] if a.get("id") != app_id]
+
+        for section in overlay:
+            title = section["section"]
+            if section.get("remove"):
+                for app in sections.pop(title, []):
+                    where.pop(app.get("id"), None)
+                continue
+            apps = sections.setdefault(title, [])
+            for app in section.get("apps", []):
+                previous = where.get(app["id"])
+                if previous == title:
+                    apps[:] = [app if a["id"] == app["id"] else a for a in apps]
+                    continue
+                if previous is not None:
+                    sections[previous] = [a for a in sections[previous] if a["id"] != app["id"]]
+                apps.append(app)
+                where[app["id"]] = title
+
+    return [{"section": title, "apps": apps} for title, apps in sections.items() if apps]
+
+
+def _load_index(key: str) -> Optional[List[Dict[str, Any]]]:
+    try:
+        with open(INDEX_FILE, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return index.get("sections") if index.get("key") == key else None
+
+
+def merged_sections(base: Any, sources: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    The base catalog with every overlay applied, from the merged index
+    when no layer changed since it was built.
+    """
+    layers: List[Layer] = [("base", base)]
+    for source in layer_sources(sources):
+        try:
+            content = read_layer(source)
+        except Exception as e:
+            print(f"[WARN] Skipping catalog layer {source}: {e}")
+            continue
+        try:
+            validate_layer(source, content)
+        except ValueError as e:
+            print(f"[WARN] {e}; skipping it")
+            continue
+        layers.append((source, content))
+    if len(layers) == 1:
+        return base
+
+    key = index_key(layers)
+    cached = _load_index(key)
+    if cached is not None:
+        print(f"[DEBUG] Catalog: {len(layers)} layer(s) unchanged, using merged index")
+        return cached
+
+    sections = merge(layers)
+    atomic_write_text(INDEX_FILE, json.dumps({
+        "format": INDEX_FORMAT, "key": key,
+        "layers": [name for name, _ in layers], "sections": sections,
+    }, ensure_ascii=False))
+    print(f"[DEBUG] Catalog: merged {len(layers)} layer(s) into "
+          f"{sum(len(s['apps']) for s in sections)} app(s)")
+    return sections
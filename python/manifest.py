@@ -0,0 +1,294 @@
+"""
+Catalog version manifest and per-section deltas.
+
+json/manifest.json is published next to the catalogs. It lists every
+catalog's SHA-256, size and, where the file has them, its `version` and
+`lastUpdated`. Clients fetch only the manifest and keep their cached copy
+of a catalog while its hash is unchanged.
+
+Mirrors started with `python main.py serve` go further: their manifest
+(built on the fly) also lists one hash per part of each catalog (every
+section of apps.json, every top-level key of shells.json) and serves the
+parts content-addressed as json/parts/<sha256>.json. A client rebuilds a
+changed catalog from the parts it already has and fetches only the
+missing ones, so a one-line change in apps.json costs one section.
+
+`python main.py manifest` regenerates json/manifest.json after the
+catalogs were edited (whole-file hashes only, as raw.githubusercontent
+cannot serve parts); `--check` fails if it is out of date. A catalog
+download that does not match the manifest is never used: the next mirror
+is tried, then the last good cached copy is kept.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from python.config import BASE_DIR, DOTFILE_ROOT, GITHUB_BASE
+from python.rcfile import atomic_write_text
+
+MANIFEST_NAME = "manifest.json"
+PARTS_DIR = "parts"
+FORMAT = 1
+
+# Client-side copies: <catalog> plus <catalog>.json (its hash), parts/
+CATALOG_CACHE = os.path.join(DOTFILE_ROOT, "catalog")
+
+_lock = threading.Lock()
+_built: Dict[str, Tuple[Tuple[int, int], Dict[str, Any], Dict[str, bytes]]] = {}
+
+
+def canonical(value: Any) -> bytes:
+    """Stable bytes for one part: the form that is hashed and served."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"),
+                      sort_keys=True).encode("utf-8")
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_sha256(raw: bytes) -> str:
+    """Hash of a catalog file, the same for CRLF (autocrlf) and LF checkouts."""
+    return sha256(raw.replace(b"\r\n", b"\n"))
+
+
+def split_parts(document: Any) -> Tuple[str, Any]:
+    """("list", [part, ...]) or ("object", {key: part}); ("whole", None) otherwise."""
+    if isinstance(document, list):
+        return "list", list(document)
+    if isinstance(document, dict):
+        return "object", dict(document)
+    return "whole", None
+
+
+def describe(path: str, parts: bool = False) -> Tuple[Dict[str, Any], Dict[str, bytes]]:
+    """Manifest entry for one catalog file, plus its parts by hash if `parts`."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    entry: Dict[str, Any] = {"sha256": file_sha256(raw),
+                             "size": len(raw.replace(b"\r\n", b"\n"))}
+    document = json.loads(raw)
+    if isinstance(document, dict):
+        for field in ("version", "lastUpdated"):
+            if field in document:
+                entry[field] = document[field]
+    blobs: Dict[str, bytes] = {}
+    if parts:
+        layout, pieces = split_parts(document)
+        if layout == "list":
+            hashes: Any = []
+            for piece in pieces:
+                data = canonical(piece)
+                blobs[sha256(data)] = data
+                hashes.append(sha256(data))
+        elif layout == "object":
+            hashes = {}
+            for key, piece in pieces.items():
+                data = canonical(piece)
+                blobs[sha256(data)] = data
+                hashes[key] = sha256(data)
+        if layout != "whole":
+            entry["layout"] = layout
+            entry["parts"] = hashes
+    return entry, blobs
+
+
+def catalog_files(root: str = BASE_DIR) -> List[str]:
+    folder = os.path.join(root, "json")
+    return sorted(name for name in os.listdir(folder)
+                  if name.endswith(".json") and name != MANIFEST_NAME)
+
+
+def build_manifest(root: str = BASE_DIR, parts: bool = False) -> Dict[str, Any]:
+    """The manifest for `root`'s json/ (with part hashes if `parts`)."""
+    files = {}
+    for name in catalog_files(root):
+        files[name], _ = _described(os.path.join(root, "json", name), parts)
+    manifest: Dict[str, Any] = {"format": FORMAT, "files": files}
+    if parts:
+        manifest["parts"] = f"{PARTS_DIR}/"
+    return manifest
+
+
+def _described(path: str, parts: bool) -> Tuple[Dict[str, Any], Dict[str, bytes]]:
+    """describe(), cached until the file's size or mtime changes."""
+    stat = os.stat(path)
+    key = f"{path}|{parts}"
+    with _lock:
+        cached = _built.get(key)
+        if cached and cached[0] == (stat.st_size, stat.st_mtime_ns):
+            return cached[1], cached[2]
+    entry, blobs = describe(path, parts)
+    with _lock:
+        _built[key] = ((stat.st_size, stat.st_mtime_ns), entry, blobs)
+    return entry, blobs
+
+
+def part_blob(root: str, digest: str) -> Optional[bytes]:
+    """A served part by hash (for `serve`), or None."""
+    for name in catalog_files(root):
+        _, blobs = _described(os.path.join(root, "json", name), True)
+        if digest in blobs:
+            return blobs[digest]
+    return None
+
+
+def manifest_text(manifest: Dict[str, Any]) -> str:
+    return json.dumps(manifest, indent=2, ensure_ascii=False) + "\n"
+
+
+def write_manifest(root: str = BASE_DIR, check: bool = False) -> bool:
+    """
+    Regenerate json/manifest.json; with `check`, only report whether it
+    is current. True when the file is (now) up to date.
+    """
+    path = os.path.join(root, "json", MANIFEST_NAME)
+    expected = build_manifest(root)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            current = json.load(f)
+    except (OSError, ValueError):
+        current = None
+    if current is not None and current.get("files") == expected["files"]:
+        print(f"[OK] {MANIFEST_NAME} is up to date ({len(expected['files'])} catalog(s))")
+        return True
+    if check:
+        print(f"[ERROR] {MANIFEST_NAME} is out of date; run: python main.py manifest")
+        return False
+    expected["generated"] = datetime.now().isoformat(timespec="seconds")
+    atomic_write_text(path, manifest_text(expected))
+    print(f"[OK] Wrote {path}")
+    return True
+
+
+# Client side
+
+
+def _cached(name: str) -> Tuple[Optional[str], Optional[bytes]]:
+    """(manifest hash of the cached copy, its bytes) for catalog `name`."""
+    try:
+        with open(os.path.join(CATALOG_CACHE, name + ".json"), "r", encoding="utf-8") as f:
+            digest = json.load(f).get("sha256")
+        with open(os.path.join(CATALOG_CACHE, name), "rb") as f:
+            return digest, f.read()
+    except (OSError, ValueError):
+        return None, None
+
+
+def _store(name: str, digest: str, data: bytes) -> None:
+    os.makedirs(CATALOG_CACHE, exist_ok=True)
+    tmp = os.path.join(CATALOG_CACHE, f"{name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, os.path.join(CATALOG_CACHE, name))
+    atomic_write_text(os.path.join(CATALOG_CACHE, name + ".json"),
+                      json.dumps({"sha256": digest}))
+
+
+def _seed_parts(document: Any) -> None:
+    """Keep the parts of a fully downloaded catalog for later delta updates."""
+    layout, pieces = split_parts(document)
+    if layout == "whole":
+        return
+    folder = os.path.join(CATALOG_CACHE, PARTS_DIR)
+    os.makedirs(folder, exist_ok=True)
+    for piece in (pieces if layout == "list" else pieces.values()):
+        data = canonical(piece)
+        path = os.path.join(folder, sha256(data) + ".json")
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(data)
+
+
+def _part(digest: str, fetch) -> Tuple[Any, int]:
+    """
+    (part, bytes fetched): from the local part store, else from the
+    mirror, verified against its hash.
+    """
+    path = os.path.join(CATALOG_CACHE, PARTS_DIR, digest + ".json")
+    try:
+        with open(path, "rb") as f:
+            return json.loads(f.read()), 0
+    except (OSError, ValueError):
+        pass
+    data, _ = fetch(f"{GITHUB_BASE}/{PARTS_DIR}/{digest}.json")
+    if sha256(data) != digest:
+        raise ValueError(f"part {digest[:12]} does not match its hash")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return json.loads(data), len(data)
+
+
+def _assemble(entry: Dict[str, Any], fetch) -> Tuple[Any, int, int]:
+    """(document, parts fetched, bytes fetched) rebuilt from its parts."""
+    fetched = size = 0
+    if entry["layout"] == "list":
+        document: Any = []
+        for digest in entry["parts"]:
+            part, got = _part(digest, fetch)
+            document.append(part)
+            fetched, size = fetched + bool(got), size + got
+    else:
+        document = {}
+        for key, digest in entry["parts"].items():
+            document[key], got = _part(digest, fetch)
+            fetched, size = fetched + bool(got), size + got
+    return document, fetched, size
+
+
+def fetch_catalog(url: str, fetch) -> Any:
+    """
+    The catalog at `url` (under GITHUB_BASE), downloaded only if the
+    manifest says the cached copy is stale. `fetch(url, accept=None)`
+    returns (bytes, source) from the first source whose bytes `accept`
+    allows. Raises like `fetch` if no source has a matching catalog and
+    nothing is cached.
+    """
+    name = url[len(GITHUB_BASE) + 1:] if url.startswith(GITHUB_BASE + "/") else None
+    manifest = None
+    if name and name != MANIFEST_NAME:
+        try:
+            manifest = json.loads(fetch(f"{GITHUB_BASE}/{MANIFEST_NAME}")[0])
+        except Exception as e:
+            print(f"[DEBUG] No catalog manifest ({e}); fetching {name} in full")
+    entry = manifest.get("files", {}).get(name) if manifest else None
+    if not entry:
+        data, source = fetch(url)
+        print(f"[DEBUG] Loaded JSON from {source}")
+        return json.loads(data)
+
+    digest, data = _cached(name)
+    if digest == entry["sha256"] and data is not None:
+        print(f"[DEBUG] {name} unchanged (manifest {digest[:12]}), using cached copy")
+        return json.loads(data)
+
+    if manifest.get("parts") and entry.get("parts") is not None and data is not None:
+        try:
+            document, fetched, size = _assemble(entry, fetch)
+            _store(name, entry["sha256"], canonical(document))
+            total = len(entry["parts"])
+            print(f"[DEBUG] {name} updated: {fetched} of {total} part(s) fetched "
+                  f"({size} bytes)")
+            return document
+        except Exception as e:
+            print(f"[DEBUG] Part update of {name} failed ({e}); fetching in full")
+
+    try:
+        fresh, source = fetch(url, accept=lambda body: file_sha256(body) == entry["sha256"])
+    except Exception as e:
+        if data is None:
+            raise
+        print(f"[WARN] No {name} matching the manifest ({e}); "
+              f"keeping the cached copy {digest[:12]}")
+        return json.loads(data)
+    data = fresh
+    _store(name, entry["sha256"], data)
+    document = json.loads(data)
+    _seed_parts(document)
+    print(f"[DEBUG] Loaded JSON from {source}")
+    return document
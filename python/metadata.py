@@ -0,0 +1,174 @@
+"""
+Cached winget package metadata for planning.
+
+`winget show` takes a second or more per package, so results are kept in
+DOTFILE_ROOT/cache/winget_show.json with a TTL and only missing or stale
+ids are fetched, concurrently. Download sizes come from a HEAD request on
+the manifest's installer URL. Once cached, `python main.py plan` works
+offline.
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import requests
+
+from python.config import DOTFILE_ROOT
+from python.rcfile import atomic_write_text
+from python.session import ensure_source_session, source_args
+
+METADATA_FILE = os.path.join(DOTFILE_ROOT, "cache", "winget_show.json")
+
+# Cached entries older than this are refetched (seconds)
+DEFAULT_TTL = 24 * 3600
+DEFAULT_WORKERS = 8
+
+# `winget show` fields we keep, by their label in the output
+_FIELDS = {
+    "Version": "version",
+    "Publisher": "publisher",
+    "Installer Type": "installer_type",
+    "Installer Url": "installer_url",
+    "Installer SHA256": "installer_sha256",
+}
+
+
+def load_metadata() -> Dict[str, Any]:
+    try:
+        with open(METADATA_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_metadata(cache: Dict[str, Any]) -> None:
+    atomic_write_text(METADATA_FILE, json.dumps(cache, indent=2, sort_keys=True))
+
+
+def parse_show(output: str) -> Dict[str, Any]:
+    """Pick the fields we need out of `winget show` text output."""
+    info: Dict[str, Any] = {}
+    for line in output.splitlines():
+        label, sep, value = line.strip().partition(":")
+        if sep and label in _FIELDS and value.strip():
+            info.setdefault(_FIELDS[label], value.strip())
+    return info
+
+
+def content_length(url: str, timeout: int = 10) -> Optional[int]:
+    """Installer size from a HEAD request (redirects followed), if reported."""
+    try:
+        resp = requests.head(url, allow_redirects=True, timeout=timeout)
+        resp.raise_for_status()
+        size = int(resp.headers.get("Content-Length", 0))
+        return size or None
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def fetch_package(app_id: str, timeout: int = 60) -> Optional[Dict[str, Any]]:
+    """Run `winget show` for one id and size its installer; None on failure."""
+    try:
+        result = subprocess.run(
+            ["winget", "show", "-e", "--id", app_id,
+             "--accept-source-agreements", "--disable-interactivity"]
+            + source_args(),
+            capture_output=True, text=True, encoding="utf-8",
+            errors="replace", timeout=timeout,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"[WARN] winget show {app_id} failed: {e}")
+        return None
+    if result.returncode != 0:
+        print(f"[WARN] winget show {app_id} failed (exit {result.returncode})")
+        return None
+
+    info = parse_show(result.stdout)
+    if info.get("installer_url"):
+        info["bytes"] = content_length(info["installer_url"])
+    return info
+
+
+def get_metadata(app_ids: Iterable[str], ttl: float = DEFAULT_TTL,
+                 refresh: bool = False, offline: bool = False,
+                 workers: int = DEFAULT_WORKERS) -> Dict[str, Dict[str, Any]]:
+    """
+    Metadata per id: cached entries younger than `ttl`, the rest fetched
+    concurrently (unless `offline`, which returns whatever is cached).
+    Ids that could not be resolved are missing from the result.
+    """
+    cache = load_metadata()
+    now = time.time()
+    ids = list(dict.fromkeys(app_ids))
+
+    stale = [
+        app_id for app_id in ids
+        if refresh or now - cache.get(app_id, {}).get("fetched", 0) > ttl
+    ]
+    if stale and not offline:
+        print(f"[*] Fetching winget metadata for {len(stale)} package(s)...")
+        ensure_source_session()
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for app_id, info in zip(stale, pool.map(fetch_package, stale)):
+                if info is not None:
+                    cache[app_id] = {"fetched": now, "data": info}
+        save_metadata(cache)
+
+    return {app_id: cache[app_id]["data"] for app_id in ids if app_id in cache}
+
+
+def cached_sizes(app_ids: Iterable[str]) -> Dict[str, int]:
+    """Known installer sizes from the cache only (never fetches)."""
+    cache = load_metadata()
+    return {
+        app_id: cache[app_id]["data"]["bytes"]
+        for app_id in app_ids
+        if cache.get(app_id, {}).get("data", {}).get("bytes")
+    }
+
+
+def installed_ids(timeout: int = 120) -> Optional[Set[str]]:
+    """
+    Ids winget reports as installed (lowercased), via `winget export`,
+    or None when winget is unavailable.
+    """
+    fd, path = tempfile.mkstemp(prefix="sampong_winget_", suffix=".json")
+    os.close(fd)
+    try:
+        subprocess.run(
+            ["winget", "export", "-o", path, "--accept-source-agreements",
+             "--disable-interactivity"],
+            capture_output=True, timeout=timeout,
+        )
+        with open(path, "r", encoding="utf-8-sig") as f:
+            exported = json.load(f)
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+    finally:
+        os.remove(path)
+
+    return {
+        package["PackageIdentifier"].lower()
+        for source in exported.get("Sources", [])
+        for package in source.get("Packages", [])
+        if package.get("PackageIdentifier")
+    }
+
+
+def select_apps(apps: List[Dict[str, Any]], ids: Optional[List[str]] = None,
+                sections: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Catalog apps (from load_apps) filtered by id and/or section; all if neither."""
+    wanted_ids = {i.lower() for i in ids or []}
+    wanted_sections = {s.lower() for s in sections or []}
+    return [
+        app for app in apps
+        if not app.get("is_section_toggle")
+        and (not wanted_ids and not wanted_sections
+             or app["id"].lower() in wanted_ids
+             or app["section"].lower() in wanted_sections)
+    ]
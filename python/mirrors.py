@@ -0,0 +1,174 @@
+"""
+Fastest-mirror selection for the catalog and dotfiles.
+
+apps.json, shells.json and the profiles live under REPO_RAW_BASE on
+raw.githubusercontent.com. Any number of --mirror URLs (typically
+`python main.py serve` on the LAN) serve the same json/ and dotfiles/
+paths. The first time a remote file is needed, the mirrors are raced
+happy-eyeballs style: a probe of PROBE_PATH goes to the first mirror,
+then every STAGGER seconds (or as soon as a probe fails) to the next, and
+the first mirror to answer wins. Later fetches go to the winner first
+and fall back to the other mirrors in configured order.
+
+Fetched files are kept with their ETag under DOTFILE_ROOT/mirrors, so a
+repeated fetch is a conditional request answered by 304 when nothing
+changed. Bodies are read through the bandwidth limit (python/throttle.py).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from python.config import DOTFILE_ROOT, MIRRORS, REPO_RAW_BASE
+from python.rcfile import atomic_write_text
+from python.throttle import CHUNK_SIZE, throttle
+
+# Repo file every mirror must serve; probed to measure latency
+PROBE_PATH = "json/apps.json"
+# Seconds before the next mirror is tried while earlier ones are pending
+STAGGER = 0.25
+PROBE_TIMEOUT = 3.0
+
+ETAG_DIR = os.path.join(DOTFILE_ROOT, "mirrors")
+
+_lock = threading.Lock()
+_selected: Dict[str, List[str]] = {}
+
+
+def configured_mirrors() -> List[str]:
+    """--mirror URLs in the order given, then GitHub."""
+    mirrors: List[str] = []
+    for url in MIRRORS + [REPO_RAW_BASE]:
+        if url not in mirrors:
+            mirrors.append(url)
+    return mirrors
+
+
+def probe(mirror: str, timeout: float = PROBE_TIMEOUT) -> float:
+    """Seconds `mirror` takes to answer a HEAD of PROBE_PATH; raises on failure."""
+    started = time.perf_counter()
+    resp = requests.head(f"{mirror}/{PROBE_PATH}", timeout=timeout, allow_redirects=True)
+    resp.raise_for_status()
+    return time.perf_counter() - started
+
+
+def race(mirrors: List[str], stagger: float = STAGGER,
+         timeout: float = PROBE_TIMEOUT) -> Optional[Tuple[str, float]]:
+    """(first mirror to answer, its latency), or None if none did."""
+    if not mirrors:
+        return None
+    pool = ThreadPoolExecutor(max_workers=len(mirrors))
+    pending = {}
+    waiting = list(mirrors)
+    try:
+        while waiting or pending:
+            if waiting:
+                mirror = waiting.pop(0)
+                pending[pool.submit(probe, mirror, timeout)] = mirror
+            done, _ = wait(pending, timeout=stagger if waiting else None,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                mirror = pending.pop(future)
+                if future.exception() is None:
+                    return mirror, future.result()
+    finally:
+        pool.shutdown(wait=False)  # losers finish (or time out) on their own
+    return None
+
+
+def select_mirrors(refresh: bool = False) -> List[str]:
+    """Mirrors in the order to try them: the race winner first."""
+    with _lock:
+        if "order" in _selected and not refresh:
+            return _selected["order"]
+        mirrors = configured_mirrors()
+        winner = race(mirrors) if len(mirrors) > 1 else None
+        if winner:
+            print(f"[INFO] Using mirror {winner[0]} ({winner[1] * 1000:.0f} ms)")
+            mirrors.remove(winner[0])
+            mirrors.insert(0, winner[0])
+        _selected["order"] = mirrors
+        _selected["reachable"] = [winner[0]] if winner else []
+        return mirrors
+
+
+def catalog_reachable(url: str) -> bool:
+    """True if any mirror answers (replaces a plain check of `url`)."""
+    if len(configured_mirrors()) > 1:
+        select_mirrors()
+        return bool(_selected["reachable"])
+    from python.check_network import internet_on
+    return internet_on(url=url)
+
+
+def mirror_urls(url: str) -> List[str]:
+    """Candidate URLs for `url`, one per mirror if it is a repo file."""
+    prefix = REPO_RAW_BASE + "/"
+    if not url.startswith(prefix):
+        return [url]
+    path = url[len(prefix):]
+    return [f"{mirror}/{path}" for mirror in select_mirrors()]
+
+
+def _etag_paths(url: str) -> Tuple[str, str]:
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return os.path.join(ETAG_DIR, key + ".body"), os.path.join(ETAG_DIR, key + ".json")
+
+
+def conditional_fetch(url: str, timeout: float = 5) -> bytes:
+    """GET `url`, revalidating a stored copy by its ETag."""
+    body_path, meta_path = _etag_paths(url)
+    headers = {}
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            etag = json.load(f).get("etag")
+        if etag and os.path.exists(body_path):
+            headers["If-None-Match"] = etag
+    except (OSError, ValueError):
+        pass
+
+    with requests.get(url, headers=headers, timeout=timeout, stream=True) as resp:
+        if resp.status_code == 304:
+            with open(body_path, "rb") as f:
+                return f.read()
+        resp.raise_for_status()
+        body = bytearray()
+        for chunk in resp.iter_content(CHUNK_SIZE):
+            throttle(len(chunk))
+            body += chunk
+        etag = resp.headers.get("ETag")
+
+    if etag:
+        os.makedirs(ETAG_DIR, exist_ok=True)
+        tmp = f"{body_path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, body_path)
+        atomic_write_text(meta_path, json.dumps({"url": url, "etag": etag}))
+    return bytes(body)
+
+
+def fetch_mirrored(url: str, timeout: float = 5,
+                   accept: Optional[Callable[[bytes], bool]] = None) -> Tuple[bytes, str]:
+    """
+    (body, URL it came from), trying each mirror in turn. A body that
+    `accept` rejects counts as a failed mirror (ValueError if it was the last).
+    """
+    error: Optional[Exception] = None
+    for candidate in mirror_urls(url):
+        try:
+            body = conditional_fetch(candidate, timeout)
+        except (requests.RequestException, OSError) as e:
+            error = e
+            continue
+        if accept is None or accept(body):
+            return body, candidate
+        print(f"[WARN] {candidate} failed verification")
+        error = ValueError(f"{candidate} failed verification")
+    raise error
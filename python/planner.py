@@ -0,0 +1,615 @@
+"""
+Dependency-aware planner for "Run ALL steps".
+
+Builds a DAG of setup steps: winget → every catalog app → the shells whose
+shells.json "requires" names that app (e.g. PowerShell and NuShell need
+"oh-my-posh"). Steps run in lanes: up to --concurrency installs at once
+(default 1, as many MSI installers do not run concurrently; with
+--adaptive the throttle controller moves the lane between 1 and that),
+shell configuration in its own lane, so a shell is configured as soon as
+its prerequisites are in, alongside the remaining installs.
+
+Step estimates come from the local run history (python/history.py). Ready
+steps that unblock other work go first (installs shells wait on), then the
+longest (usually largest) downloads, so the short ones fill in at the end
+instead of a big download stalling the tail. The same policy is
+simulated up front to print a predicted finish time, and after the run
+the critical path is printed next to the sequential total.
+"""
+
+import heapq
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from python.batch import install_batch
+from python.cache import cache_report
+from python.config import ADAPTIVE_CONCURRENCY, BATCH_INSTALL, CONCURRENCY, RESUME
+from python.engine import MAX_ATTEMPTS, retry_delay
+from python.history import (
+    ASSUMED_BYTES_PER_SECOND,
+    estimate,
+    expected_seconds,
+    load_history,
+    record_run,
+    save_history,
+)
+from python.journal import RunJournal, completed_steps, describe_resume
+from python.metadata import cached_sizes, get_metadata, installed_ids
+from python.progress import WeightedProgress
+from python.session import overhead_report
+from python.shells import configure_shell
+from python.throttle import ConcurrencyController
+from python.winget import install_app, install_winget
+
+# Lane → how many of its steps may run at once
+DEFAULT_LANES = {"install": max(1, CONCURRENCY), "shell": 1}
+
+# Rough step cost (seconds) for steps without history
+DEFAULT_ESTIMATES = {"winget": 5.0, "install": 60.0, "shell": 5.0}
+
+
+def slug(text: str) -> str:
+    """Lowercase alphanumerics only: "Oh My Posh" → "ohmyposh"."""
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+def match_requirement(name: str, apps: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Find the catalog app a shells.json "requires" entry refers to.
+
+    Compares slugs of the app name, the full winget id and its last
+    segment, so "oh-my-posh" matches JanDeDobbeleer.OhMyPosh.
+    """
+    wanted = slug(name)
+    for app in apps:
+        candidates = {slug(app["name"]), slug(app["id"]),
+                      slug(app["id"].rsplit(".", 1)[-1])}
+        if wanted in candidates:
+            return app
+    return None
+
+
+def _step(key: str, label: str, lane: str, kind: str,
+          run: Callable[[Dict[str, Any]], Any],
+          deps: Optional[List[str]] = None,
+          history: Optional[Dict[str, Any]] = None,
+          size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    One plan step; `run(stats)` may fill stats["bytes"]. `size` (e.g. from
+    winget metadata) is used when the history has no recorded size.
+    """
+    history = history or {"steps": {}}
+    past = estimate(history, key)
+    default = DEFAULT_ESTIMATES[kind]
+    if not past["bytes"] and size:
+        default += size / ASSUMED_BYTES_PER_SECOND
+    return {
+        "key": key,
+        "label": label,
+        "lane": lane,
+        "kind": kind,
+        "run": run,
+        "deps": list(deps or []),
+        "estimate": expected_seconds(history, key, default),
+        "bytes": past["bytes"] or size,
+        "measured": past["seconds"] is not None,
+    }
+
+
+def build_plan(apps: List[Dict[str, Any]],
+               shells: List[Dict[str, Any]],
+               with_winget: bool = True,
+               history: Optional[Dict[str, Any]] = None,
+               sizes: Optional[Dict[str, int]] = None,
+               batch: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Build the step DAG for the given catalog apps and shell entries.
+
+    Returns steps keyed by "winget", "app:<id>" and "shell:<id>", in
+    catalog order. Section toggles, hidden shells and "all" are ignored.
+    Estimates come from `history` (see python/history.py) when given,
+    with installer `sizes` by app id filling in unrecorded downloads.
+    With `batch`, all apps are one "batch" step (a single winget import).
+    """
+    apps = [a for a in apps if not a.get("is_section_toggle")]
+    plan: Dict[str, Dict[str, Any]] = {}
+
+    root = []
+    if with_winget:
+        plan["winget"] = _step("winget", "Install winget", "install", "winget",
+                               lambda stats: install_winget(), history=history)
+        root = ["winget"]
+
+    for app in apps:
+        key = f"app:{app['id']}"
+        plan[key] = _step(key, app["name"], "install", "install",
+                          lambda stats, app=app: install_app(
+                              app, stats, stats.get("on_progress"), max_attempts=1),
+                          root, history, (sizes or {}).get(app["id"]))
+
+    if batch and apps:
+        # Same estimates, one step: shells wait for the whole import
+        singles = [plan.pop(f"app:{app['id']}") for app in apps]
+        plan["batch"] = _step(
+            "batch", f"Install {len(apps)} app(s) (winget import)",
+            "install", "install",
+            lambda stats: all(install_batch(apps).values()), root,
+        )
+        plan["batch"]["estimate"] = sum(step["estimate"] for step in singles)
+        plan["batch"]["bytes"] = sum(step["bytes"] or 0 for step in singles) or None
+
+    for shell in shells:
+        if shell.get("hidden") or shell.get("id") == "all":
+            continue
+        deps = []
+        for name in shell.get("requires", []):
+            app = match_requirement(name, apps)
+            if app is None:
+                print(f"[WARN] {shell['name']} requires '{name}', "
+                      "which is not in the catalog; not waiting for it")
+                continue
+            deps.append("batch" if batch else f"app:{app['id']}")
+        key = f"shell:{shell['id']}"
+        plan[key] = _step(key, f"Configure {shell['name']}", "shell", "shell",
+                          lambda stats, shell_id=shell["id"]: configure_shell(shell_id),
+                          deps, history)
+    return plan
+
+
+def drop_completed(plan: Dict[str, Dict[str, Any]],
+                   done: Set[str]) -> Dict[str, Dict[str, Any]]:
+    """The plan without the `done` steps; dependencies on them count as met."""
+    return {
+        key: {**step, "deps": [d for d in step["deps"] if d not in done]}
+        for key, step in plan.items() if key not in done
+    }
+
+
+def _dependents(plan: Dict[str, Dict[str, Any]]) -> Dict[str, List[str]]:
+    children: Dict[str, List[str]] = {key: [] for key in plan}
+    for key, step in plan.items():
+        for dep in step["deps"]:
+            children[dep].append(key)
+    return children
+
+
+def bottom_levels(plan: Dict[str, Dict[str, Any]]) -> Dict[str, float]:
+    """Longest estimated time from the start of each step to the end."""
+    children = _dependents(plan)
+    levels: Dict[str, float] = {}
+
+    def level(key: str) -> float:
+        if key not in levels:
+            levels[key] = plan[key]["estimate"] + max(
+                (level(child) for child in children[key]), default=0.0
+            )
+        return levels[key]
+
+    for key in plan:
+        level(key)
+    return levels
+
+
+def _policy(plan: Dict[str, Dict[str, Any]]) -> Callable[[str], tuple]:
+    """
+    Sort key for ready steps. Steps that unblock the longest chain of
+    later work go first (so other lanes are not left idle waiting on
+    them), then the longest steps (longest processing time first), then
+    larger downloads, then catalog order.
+    """
+    levels = bottom_levels(plan)
+    order = {key: i for i, key in enumerate(plan)}
+    return lambda key: (
+        -(levels[key] - plan[key]["estimate"]),
+        -plan[key]["estimate"],
+        -(plan[key]["bytes"] or 0),
+        order[key],
+    )
+
+
+def _startable(plan: Dict[str, Dict[str, Any]], ready: List[str],
+               busy: Dict[str, int], lanes: Dict[str, int],
+               policy: Callable[[str], tuple]) -> List[str]:
+    """Pick ready steps in policy order while their lane has room."""
+    chosen = []
+    for key in sorted(ready, key=policy):
+        lane = plan[key]["lane"]
+        if busy.get(lane, 0) < lanes.get(lane, 1):
+            busy[lane] = busy.get(lane, 0) + 1
+            chosen.append(key)
+    return chosen
+
+
+def simulate(plan: Dict[str, Dict[str, Any]],
+             lanes: Optional[Dict[str, int]] = None) -> Dict[str, float]:
+    """Predicted finish offset (seconds) of every step under run_plan's policy."""
+    lanes = {**DEFAULT_LANES, **(lanes or {})}
+    policy = _policy(plan)
+    children = _dependents(plan)
+    waiting = {key: set(step["deps"]) for key, step in plan.items()}
+    busy: Dict[str, int] = {}
+    started = set()
+    running: List[tuple] = []
+    finish: Dict[str, float] = {}
+    clock = 0.0
+
+    while len(finish) < len(plan):
+        ready = [k for k in plan if k not in started and not waiting[k]]
+        for key in _startable(plan, ready, busy, lanes, policy):
+            started.add(key)
+            heapq.heappush(running, (clock + plan[key]["estimate"], key))
+        if not running:
+            break
+        clock, key = heapq.heappop(running)
+        finish[key] = clock
+        busy[plan[key]["lane"]] -= 1
+        for child in children[key]:
+            waiting[child].discard(key)
+    return finish
+
+
+def critical_path(plan: Dict[str, Dict[str, Any]],
+                  durations: Optional[Dict[str, float]] = None) -> List[str]:
+    """Longest dependency chain by `durations` (estimates if omitted)."""
+    cost = {
+        key: (durations or {}).get(key, step["estimate"])
+        for key, step in plan.items()
+    }
+    finish: Dict[str, float] = {}
+    via: Dict[str, Optional[str]] = {}
+
+    def end(key: str) -> float:
+        if key not in finish:
+            prev = max(plan[key]["deps"], key=end, default=None)
+            via[key] = prev
+            finish[key] = (end(prev) if prev else 0.0) + cost[key]
+        return finish[key]
+
+    if not plan:
+        return []
+    last = max(plan, key=end)
+    path = []
+    while last:
+        path.append(last)
+        last = via[last]
+    return path[::-1]
+
+
+def run_plan(plan: Dict[str, Dict[str, Any]],
+             lanes: Optional[Dict[str, int]] = None,
+             on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+             history: Optional[Dict[str, Any]] = None,
+             adaptive: bool = ADAPTIVE_CONCURRENCY
+             ) -> Dict[str, Any]:
+    """
+    Execute the plan, starting every step whose dependencies are done.
+
+    A failed or skipped install skips the apps behind it (winget) but not
+    shells, which configure anyway as before. `on_event(event, step)` is
+    called with "start"/"done"/"failed"/"timed_out"/"skipped", and with "progress"
+    (step plus "done_bytes"/"total_bytes") while an install downloads. Each finished step is
+    recorded in `history` (saved as we go) when given. Returns per-step
+    status and durations, the reasons for steps that timed out (hung
+    installers killed by the engine's watchdog), retried steps and the
+    wall-clock time.
+
+    A step that fails transiently (stats["retry"], see install_app) is
+    run again after a backoff, up to MAX_ATTEMPTS in all. It waits out
+    the backoff off its lane, so the other installs go on meanwhile.
+
+    With `adaptive`, the install lane's size is only the ceiling: a
+    ConcurrencyController (python/throttle.py) starts it at 1 and moves it
+    with download throughput and machine load.
+    """
+    lanes = {**DEFAULT_LANES, **(lanes or {})}
+    controller: Optional[ConcurrencyController] = None
+    stop = threading.Event()
+    if adaptive and lanes["install"] > 1:
+        controller = ConcurrencyController(None, lanes["install"])
+        lanes["install"] = 1
+        threading.Thread(
+            target=controller.run_thread,
+            args=(stop, lambda limit: lanes.__setitem__("install", limit)),
+            daemon=True,
+        ).start()
+    policy = _policy(plan)
+    children = _dependents(plan)
+    waiting = {key: set(step["deps"]) for key, step in plan.items()}
+    status: Dict[str, str] = {}
+    durations: Dict[str, float] = {}
+    timed_out: Dict[str, str] = {}
+    retries: Dict[str, Dict[str, float]] = {}
+    retry_at: Dict[str, float] = {}  # step -> perf_counter time it may run again
+    running: Dict[Any, str] = {}
+    busy: Dict[str, int] = {}
+
+    def emit(event: str, key: str) -> None:
+        if on_event:
+            on_event(event, plan[key])
+
+    def execute(key: str):
+        stats: Dict[str, Any] = {}
+        seen = {"done": 0}
+
+        def on_progress(done: int, total: int) -> None:
+            if controller and done > seen["done"]:
+                controller.record_bytes(done - seen["done"])
+            seen["done"] = max(seen["done"], done)
+            if on_event:
+                on_event("progress", {**plan[key], "done_bytes": done, "total_bytes": total})
+
+        stats["on_progress"] = on_progress
+        started = time.perf_counter()
+        try:
+            ok = plan[key]["run"](stats) is not False
+        except Exception as e:
+            print(f"[ERROR] {plan[key]['label']} failed: {e}")
+            ok = False
+        return ok, time.perf_counter() - started, stats
+
+    def finish(key: str, state: str) -> None:
+        status[key] = state
+        emit(state, key)
+        for child in children[key]:
+            waiting[child].discard(key)
+            blocked = state != "done" and plan[child]["kind"] != "shell"
+            if blocked and child not in status:
+                print(f"[SKIP] {plan[child]['label']}: "
+                      f"{plan[key]['label']} did not complete")
+                finish(child, "skipped")
+
+    started = time.perf_counter()
+    ceiling = sum(lanes.values()) + (controller.maximum - 1 if controller else 0)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, ceiling)) as pool:
+            while len(status) < len(plan):
+                now = time.perf_counter()
+                ready = [
+                    key for key in plan
+                    if key not in status and key not in running.values()
+                    and not waiting[key] and retry_at.get(key, 0.0) <= now
+                ]
+                for key in _startable(plan, ready, busy, lanes, policy):
+                    retry_at.pop(key, None)
+                    emit("start", key)
+                    running[pool.submit(execute, key)] = key
+
+                if not running and not retry_at:
+                    break  # nothing runnable left (cycle or all skipped)
+                # Wake up for the next retry, and now and then so a raised
+                # install limit starts steps
+                timeouts = [at - now for at in retry_at.values()]
+                if controller:
+                    timeouts.append(controller.interval)
+                timeout = max(0.0, min(timeouts)) if timeouts else None
+                if not running:
+                    time.sleep(timeout)
+                    continue
+                completed, _ = wait(list(running), return_when=FIRST_COMPLETED,
+                                    timeout=timeout)
+                for future in completed:
+                    key = running.pop(future)
+                    busy[plan[key]["lane"]] -= 1
+                    ok, elapsed, stats = future.result()
+                    durations[key] = durations.get(key, 0.0) + elapsed
+                    if history is not None:
+                        record_run(history, key, elapsed, ok, stats.get("bytes"))
+                        save_history(history)
+                    attempts = retries.get(key, {}).get("attempts", 1)
+                    if not ok and stats.get("retry") and attempts < MAX_ATTEMPTS:
+                        delay = retry_delay(attempts)
+                        retry = retries.setdefault(key, {"attempts": 1, "seconds": 0.0})
+                        retry["attempts"] = attempts + 1
+                        retry["seconds"] += elapsed + delay
+                        retry_at[key] = time.perf_counter() + delay
+                        print(f"[RETRY] {plan[key]['label']}: {stats['retry']}; "
+                              f"attempt {attempts + 1} in {delay:.0f}s")
+                        continue
+                    if stats.get("timed_out"):
+                        timed_out[key] = stats["timed_out"]
+                        finish(key, "timed_out")
+                    else:
+                        finish(key, "done" if ok else "failed")
+    finally:
+        stop.set()
+
+    return {
+        "status": status,
+        "durations": durations,
+        "timed_out": timed_out,
+        "retries": retries,
+        "concurrency": ([step["next"] for step in controller.history]
+                        if controller else None),
+        "wall_clock": time.perf_counter() - started,
+    }
+
+
+def _clock(seconds: float) -> str:
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes}m{seconds:02d}s"
+
+
+def print_plan(plan: Dict[str, Dict[str, Any]],
+               lanes: Optional[Dict[str, int]] = None) -> float:
+    """
+    Show the steps in predicted start order with estimates, the estimated
+    critical path and the predicted finish time. Returns the prediction
+    (seconds from now).
+    """
+    finish = simulate(plan, lanes)
+    predicted = max(finish.values(), default=0.0)
+    print(f"[PLAN] {len(plan)} step(s), in predicted start order")
+    for key in sorted(plan, key=lambda k: finish.get(k, 0.0) - plan[k]["estimate"]):
+        step = plan[key]
+        deps = ", ".join(plan[d]["label"] for d in step["deps"])
+        after = f"  (after: {deps})" if deps else ""
+        guess = "" if step["measured"] else "~"
+        size = f", {step['bytes'] / 1024 / 1024:.0f} MB" if step["bytes"] else ""
+        print(f"   [{step['lane']:<7}] {step['label']} "
+              f"({guess}{_clock(step['estimate'])}{size}){after}")
+    path = critical_path(plan)
+    print("[PLAN] Critical path: "
+          + " → ".join(plan[key]["label"] for key in path))
+    eta = datetime.now() + timedelta(seconds=predicted)
+    print(f"[PLAN] Predicted finish: {eta:%H:%M:%S} (in {_clock(predicted)}; "
+          "~ marks steps without history)")
+    return predicted
+
+
+def print_summary(plan: Dict[str, Dict[str, Any]], outcome: Dict[str, Any],
+                  predicted: Optional[float] = None) -> None:
+    """Wall-clock vs sequential time and the critical path actually taken."""
+    durations = outcome["durations"]
+    sequential = sum(durations.values())
+    path = critical_path(plan, durations)
+    counts: Dict[str, int] = {}
+    for state in outcome["status"].values():
+        counts[state] = counts.get(state, 0) + 1
+
+    print("\n" + "=" * 70)
+    print("   " + ", ".join(f"{n} {state}" for state, n in sorted(counts.items())))
+    print(f"   Wall clock: {outcome['wall_clock']:.1f}s "
+          f"(sequential would be {sequential:.1f}s)")
+    if predicted is not None:
+        print(f"   Predicted:  {predicted:.1f}s")
+    busy: Dict[str, float] = {}
+    for key, seconds in durations.items():
+        busy[plan[key]["lane"]] = busy.get(plan[key]["lane"], 0.0) + seconds
+    for lane, seconds in sorted(busy.items()):
+        print(f"   {lane.capitalize()} lane busy: {seconds:.1f}s")
+    print("   Critical path:")
+    for key in path:
+        print(f"     {durations.get(key, 0.0):7.1f}s  {plan[key]['label']}")
+    for key, reason in outcome.get("timed_out", {}).items():
+        print(f"   [TIMEOUT] {plan[key]['label']}: {reason}")
+    for key, retry in outcome.get("retries", {}).items():
+        state = outcome["status"].get(key, "?").upper()
+        print(f"   [RETRY] {plan[key]['label']}: {retry['attempts']:.0f} attempt(s), "
+              f"{retry['seconds']:.0f}s lost to retries, {state}")
+    if outcome.get("concurrency"):
+        steps = [1] + outcome["concurrency"]
+        changes = [n for i, n in enumerate(steps) if i == 0 or n != steps[i - 1]]
+        print(f"   Adaptive concurrency: {' -> '.join(map(str, changes))} "
+              f"(peak {max(steps)})")
+    summary = overhead_report()
+    if summary:
+        print(f"   {summary}")
+    cached = cache_report()
+    if cached:
+        print(f"   {cached}")
+    print("=" * 70)
+
+
+def run_all_steps(apps: List[Dict[str, Any]],
+                  shells: List[Dict[str, Any]],
+                  on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                  on_update: Optional[Callable[[float, str, Dict[str, Any]], None]] = None,
+                  resume: Optional[bool] = None
+                  ) -> Dict[str, Any]:
+    """
+    Plan and run winget + apps + shells; used by CLI option 4 and the GUI.
+
+    `on_update(percent, eta_text, step)` reports overall progress weighted
+    by the plan's estimates (see python/progress.py). Every step is
+    journaled (python/journal.py); with `resume` (default: the --resume
+    flag) steps the last run completed are skipped.
+    """
+    history = load_history()
+    sizes = cached_sizes(app["id"] for app in apps if not app.get("is_section_toggle"))
+    plan = build_plan(apps, shells, history=history, sizes=sizes,
+                      batch=BATCH_INSTALL)
+
+    journal = RunJournal()
+    if RESUME if resume is None else resume:
+        done = completed_steps()
+        print(f"[INFO] {describe_resume(done, plan)}")
+        plan = drop_completed(plan, done)
+        journal.resume(plan)
+    else:
+        journal.begin(plan)
+
+    predicted = print_plan(plan)
+    progress = WeightedProgress(
+        {key: step["estimate"] for key, step in plan.items()},
+        {key: step["bytes"] for key, step in plan.items() if step["bytes"]},
+    )
+
+    def track(event: str, step: Dict[str, Any]) -> None:
+        if event == "progress":
+            progress.update(step["key"], done_bytes=step["done_bytes"],
+                            total_bytes=step["total_bytes"])
+        elif event == "start":
+            journal.start(step["key"])
+        else:
+            journal.outcome(step["key"], event)
+            progress.finish(step["key"])
+        if on_event:
+            on_event(event, step)
+        if on_update:
+            on_update(progress.percent(), progress.eta_text(), step)
+
+    outcome = run_plan(plan, on_event=track, history=history)
+    journal.end()
+    print_summary(plan, outcome, predicted)
+    return outcome
+
+
+def _megabytes(size: Optional[float]) -> str:
+    return f"{size / 1024 / 1024:.0f} MB" if size else "?"
+
+
+def dry_run(apps: List[Dict[str, Any]], ttl: float, refresh: bool = False,
+            offline: bool = False, workers: int = 8) -> Dict[str, Any]:
+    """
+    Print what installing `apps` would do, without installing anything:
+    resolved version, installer type, download size and installed state
+    per app, then total bytes and the predicted time for what is missing.
+    """
+    meta = get_metadata((app["id"] for app in apps), ttl=ttl,
+                        refresh=refresh, offline=offline, workers=workers)
+    installed = installed_ids()
+    pending = [
+        app for app in apps
+        if installed is None or app["id"].lower() not in installed
+    ]
+    sizes = {app_id: info["bytes"] for app_id, info in meta.items()
+             if info.get("bytes")}
+    plan = build_plan(pending, [], with_winget=False,
+                      history=load_history(), sizes=sizes)
+    finish = simulate(plan)
+
+    print("\n" + "=" * 90)
+    print(f"{'App':<32}{'Version':<16}{'Type':<10}{'Size':>9}"
+          f"{'Installed':>11}{'Est.':>10}")
+    print("-" * 90)
+    for app in apps:
+        info = meta.get(app["id"], {})
+        step = plan.get(f"app:{app['id']}")
+        if installed is None:
+            state = "?"
+        else:
+            state = "yes" if app["id"].lower() in installed else "no"
+        est = _clock(step["estimate"]) if step else "-"
+        print(f"{app['name'][:31]:<32}{info.get('version', '?')[:15]:<16}"
+              f"{info.get('installer_type', '?')[:9]:<10}"
+              f"{_megabytes(info.get('bytes')):>9}{state:>11}{est:>10}")
+    print("=" * 90)
+
+    total_bytes = sum(step["bytes"] or 0 for step in plan.values())
+    unknown = sum(1 for step in plan.values() if not step["bytes"])
+    predicted = max(finish.values(), default=0.0)
+    eta = datetime.now() + timedelta(seconds=predicted)
+    print(f"   {len(apps)} app(s), {len(pending)} to install, "
+          f"{_megabytes(total_bytes)} to download"
+          + (f" ({unknown} size(s) unknown)" if unknown else ""))
+    print(f"   Estimated time: {_clock(predicted)} "
+          f"(finish ~{eta:%H:%M} if started now)")
+    if len(meta) < len(apps):
+        missing = [app["id"] for app in apps if app["id"] not in meta]
+        print(f"[WARN] No metadata for: {', '.join(missing)}")
+    return {"metadata": meta, "installed": installed,
+            "pending": pending, "predicted": predicted, "bytes": total_bytes}
@@ -0,0 +1,211 @@
+"""
+Concurrent stdout/stderr reading for winget subprocesses.
+
+Reading stdout line by line and stderr only after the process exits can
+deadlock: a chatty installer fills the stderr pipe and blocks while we
+wait on stdout. Line-based reads also hold back winget's progress redraws,
+which end in \\r, until the next \\n arrives.
+
+Both pipes are drained here at the same time with asyncio subprocess
+streams and split on \\r as well as \\n, so every progress frame is
+delivered as soon as winget writes it. Buffering is bounded: the stream
+buffer pauses the pipe once it holds STREAM_LIMIT bytes, an unterminated
+frame is flushed at MAX_FRAME characters, and only the last STDERR_TAIL
+stderr lines are kept for error reports.
+
+An optional Watchdog enforces deadlines: an overall one, one per phase
+and a stall limit (no output at all). When one expires, or the caller is
+cancelled, the whole process tree is killed, since installers often run
+in a child of winget that would otherwise keep going (and keep our pipes
+open).
+"""
+
+import asyncio
+import codecs
+import inspect
+import os
+import re
+import signal
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Bytes read from a pipe per call
+CHUNK_SIZE = 4096
+# Bytes the asyncio stream buffers before it stops reading the pipe
+STREAM_LIMIT = 64 * 1024
+# Characters of an unterminated frame held before it is delivered anyway
+MAX_FRAME = 8192
+# stderr lines (and characters per line) kept for the failure message
+STDERR_TAIL = 20
+TAIL_LINE = 300
+
+# Seconds between watchdog checks
+WATCH_INTERVAL = 1.0
+
+_SPLIT_RE = re.compile(r"[\r\n]")
+
+# on_frame(stream_name, text) with stream_name "stdout" or "stderr"; a
+# coroutine callback is awaited, so a slow consumer stops the pipe reads
+FrameCallback = Callable[[str, str], Any]
+
+
+class ProcessTimeout(Exception):
+    """A Watchdog limit expired and the process tree was killed."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Watchdog:
+    """
+    Limits for one process, in seconds (None disables a limit): `total`
+    run time, time spent in each named phase (`phases`, switched with
+    enter()), and `stall`, the longest stretch without any output.
+    """
+
+    def __init__(self, total: Optional[float] = None,
+                 stall: Optional[float] = None,
+                 phases: Optional[Dict[str, Optional[float]]] = None):
+        self.total = total
+        self.stall = stall
+        self.phases = dict(phases or {})
+        self.phase: Optional[str] = None
+        self.started = self.phase_started = self.last_output = time.monotonic()
+
+    def enter(self, phase: str) -> None:
+        if phase != self.phase:
+            self.phase = phase
+            self.phase_started = time.monotonic()
+
+    def touch(self) -> None:
+        self.last_output = time.monotonic()
+
+    def expired(self) -> Optional[str]:
+        """Why the process should be killed now, or None."""
+        now = time.monotonic()
+        if self.total is not None and now - self.started > self.total:
+            return f"still running after {self.total:.0f}s"
+        limit = self.phases.get(self.phase)
+        if limit is not None and now - self.phase_started > limit:
+            return f"{self.phase} phase took over {limit:.0f}s"
+        if self.stall is not None and now - self.last_output > self.stall:
+            return f"no output for {self.stall:.0f}s (hung?)"
+        return None
+
+
+def split_frames(buffer: str) -> Tuple[List[str], str]:
+    """
+    Complete frames in `buffer` (split on \\r or \\n, empties dropped) and
+    the unterminated rest.
+    """
+    parts = _SPLIT_RE.split(buffer)
+    rest = parts.pop()
+    frames = [part for part in parts if part]
+    if len(rest) >= MAX_FRAME:
+        frames.append(rest)
+        rest = ""
+    return frames, rest
+
+
+async def read_frames(stream: asyncio.StreamReader, name: str,
+                      on_frame: FrameCallback, encoding: str = "utf-8",
+                      watchdog: Optional[Watchdog] = None) -> None:
+    """Deliver every frame from `stream` to `on_frame` until EOF."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    while True:
+        chunk = await stream.read(CHUNK_SIZE)
+        if chunk and watchdog:
+            watchdog.touch()  # spinner frames count as signs of life
+        pending += decoder.decode(chunk, final=not chunk)
+        frames, pending = split_frames(pending)
+        for frame in frames:
+            await _deliver(on_frame, name, frame)
+        if not chunk:
+            break
+    if pending:
+        await _deliver(on_frame, name, pending)
+
+
+async def _deliver(on_frame: FrameCallback, name: str, text: str) -> None:
+    result = on_frame(name, text)
+    if inspect.isawaitable(result):
+        await result
+
+
+async def kill_tree(process: asyncio.subprocess.Process) -> None:
+    """Kill `process` and everything it started, then reap it."""
+    if process.returncode is None:
+        if os.name == "nt":
+            killer = await asyncio.create_subprocess_exec(
+                "taskkill", "/T", "/F", "/PID", str(process.pid),
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            await killer.wait()
+        else:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+    await process.wait()
+
+
+async def stream_process(cmd: List[str], on_frame: FrameCallback,
+                         encoding: str = "utf-8",
+                         watchdog: Optional[Watchdog] = None) -> Tuple[int, str]:
+    """
+    Run `cmd`, draining stdout and stderr concurrently into `on_frame`.
+
+    Returns (exit code, last stderr lines joined by newlines). Raises
+    ProcessTimeout when `watchdog` expires. Either way, and when the
+    calling task is cancelled, the process tree is killed first.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=STREAM_LIMIT,
+        # Own process group, so killpg reaches the installer's children
+        start_new_session=os.name != "nt",
+    )
+    tail: deque = deque(maxlen=STDERR_TAIL)
+
+    def collect(name: str, text: str) -> Any:
+        if name == "stderr" and text.strip():
+            tail.append(text.strip()[:TAIL_LINE])
+        return on_frame(name, text)
+
+    async def drain() -> int:
+        await asyncio.gather(
+            read_frames(process.stdout, "stdout", collect, encoding, watchdog),
+            read_frames(process.stderr, "stderr", collect, encoding, watchdog),
+        )
+        return await process.wait()
+
+    work = asyncio.ensure_future(drain())
+    try:
+        while True:
+            done, _ = await asyncio.wait({work}, timeout=WATCH_INTERVAL)
+            if done:
+                return work.result(), "\n".join(tail)
+            reason = watchdog.expired() if watchdog else None
+            if reason:
+                await kill_tree(process)
+                work.cancel()
+                await asyncio.gather(work, return_exceptions=True)
+                raise ProcessTimeout(reason)
+    except asyncio.CancelledError:
+        await kill_tree(process)
+        work.cancel()
+        await asyncio.gather(work, return_exceptions=True)
+        raise
+
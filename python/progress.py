@@ -0,0 +1,165 @@
+"""
+Weighted overall progress and ETA for a batch of installs.
+
+Counting steps (i / total) makes a 2 GB IDE and a 3 MB CLI tool worth the
+same. Here each step weighs its expected duration (python/history.py:
+past runs, else a default plus download time for its known size). While
+a step downloads, winget's percentage advances its download share.
+
+The ETA scales the remaining expected time by how fast the batch has
+actually gone so far, and for a download in flight uses the observed
+throughput for the rest of its bytes.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from python.history import (
+    ASSUMED_BYTES_PER_SECOND,
+    estimate,
+    expected_seconds,
+    load_history,
+)
+
+# Expected seconds for a step with no history and no known size
+DEFAULT_STEP_SECONDS = 60.0
+# Weight of the newest sample in the smoothed download throughput
+THROUGHPUT_SMOOTHING = 0.3
+# Elapsed/expected ratio is trusted once this much of the batch is done
+MIN_DONE_FOR_RATE = 0.05
+
+
+class WeightedProgress:
+    """Thread-safe overall progress over steps weighted by expected time."""
+
+    def __init__(self, weights: Dict[str, float],
+                 sizes: Optional[Dict[str, float]] = None):
+        self._weights = dict(weights)
+        self._sizes = dict(sizes or {})
+        self._fraction = {key: 0.0 for key in weights}
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._high_water = 0.0
+        self._throughput: Optional[float] = None  # bytes/s, smoothed
+        self._last_bytes: Optional[tuple] = None  # (key, bytes, monotonic)
+        self._download: Optional[tuple] = None  # (key, done, total)
+
+    @classmethod
+    def for_steps(cls, keys: Iterable[str],
+                  history: Optional[Dict[str, Any]] = None,
+                  sizes: Optional[Dict[str, float]] = None,
+                  defaults: Optional[Dict[str, float]] = None) -> "WeightedProgress":
+        """
+        Weights for step keys such as "app:Git.Git" from the run history.
+
+        `sizes` (bytes per key, e.g. from winget manifests) fills in for
+        steps whose size was never recorded; `defaults` overrides the
+        expected seconds of steps with no history at all.
+        """
+        history = history if history is not None else load_history()
+        sizes = dict(sizes or {})
+        weights = {}
+        for key in keys:
+            past = estimate(history, key)
+            if past["bytes"]:
+                sizes[key] = past["bytes"]
+            default = (defaults or {}).get(key, DEFAULT_STEP_SECONDS)
+            weights[key] = expected_seconds(history, key, default)
+            if past["seconds"] is None and not past["bytes"] and sizes.get(key):
+                weights[key] += sizes[key] / ASSUMED_BYTES_PER_SECOND
+        return cls(weights, sizes)
+
+    def update(self, key: str, fraction: Optional[float] = None,
+               done_bytes: Optional[float] = None,
+               total_bytes: Optional[float] = None,
+               download_fraction: Optional[float] = None) -> None:
+        """
+        Report progress of step `key`: either the step `fraction` (0..1),
+        or download progress as bytes or `download_fraction` (what winget
+        shows), which only covers the download share of the step.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if total_bytes:
+                self._sizes.setdefault(key, total_bytes)
+                if done_bytes is not None:
+                    self._observe(key, done_bytes, now)
+                    self._download = (key, done_bytes, total_bytes)
+                    download_fraction = done_bytes / total_bytes
+            if fraction is None and download_fraction is not None:
+                fraction = self._download_share(key) * download_fraction
+            if fraction is not None:
+                self._fraction[key] = max(self._fraction.get(key, 0.0),
+                                          min(1.0, fraction))
+
+    def _download_share(self, key: str) -> float:
+        """Part of a step's expected time spent downloading (at most 90%)."""
+        weight = self._weights.get(key, 0.0)
+        size = self._sizes.get(key)
+        if not weight or not size:
+            return 0.5
+        return min(0.9, size / ASSUMED_BYTES_PER_SECOND / weight)
+
+    def finish(self, key: str) -> None:
+        """Mark step `key` complete (whether it succeeded or not)."""
+        with self._lock:
+            self._fraction[key] = 1.0
+            if self._download and self._download[0] == key:
+                self._download = None
+
+    def _observe(self, key: str, done: float, now: float) -> None:
+        last = self._last_bytes
+        self._last_bytes = (key, done, now)
+        if not last or last[0] != key or now <= last[2] or done <= last[1]:
+            return
+        rate = (done - last[1]) / (now - last[2])
+        if self._throughput is None:
+            self._throughput = rate
+        else:
+            self._throughput += THROUGHPUT_SMOOTHING * (rate - self._throughput)
+
+    def _done_weight(self) -> float:
+        return sum(self._weights.get(k, 0.0) * f for k, f in self._fraction.items())
+
+    def percent(self) -> float:
+        """Overall progress 0..100; never moves backwards."""
+        with self._lock:
+            total = sum(self._weights.values())
+            value = 100.0 * self._done_weight() / total if total else 100.0
+            self._high_water = max(self._high_water, value)
+            return self._high_water
+
+    def eta_seconds(self) -> Optional[float]:
+        """Seconds until the batch is done, or None before any progress."""
+        with self._lock:
+            total = sum(self._weights.values())
+            done = self._done_weight()
+            if total <= 0 or done >= total:
+                return 0.0
+            elapsed = time.monotonic() - self._started
+            rate = 1.0
+            if done / total >= MIN_DONE_FOR_RATE:
+                rate = elapsed / done
+            elif elapsed < 1.0:
+                return None
+
+            remaining = (total - done) * rate
+            if self._download and self._throughput:
+                # Re-time the rest of the in-flight download at the observed
+                # throughput instead of the assumed one
+                key, got, size = self._download
+                share = self._weights.get(key, 0.0) * self._download_share(key)
+                assumed = share * (1 - got / size)
+                remaining += (size - got) / self._throughput - assumed * rate
+            return max(0.0, remaining)
+
+    def eta_text(self) -> str:
+        """e.g. "ETA 4m05s (14:32)" or "ETA --" while still unknown."""
+        eta = self.eta_seconds()
+        if eta is None:
+            return "ETA --"
+        minutes, seconds = divmod(int(round(eta)), 60)
+        done_at = datetime.now() + timedelta(seconds=eta)
+        return f"ETA {minutes}m{seconds:02d}s ({done_at:%H:%M})"
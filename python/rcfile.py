@@ -0,0 +1,194 @@
+"""
+Managed-block editing for user rc files (.bashrc, config.nu, $PROFILE).
+
+Instead of resetting a user's rc file and appending our lines, we own a
+single delimited region and only ever rewrite that region:
+
+    # >>> Sampong_dotfile >>>
+    source "..."
+    # <<< Sampong_dotfile <<<
+
+Everything outside the markers is left untouched. The file is only
+written when the block content actually changes, and always through an
+atomic temp-file + rename so a crash never leaves a half-written rc file.
+"""
+
+import os
+import tempfile
+from typing import Callable, List, Optional, Tuple, Union
+
+BLOCK_NAME = "Sampong_dotfile"
+
+
+def _markers(name: str, comment: str = "#"):
+    begin = f"{comment} >>> {name} >>>"
+    end = f"{comment} <<< {name} <<<"
+    return begin, end
+
+
+def render_block(body: Union[str, List[str]], name: str = BLOCK_NAME,
+                 comment: str = "#") -> str:
+    """Build the full managed block (markers included) for `body`."""
+    if isinstance(body, list):
+        body = "\n".join(body)
+    begin, end = _markers(name, comment)
+    body = body.strip("\n")
+    return f"{begin}\n{body}\n{end}\n" if body else f"{begin}\n{end}\n"
+
+
+def _legacy_set(legacy: List[str]) -> set:
+    return {line.strip() for line in legacy if line.strip()}
+
+
+def _drop_legacy_lines(text: str, legacy: List[str]) -> str:
+    """
+    Remove the copies of our own lines that older versions appended: the
+    run of legacy (and blank) lines at the very end of the file. Equal
+    lines elsewhere are the user's and stay.
+    """
+    wanted = _legacy_set(legacy)
+    lines = text.splitlines(keepends=True)
+    cut = len(lines)
+    while cut and (not lines[cut - 1].strip() or lines[cut - 1].strip() in wanted):
+        cut -= 1
+    if not any(line.strip() for line in lines[cut:]):
+        return text  # only trailing blank lines, nothing of ours
+    return "".join(lines[:cut])
+
+
+def _find_block(text: str, begin: str, end: str) -> Optional[Tuple[int, int]]:
+    """
+    (start, stop) of the last complete block in `text`, stop including the
+    end marker's newline; None if there is none. A begin marker without an
+    end marker is not a block.
+    """
+    start = text.rfind(begin)
+    while start != -1:
+        stop = text.find(end, start)
+        if stop != -1:
+            stop += len(end)
+            # Swallow the newline that terminated the old end marker
+            if text.startswith("\r\n", stop):
+                stop += 2
+            elif text.startswith("\n", stop):
+                stop += 1
+            return start, stop
+        start = text.rfind(begin, 0, start)
+    return None
+
+
+def replace_managed_block(text: str, body: Union[str, List[str]],
+                          name: str = BLOCK_NAME, comment: str = "#",
+                          legacy: Optional[List[str]] = None) -> str:
+    """
+    Return `text` with the managed block replaced by `body`.
+
+    If no block exists yet it is appended to the end of the file,
+    separated from existing content by a blank line; a begin marker
+    without its end marker does not count, and whatever follows it is left
+    alone. When the block is first added, lines listed in `legacy` that
+    end the file are dropped, so rc files written by the old append-only
+    code migrate cleanly.
+    """
+    begin, end = _markers(name, comment)
+    block = render_block(body, name, comment)
+
+    found = _find_block(text, begin, end)
+    if found:
+        return text[:found[0]] + block + text[found[1]:]
+
+    if legacy:
+        text = _drop_legacy_lines(text, legacy)
+    if not text:
+        return block
+    if text.endswith("\n\n"):
+        separator = ""
+    elif text.endswith("\n"):
+        separator = "\n"
+    else:
+        separator = "\n\n"
+    return text + separator + block
+
+
+def read_managed_block(path: str, name: str = BLOCK_NAME,
+                       comment: str = "#") -> Optional[str]:
+    """Return the body of the managed block in `path`, or None if absent."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    begin, end = _markers(name, comment)
+    found = _find_block(text, begin, end)
+    if found is None:
+        return None
+    start, stop = found
+    return text[start + len(begin):text.rfind(end, start, stop)].strip("\r\n")
+
+
+def atomic_write_text(path: str, text: str) -> None:
+    """Write `text` to `path` via a temp file in the same dir + rename."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            # Keep the user's permission bits on the rewritten file
+            try:
+                os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+            except OSError:
+                pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def update_managed_block(
+    path: str,
+    body: Union[str, List[str]],
+    name: str = BLOCK_NAME,
+    comment: str = "#",
+    before_write: Optional[Callable[[str], object]] = None,
+    legacy: Optional[List[str]] = None,
+) -> bool:
+    """
+    Patch the managed block in `path` so it contains `body`.
+
+    Returns True if the file was rewritten, False if the block was
+    already up to date. `before_write(path)` is called right before an
+    actual write (e.g. to take a backup). See replace_managed_block for
+    `legacy`.
+    """
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            current = f.read()
+    else:
+        current = ""
+
+    begin, end = _markers(name, comment)
+    if begin in current and _find_block(current, begin, end) is None:
+        print(f"[WARN] {path}: '{begin}' has no end marker; "
+              "adding a new block and leaving the rest as is")
+    updated = replace_managed_block(current, body, name, comment, legacy)
+    if legacy:
+        found = _find_block(updated, begin, end)
+        outside = updated[:found[0]] + updated[found[1]:] if found else updated
+        wanted = _legacy_set(legacy)
+        for line in outside.splitlines():
+            if line.strip() in wanted:
+                print(f"[WARN] {path}: '{line.strip()}' is also set outside "
+                      "the managed block; left as is")
+    if updated == current:
+        return False
+
+    if before_write and os.path.exists(path):
+        before_write(path)
+    atomic_write_text(path, updated)
+    return True
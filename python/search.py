@@ -0,0 +1,378 @@
+"""
+Offline search of the winget package repository (`python main.py search`).
+
+winget publishes its whole repository as a SQLite database inside
+SOURCE_URL (Public/index.db in an msix/zip). The packages it lists (id,
+name, moniker, tags and latest version) are copied into a local SQLite
+FTS5 index under DOTFILE_ROOT/winget-index, so looking up an id for
+apps.json is a millisecond query that works without a network.
+
+Matches are ranked with bm25 over id, name, moniker and tags (weighted
+in that order of importance), after exact id and moniker matches. Every
+query word is a prefix match, so `chrom dev` finds Google.Chrome.Dev.
+
+The source is re-checked at most every REFRESH_TTL (or with --refresh)
+by an ETag request. When it changed, only packages whose row differs are
+rewritten; the FTS index follows the packages table through triggers.
+A source that was already indexed (same SHA-256) is not opened at all.
+
+--add-to SECTION appends picked results to a catalog section, json/apps.json
+by default or any overlay file (python/layers.py).
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
+import zipfile
+from contextlib import closing
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from python.config import APPS_JSON_LOCAL, DOTFILE_ROOT
+from python.rcfile import atomic_write_text
+
+SOURCE_URL = "https://cdn.winget.microsoft.com/cache/source.msix"
+SOURCE_MEMBER = "Public/index.db"
+INDEX_DIR = os.path.join(DOTFILE_ROOT, "winget-index")
+INDEX_DB = os.path.join(INDEX_DIR, "packages.db")
+# Seconds before the source is checked for changes again
+REFRESH_TTL = 24 * 3600
+# bm25 weights of the FTS columns: id, name, moniker, tags
+WEIGHTS = (10.0, 8.0, 6.0, 2.0)
+DEFAULT_LIMIT = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS packages (
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    moniker TEXT,
+    version TEXT,
+    tags TEXT,
+    digest TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS packages_fts USING fts5(
+    id, name, moniker, tags,
+    content='packages', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS packages_ai AFTER INSERT ON packages BEGIN
+    INSERT INTO packages_fts(rowid, id, name, moniker, tags)
+    VALUES (new.rowid, new.id, new.name, new.moniker, new.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS packages_ad AFTER DELETE ON packages BEGIN
+    INSERT INTO packages_fts(packages_fts, rowid, id, name, moniker, tags)
+    VALUES ('delete', old.rowid, old.id, old.name, old.moniker, old.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS packages_au AFTER UPDATE ON packages BEGIN
+    INSERT INTO packages_fts(packages_fts, rowid, id, name, moniker, tags)
+    VALUES ('delete', old.rowid, old.id, old.name, old.moniker, old.tags);
+    INSERT INTO packages_fts(rowid, id, name, moniker, tags)
+    VALUES (new.rowid, new.id, new.name, new.moniker, new.tags);
+END;
+"""
+
+Package = Dict[str, Any]
+
+
+class SearchIndexError(Exception):
+    """The winget index is missing and could not be built."""
+
+
+def open_index(path: str = INDEX_DB) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.executescript(SCHEMA)
+    except sqlite3.OperationalError as e:
+        conn.close()
+        raise SearchIndexError(f"SQLite here has no FTS5 support ({e})")
+    return conn
+
+
+def _meta(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(conn: sqlite3.Connection, **values: Any) -> None:
+    conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                     [(k, str(v)) for k, v in values.items()])
+
+
+# Reading the winget source
+
+
+def version_key(version: str) -> Tuple:
+    """Sort key for winget versions: numeric parts compare as numbers."""
+    return tuple((0, int(p), "") if p.isdigit() else (1, 0, p.lower())
+                 for p in re.split(r"[.\-+_]", version or ""))
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _tags(conn: sqlite3.Connection, tables: set) -> Dict[int, List[str]]:
+    """Tags by owner rowid (manifest or package), from whichever map exists."""
+    for base in ("tags2", "tags"):
+        mapping = base + "_map"
+        if base in tables and mapping in tables:
+            owner = [c for c in _columns(conn, mapping) if c != "tag"]
+            if len(owner) != 1:
+                continue
+            tags: Dict[int, List[str]] = {}
+            query = (f"SELECT m.{owner[0]}, t.tag FROM {mapping} m "
+                     f"JOIN {base} t ON t.rowid = m.tag")
+            for rowid, tag in conn.execute(query):
+                tags.setdefault(rowid, []).append(tag)
+            return tags
+    return {}
+
+
+def read_source(db_path: str) -> Dict[str, Package]:
+    """Latest version of every package in a winget index.db, by id."""
+    with closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)) as conn:
+        tables = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        tags = _tags(conn, tables)
+        packages: Dict[str, Package] = {}
+
+        if "packages" in tables:  # source2: one row per package
+            columns = _columns(conn, "packages")
+            moniker = "moniker" if "moniker" in columns else "NULL"
+            version = "latest_version" if "latest_version" in columns else "NULL"
+            rows = conn.execute(
+                f"SELECT rowid, id, name, {moniker}, {version} FROM packages")
+        elif "manifest" in tables:  # source v1: one row per manifest (version)
+            rows = conn.execute(
+                "SELECT m.rowid, i.id, n.name, mo.moniker, v.version FROM manifest m "
+                "JOIN ids i ON i.rowid = m.id JOIN names n ON n.rowid = m.name "
+                "LEFT JOIN monikers mo ON mo.rowid = m.moniker "
+                "JOIN versions v ON v.rowid = m.version")
+        else:
+            raise SearchIndexError(f"{db_path} is not a winget index (no packages or manifest table)")
+
+        for rowid, pkg_id, name, moniker, version in rows:
+            current = packages.get(pkg_id)
+            row_tags = tags.get(rowid, [])
+            if current and version_key(current["version"] or "") >= version_key(version or ""):
+                current["tags"].update(row_tags)
+                continue
+            packages[pkg_id] = {"id": pkg_id, "name": name, "moniker": moniker,
+                                "version": version,
+                                "tags": set(row_tags) | (current["tags"] if current else set())}
+
+    for package in packages.values():
+        package["tags"] = " ".join(sorted(package["tags"], key=str.lower))
+    return packages
+
+
+def _row_digest(package: Package) -> str:
+    data = json.dumps([package[k] for k in ("name", "moniker", "version", "tags")],
+                      ensure_ascii=False)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def _extract(data: bytes, workdir: str) -> str:
+    """Path of the index.db in `data` (an msix/zip, or the database itself)."""
+    path = os.path.join(workdir, "source")
+    with open(path, "wb") as f:
+        f.write(data)
+    if not zipfile.is_zipfile(path):
+        return path
+    with zipfile.ZipFile(path) as archive:
+        try:
+            return archive.extract(SOURCE_MEMBER, workdir)
+        except KeyError:
+            raise SearchIndexError(f"{SOURCE_MEMBER} not found in the winget source")
+
+
+def apply_source(conn: sqlite3.Connection, packages: Dict[str, Package]) -> Dict[str, int]:
+    """Bring the packages table in line with `packages`; counts of the changes."""
+    stored = {row[0]: (row[1], row[2]) for row in
+              conn.execute("SELECT id, digest, rowid FROM packages")}
+    counts = {"added": 0, "updated": 0, "removed": 0}
+    with conn:
+        for pkg_id in set(stored) - set(packages):
+            conn.execute("DELETE FROM packages WHERE rowid = ?", (stored[pkg_id][1],))
+            counts["removed"] += 1
+        for pkg_id, package in packages.items():
+            digest = _row_digest(package)
+            values = (package["name"], package["moniker"], package["version"],
+                      package["tags"], digest)
+            if pkg_id not in stored:
+                conn.execute("INSERT INTO packages (name, moniker, version, tags, digest, id) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", values + (pkg_id,))
+                counts["added"] += 1
+            elif stored[pkg_id][0] != digest:
+                conn.execute("UPDATE packages SET name = ?, moniker = ?, version = ?, "
+                             "tags = ?, digest = ?, id = ? WHERE rowid = ?",
+                             values + (pkg_id, stored[pkg_id][1]))
+                counts["updated"] += 1
+    return counts
+
+
+def _source_bytes(source: Optional[str]) -> bytes:
+    if source:
+        with open(source, "rb") as f:
+            return f.read()
+    from python.mirrors import conditional_fetch
+    return conditional_fetch(SOURCE_URL, timeout=60)
+
+
+def refresh(conn: sqlite3.Connection, source: Optional[str] = None,
+            force: bool = False, offline: bool = False) -> None:
+    """
+    Update the index from `source` (a local msix or index.db) or SOURCE_URL.
+    Without `force`, SOURCE_URL is only checked once REFRESH_TTL passed.
+    A failed check keeps the existing index if there is one.
+    """
+    checked = float(_meta(conn, "checked") or 0)
+    have_index = _meta(conn, "source_sha256") is not None
+    if offline or (have_index and not source and not force
+                   and time.time() - checked < REFRESH_TTL):
+        if not have_index:
+            raise SearchIndexError("No winget index yet; run once without --offline "
+                                   "or pass --source PATH")
+        return
+
+    started = time.perf_counter()
+    try:
+        data = _source_bytes(source)
+    except Exception as e:
+        if not have_index:
+            raise SearchIndexError(f"Could not fetch the winget source: {e}")
+        print(f"[WARN] Could not check the winget source ({e}); using the existing index")
+        return
+
+    digest = hashlib.sha256(data).hexdigest()
+    if digest == _meta(conn, "source_sha256"):
+        with conn:
+            _set_meta(conn, checked=time.time())
+        print("[DEBUG] winget source unchanged")
+        return
+
+    print(f"[*] Indexing winget source ({len(data) / 1024 / 1024:.1f} MB)...")
+    with tempfile.TemporaryDirectory() as workdir:
+        packages = read_source(_extract(data, workdir))
+    counts = apply_source(conn, packages)
+    with conn:
+        _set_meta(conn, source_sha256=digest, checked=time.time(),
+                  source=source or SOURCE_URL)
+    print(f"[OK] winget index: {len(packages)} packages "
+          f"(+{counts['added']} ~{counts['updated']} -{counts['removed']}) "
+          f"in {time.perf_counter() - started:.1f} s")
+
+
+# Querying
+
+
+def fts_query(text: str) -> Optional[str]:
+    """FTS5 query for free text: every word must match as a prefix."""
+    words = re.findall(r"\w+", text, flags=re.UNICODE)
+    return " ".join(f'"{w}"*' for w in words) or None
+
+
+def search(conn: sqlite3.Connection, text: str, limit: int = DEFAULT_LIMIT) -> List[Package]:
+    """Best matches for `text`, exact id/moniker matches first."""
+    query = fts_query(text)
+    if not query:
+        return []
+    rows = conn.execute(
+        "SELECT p.id, p.name, p.moniker, p.version, p.tags FROM packages_fts f "
+        "JOIN packages p ON p.rowid = f.rowid WHERE packages_fts MATCH ? "
+        "ORDER BY (p.id = ? COLLATE NOCASE) DESC, (p.moniker = ? COLLATE NOCASE) DESC, "
+        f"bm25(packages_fts, {', '.join(str(w) for w in WEIGHTS)}) LIMIT ?",
+        (query, text.strip(), text.strip(), limit))
+    return [dict(row) for row in rows]
+
+
+def print_results(results: List[Package], elapsed: float) -> None:
+    if not results:
+        print(f"[INFO] No matches ({elapsed * 1000:.1f} ms)")
+        return
+    width = max(len(r["id"]) for r in results)
+    for number, result in enumerate(results, 1):
+        version = f" {result['version']}" if result["version"] else ""
+        moniker = f" [{result['moniker']}]" if result["moniker"] else ""
+        print(f"  {number:>2}. {result['id']:<{width}}  {result['name']}{version}{moniker}")
+    print(f"[INFO] {len(results)} match(es) in {elapsed * 1000:.1f} ms")
+
+
+# Catalog authoring
+
+
+def add_to_catalog(packages: Iterable[Package], section: str,
+                   path: str = APPS_JSON_LOCAL) -> int:
+    """
+    Append `packages` to `section` of the catalog (or overlay) file at
+    `path`, creating either if needed. Ids already in the file are
+    skipped. Returns the number of apps added.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            document = json.load(f)
+    except FileNotFoundError:
+        document = []
+    sections = document.setdefault("sections", []) if isinstance(document, dict) else document
+    if not isinstance(sections, list):
+        raise ValueError(f"{path}: expected a list of sections")
+
+    present = {app.get("id"): s.get("section") for s in sections for app in s.get("apps", [])}
+    target = next((s for s in sections if s.get("section") == section), None)
+    added = 0
+    for package in packages:
+        if package["id"] in present:
+            print(f"[INFO] {package['id']} is already in '{present[package['id']]}'")
+            continue
+        if target is None:
+            target = {"section": section, "apps": []}
+            sections.append(target)
+        target.setdefault("apps", []).append({"name": package["name"], "id": package["id"]})
+        present[package["id"]] = section
+        print(f"[OK] Added {package['name']} ({package['id']}) to '{section}'")
+        added += 1
+
+    if added:
+        atomic_write_text(path, json.dumps(document, indent=2, ensure_ascii=False) + "\n")
+        if os.path.abspath(path) == os.path.abspath(APPS_JSON_LOCAL):
+            print("[INFO] Run 'python main.py manifest' to republish the catalog hashes")
+    return added
+
+
+def run_search(text: str, limit: int = DEFAULT_LIMIT, source: Optional[str] = None,
+               refresh_now: bool = False, offline: bool = False,
+               add_to: Optional[str] = None, picks: Optional[List[int]] = None,
+               catalog: str = APPS_JSON_LOCAL) -> bool:
+    """The `search` subcommand; False if the index is unavailable or a pick is invalid."""
+    try:
+        conn = open_index()
+    except SearchIndexError as e:
+        print(f"[ERROR] {e}")
+        return False
+    with closing(conn):
+        try:
+            refresh(conn, source=source, force=refresh_now, offline=offline)
+        except SearchIndexError as e:
+            print(f"[ERROR] {e}")
+            return False
+        if not text.strip():
+            return True
+
+        started = time.perf_counter()
+        results = search(conn, text, limit)
+        print_results(results, time.perf_counter() - started)
+
+    if add_to and results:
+        picks = picks or [1]
+        invalid = [n for n in picks if not 1 <= n <= len(results)]
+        if invalid:
+            print(f"[ERROR] --pick {invalid[0]} is not one of the {len(results)} result(s)")
+            return False
+        add_to_catalog([results[n - 1] for n in picks], add_to, catalog)
+    return True
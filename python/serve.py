@@ -0,0 +1,143 @@
+"""
+LAN mirror of the catalog and dotfiles (`python main.py serve`).
+
+Serves the repo's json/ and dotfiles/ directories over HTTP under the
+same paths as raw.githubusercontent.com/<user>/<repo>/master, so a
+machine started with `--mirror http://<host>:<port>` fetches them from
+here instead of GitHub (python/mirrors.py).
+
+json/manifest.json is generated on the fly with per-section hashes, and
+the sections are served as json/parts/<sha256>.json (python/manifest.py),
+so clients of a LAN mirror fetch only the sections that changed.
+
+Every response carries a strong ETag (SHA-256 of the file) and
+`Cache-Control: no-cache`, and a request whose If-None-Match matches is
+answered with 304 and no body. ETags are cached per file until its size
+or mtime changes, so files are only hashed after an edit. Nothing
+outside SERVED_DIRS is reachable.
+"""
+
+import hashlib
+import mimetypes
+import os
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from python.config import BASE_DIR
+from python.manifest import MANIFEST_NAME, PARTS_DIR, build_manifest, manifest_text, part_blob
+
+SERVED_DIRS = ("json", "dotfiles")
+DEFAULT_PORT = 8000
+
+# Profiles and scripts are served as text, like raw.githubusercontent.com
+TEXT_TYPE = "text/plain; charset=utf-8"
+TYPES = {".json": "application/json; charset=utf-8"}
+
+_lock = threading.Lock()
+_etags: Dict[str, Tuple[int, int, str]] = {}  # path -> (size, mtime_ns, etag)
+
+
+def etag_for(path: str) -> str:
+    """Quoted strong ETag for `path`, rehashed only after it changes."""
+    stat = os.stat(path)
+    with _lock:
+        cached = _etags.get(path)
+        if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    etag = f'"{digest.hexdigest()}"'
+    with _lock:
+        _etags[path] = (stat.st_size, stat.st_mtime_ns, etag)
+    return etag
+
+
+def resolve(root: str, url_path: str) -> Optional[str]:
+    """The file under one of SERVED_DIRS that `url_path` names, else None."""
+    relative = unquote(urlsplit(url_path).path).lstrip("/")
+    top = relative.split("/", 1)[0]
+    if top not in SERVED_DIRS:
+        return None
+    base = os.path.realpath(os.path.join(root, top))
+    path = os.path.realpath(os.path.join(root, relative))
+    if not path.startswith(base + os.sep) or not os.path.isfile(path):
+        return None
+    return path
+
+
+def generated(root: str, url_path: str) -> Optional[bytes]:
+    """The live manifest or a catalog part, if `url_path` names one."""
+    relative = unquote(urlsplit(url_path).path).lstrip("/")
+    if relative == f"json/{MANIFEST_NAME}":
+        return manifest_text(build_manifest(root, parts=True)).encode("utf-8")
+    prefix = f"json/{PARTS_DIR}/"
+    if relative.startswith(prefix) and relative.endswith(".json"):
+        return part_blob(root, relative[len(prefix):-len(".json")])
+    return None
+
+
+def make_handler(root: str):
+    class MirrorHandler(BaseHTTPRequestHandler):
+        server_version = "SampongMirror/1.0"
+
+        def _respond(self, with_body: bool) -> None:
+            body = generated(root, self.path)
+            path = None if body is not None else resolve(root, self.path)
+            if body is None and path is None:
+                self.send_error(404)
+                return
+            if body is not None:
+                etag = f'"{hashlib.sha256(body).hexdigest()}"'
+                path = self.path.split("?", 1)[0]
+            else:
+                etag = etag_for(path)
+            matches = [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]
+            if etag in matches or "*" in matches:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                return
+
+            if body is None:
+                with open(path, "rb") as f:
+                    body = f.read()
+            kind = TYPES.get(os.path.splitext(path)[1].lower())
+            if kind is None:
+                guessed = mimetypes.guess_type(path)[0] or ""
+                kind = guessed if guessed.startswith("image/") else TEXT_TYPE
+            self.send_response(200)
+            self.send_header("Content-Type", kind)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            if with_body:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            self._respond(with_body=True)
+
+        def do_HEAD(self):
+            self._respond(with_body=False)
+
+    return MirrorHandler
+
+
+def serve(host: str = "0.0.0.0", port: int = DEFAULT_PORT, root: str = BASE_DIR) -> None:
+    """Serve `root`'s json/ and dotfiles/ until interrupted."""
+    server = ThreadingHTTPServer((host, port), make_handler(root))
+    shown = socket.gethostname() if host in ("0.0.0.0", "") else host
+    print(f"[*] Serving {', '.join(d + '/' for d in SERVED_DIRS)} from {root}")
+    print(f"[INFO] Clients: python main.py --mirror http://{shown}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[INFO] Mirror stopped")
+    finally:
+        server.server_close()
@@ -0,0 +1,83 @@
+"""
+Session-scoped winget source refresh.
+
+Every `winget install` may check (and refresh) its source indexes on its
+own, and without --source it consults every configured source. We run
+one explicit `winget source update` before a session's first winget
+call, then pin later calls to that freshly updated source with --source.
+If the update fails, or has not run, calls go out exactly as before (no
+pin). The refresh blocks, so async callers run it in an executor.
+
+Per-install overhead, the time from starting winget until it reports the
+package it found, is collected so the saving can be seen at the end.
+"""
+
+import statistics
+import subprocess
+import threading
+import time
+from typing import List, Optional
+
+# Source refreshed once per session and pinned afterwards
+SOURCE_NAME = "winget"
+
+_lock = threading.Lock()
+_state = {"refreshed": None, "seconds": 0.0}  # refreshed: None = not tried yet
+_overheads: List[float] = []
+
+
+def ensure_source_session(timeout: int = 180) -> bool:
+    """Run `winget source update` once per process; True if it succeeded."""
+    with _lock:
+        if _state["refreshed"] is not None:
+            return _state["refreshed"]
+
+        started = time.perf_counter()
+        try:
+            result = subprocess.run(
+                ["winget", "source", "update", "--name", SOURCE_NAME,
+                 "--disable-interactivity"],
+                capture_output=True, text=True, encoding="utf-8",
+                errors="replace", timeout=timeout,
+            )
+            ok = result.returncode == 0
+        except (OSError, subprocess.SubprocessError):
+            ok = False
+        _state["seconds"] = time.perf_counter() - started
+        _state["refreshed"] = ok
+
+        if ok:
+            print(f"[OK] winget source '{SOURCE_NAME}' updated for this session "
+                  f"({_state['seconds']:.1f}s)")
+        else:
+            print("[WARN] winget source update failed; "
+                  "installs will check sources themselves")
+        return ok
+
+
+def source_args() -> List[str]:
+    """
+    Extra winget arguments for this session (the pinned source, if any).
+    Only reads the outcome of ensure_source_session(); never refreshes.
+    """
+    with _lock:
+        return ["--source", SOURCE_NAME] if _state["refreshed"] else []
+
+
+def record_overhead(seconds: float) -> None:
+    """Time one winget invocation spent before it started on the package."""
+    with _lock:
+        _overheads.append(seconds)
+
+
+def overhead_report() -> Optional[str]:
+    """One-line summary of the per-install overhead seen so far."""
+    with _lock:
+        if not _overheads:
+            return None
+        refresh = ("source refreshed once in "
+                   f"{_state['seconds']:.1f}s" if _state["refreshed"]
+                   else "no session refresh")
+        return (f"winget overhead per install: median "
+                f"{statistics.median(_overheads):.1f}s over "
+                f"{len(_overheads)} install(s) ({refresh})")
@@ -3,13 +3,34 @@ from .config import (
     SHELLS_JSON_URL,
     fetch_json,
     DOTFILE_ROOT,
+    DOTFILES_DIR,
     RESET_PROFILES,
 )
+from .activation import build_activation_cache
+from .deploy import deploy_dotfile
+from .rcfile import update_managed_block
+from .startup_lint import lint_file, print_findings
 import os
 import platform
 import shutil
 from datetime import datetime
 
+# Repo dotfiles (relative to DOTFILES_DIR / DOTFILE_ROOT) deployed per shell
+NU_DOTFILE = os.path.join("nu", "main_profile.nu")
+BASH_DOTFILE = os.path.join("bash", "main.sh")
+BASH_PROMPT_DOTFILE = os.path.join("bash", "prompt.sh")
+POSH_DOTFILE = os.path.join("PowerShell", "posh_profile.ps1")
+
+# Lines older versions put in the PowerShell profile that we now remove:
+# vfox is activated by posh_profile.ps1 (from the activation cache)
+POSH_RETIRED = ['Invoke-Expression "$(vfox activate pwsh)"']
+
+SHELL_DOTFILES = {
+    "powershell": [POSH_DOTFILE],
+    "nushell": [NU_DOTFILE],
+    "bash": [BASH_DOTFILE, BASH_PROMPT_DOTFILE],
+}
+
 
 def ensure_dir(path: str) -> None:
     """Create directory if it does not exist."""
@@ -48,120 +69,150 @@ def reset_profile(path: str, initial_content: str = "") -> None:
     print(f"[RESET] Created new profile at {path}")
 
 
+def apply_managed_block(path: str, lines: list, header: str = "",
+                        retired: list = None) -> bool:
+    """
+    Write our entries into the managed block of a user rc file.
+
+    Content outside the block is preserved, except for stray copies of
+    `lines` (and `retired` lines we no longer write) appended by older
+    versions of this tool. With --reset-profiles the file is backed up and
+    reset to `header` first (old behaviour).
+    """
+    if RESET_PROFILES:
+        reset_profile(path, header)
+
+    changed = update_managed_block(
+        path, lines, before_write=backup_profile,
+        legacy=lines + (retired or []),
+    )
+    if changed:
+        print(f"[OK] Updated managed block in {path}")
+    else:
+        print(f"[SKIP] Managed block already up to date in {path}")
+    return changed
+
+
+def deploy_profile(relative_path: str, backup: bool = True) -> str:
+    """
+    Deploy a repo dotfile (e.g. "bash/main.sh") into DOTFILE_ROOT.
+
+    Copies by default; --link / --hardlink deploy by link instead so repo
+    edits take effect on the next shell start. Returns the deployed path.
+    """
+    src = os.path.join(DOTFILES_DIR, relative_path)
+    dst = os.path.join(DOTFILE_ROOT, relative_path)
+    method = deploy_dotfile(
+        src, dst, before_replace=backup_profile if backup else None
+    )
+    if method == "unchanged":
+        print(f"[SKIP] {dst} already up to date")
+    else:
+        print(f"[OK] Deployed {relative_path} ({method}) → {dst}")
+
+    # Report constructs that cost time on every shell start or prompt
+    print_findings(lint_file(src), DOTFILES_DIR)
+    return dst
+
+
+def nushell_config_path() -> str:
+    """Path of NuShell's config.nu that sources our profile."""
+    appdata = os.getenv("APPDATA") or os.path.expanduser("~/.config")
+    return os.path.join(appdata, "nushell", "config.nu")
+
+
+def posh_profile_path() -> str:
+    """Path of the PowerShell 7 user profile that imports our profile."""
+    if platform.system() == "Windows":
+        return os.path.expandvars(
+            r"%USERPROFILE%\Documents\PowerShell\Microsoft.PowerShell_profile.ps1"
+        )
+    return os.path.expanduser(
+        "~/.config/powershell/Microsoft.PowerShell_profile.ps1"
+    )
+
+
+# Managed-block bodies, shared with script/installer.py so both write
+# the same lines for the same profile
+
+
+def nushell_entries(main_profile: str) -> list:
+    """config.nu lines that load `main_profile`."""
+    path = main_profile.replace("\\", "/")
+    return [
+        f"use {path} *",
+        'load_theme "zash.omp.json"',
+        "$env.config.show_banner = false",
+    ]
+
+
+def bash_entries(main_sh: str) -> list:
+    """.bashrc lines that source `main_sh`."""
+    return [
+        "# Source Sampong bash customizations",
+        f'source "{main_sh}"',
+    ]
+
+
+def posh_entries(profile: str) -> list:
+    """PowerShell profile lines that import `profile`."""
+    return [
+        f'Import-Module (Resolve-Path "{profile}")',
+        "Import-Module -Name Microsoft.WinGet.CommandNotFound",
+    ]
+
+
 # ---------------- NuShell ---------------- #
 def configure_nushell():
     print("[*] Configuring NuShell...")
 
-    # 1) Create and reset main profile
-    nu_dir = os.path.join(DOTFILE_ROOT, "nu")
-    ensure_dir(nu_dir)
-    main_profile = os.path.join(nu_dir, "main_profile.nu")
-    with open("./dotfiles/nu/main_profile.nu", "r", encoding="utf-8") as f:
-        content = f.read()
-    reset_profile(main_profile, content)
-
-    # 2) Reset nushell config files
-    nu_cfg = os.path.join(os.getenv("APPDATA"), "nushell")
-    ensure_dir(nu_cfg)
-    # env_nu = os.path.join(nu_cfg, "env.nu")
-    conf_nu = os.path.join(nu_cfg, "config.nu")
-
-    # reset_profile(env_nu, "# NuShell environment config\n")
-    reset_profile(conf_nu, "# NuShell main config\n")
-
-    # 3) Apply Oh-My-Posh theme if found
-    theme_paths = [
-        os.path.join(
-            os.getenv("LOCALAPPDATA"),
-            "Programs",
-            "oh-my-posh",
-            "themes",
-            "spaceship.omp.json",
-        ),
-        os.path.join(
-            os.getenv("PROGRAMFILES"), "oh-my-posh", "themes", "spaceship.omp.json"
-        ),
-    ]
-    # theme = next((p for p in theme_paths if p and os.path.exists(p)), None)
-    entries = [f"use {main_profile.replace('\\', '/')}", 'load_theme "z ash.omp.json"']
+    # 1) Deploy main profile
+    main_profile = deploy_profile(NU_DOTFILE)
 
-    # with open(env_nu, "a", encoding="utf-8") as f:
-    #     f.write("$env.config.show_banner = false\n")
-    #     for entry in entries:
-    #         f.write(f"{entry}\n")
-    #
-    # print("[OK] Applied Oh-My-Posh to NuShell")
+    # 2) Locate nushell config files
+    conf_nu = nushell_config_path()
+    ensure_dir(os.path.dirname(conf_nu))
 
-    # 4) Source custom profile
-    include = f"use {main_profile.replace('\\', '/')}"
-
-    with open(conf_nu, "a", encoding="utf-8") as f:
-        f.write(f"\n{include} * \n")
-        # f.write("main_profile startup\n")
-        f.write('load_theme "zash.omp.json" \n')
-        f.write('$env.config.show_banner = false \n')
-        print(f"[OK] Linked NuShell profile in {conf_nu}")
+    # 3) Source custom profile from our managed block in config.nu
+    apply_managed_block(conf_nu, nushell_entries(main_profile), "# NuShell main config\n")
+    print(f"[OK] Linked NuShell profile in {conf_nu}")
 
 
 # ---------------- Bash ---------------- #
 def configure_bash():
     print("[*] Configuring Bash...")
 
-    # 1) Create and reset main script
-    bash_dir = os.path.join(DOTFILE_ROOT, "bash")
-    ensure_dir(bash_dir)
-    main_sh = os.path.join(bash_dir, "main.sh")
-    with open("./dotfiles/bash/main.sh", "r", encoding="utf-8") as f:
-        content = f.read()
-    reset_profile(main_sh, content)
+    # 1) Deploy main script, its prompt helper (sourced by main.sh from
+    #    the same folder) and pre-render its tool activation
+    main_sh = deploy_profile(BASH_DOTFILE)
+    deploy_profile(BASH_PROMPT_DOTFILE)
+    build_activation_cache("bash")
 
-    # 2) Reset .bashrc
+    # 2) Source main script from our managed block in .bashrc
     bashrc = os.path.expanduser("~/.bashrc")
-    reset_profile(bashrc, "# Bash configuration\n")
-
-    # 3) Add source line
-    source_line = f'source "{main_sh}"'
-    with open(bashrc, "a", encoding="utf-8") as f:
-        f.write(f"\n# Source Sampong bash customizations\n{source_line}\n")
-        print(f"[OK] Updated .bashrc → {bashrc}")
+    apply_managed_block(bashrc, bash_entries(main_sh), "# Bash configuration\n")
+    print(f"[OK] Updated .bashrc → {bashrc}")
 
 
 # ---------------- PowerShell ---------------- #
 def configure_posh():
     print("[*] Configuring PowerShell...")
 
-    # 1) Create and reset main profile
-    posh_dir = os.path.join(DOTFILE_ROOT, "PowerShell")
-    ensure_dir(posh_dir)
-    profile = os.path.join(posh_dir, "posh_profile.ps1")
-    with open("./dotfiles/PowerShell/posh_profile.ps1", "r", encoding="utf-8") as f:
-        content = f.read()
-    reset_profile(profile, content)
-
-    # 2) Reset PowerShell profile
-    if platform.system() == "Windows":
-        profile_path = os.path.expandvars(
-            r"%USERPROFILE%\Documents\PowerShell\Microsoft.PowerShell_profile.ps1"
-        )
-    else:
-        profile_path = os.path.expanduser(
-            "~/.config/powershell/Microsoft.PowerShell_profile.ps1"
-        )
+    # 1) Deploy main profile and pre-render its tool activation
+    profile = deploy_profile(POSH_DOTFILE)
+    build_activation_cache("pwsh")
 
+    # 2) Locate PowerShell profile
+    profile_path = posh_profile_path()
     ensure_dir(os.path.dirname(profile_path))
-    reset_profile(profile_path, "# PowerShell main configuration\n")
-
-    # 3) Add required entries
-    entries = [
-        f'Import-Module (Resolve-Path "{profile}")',
-        "Import-Module -Name Microsoft.WinGet.CommandNotFound",
-        'Invoke-Expression "$(vfox activate pwsh)"',
-    ]
 
-    with open(profile_path, "a", encoding="utf-8") as f:
-        for entry in entries:
-            f.write(f"{entry}\n")
-        print(f"[OK] Added to PowerShell profile → {profile_path}")
+    # 3) Add required entries to our managed block. vfox is activated by
+    #    posh_profile.ps1 (from the cache), so it is no longer added here.
+    apply_managed_block(
+        profile_path, posh_entries(profile), "# PowerShell main configuration\n",
+        retired=POSH_RETIRED,
+    )
+    print(f"[OK] Added to PowerShell profile → {profile_path}")
 
 
 # ---------------- Dispatcher ---------------- #
@@ -0,0 +1,419 @@
+"""
+Static startup-cost analyzer for the shell dotfiles.
+
+Flags constructs in dotfiles/ that cost time on every shell start (top-level
+command substitutions, `eval "$(...)"`, `source <(...)`, `Invoke-Expression`
+of tool output, top-level calls into functions that spawn processes) or on
+every prompt render (process spawns inside functions referenced from PS1,
+PROMPT_COMMAND, a PowerShell `prompt` function or a nushell prompt closure).
+
+The parser is deliberately line-based: it understands comments, quoting
+well enough to find them, function bodies by brace depth, and each finding
+is attributed to a file and line. Regions wrapped in
+
+    # startup-lint: off
+    ...
+    # startup-lint: on
+
+are skipped (used for the live-init fallbacks behind the activation cache).
+"""
+
+import os
+import re
+from typing import Dict, List, Optional, Set
+
+from python.config import DOTFILES_DIR
+
+# External tools whose invocation means a process spawn
+EXTERNAL_TOOLS = {
+    "awk", "cat", "curl", "cut", "date", "dpkg", "du", "find", "free",
+    "git", "grep", "head", "hostname", "jq", "ng", "node", "npm",
+    "oh-my-posh", "python", "sed", "sort", "starship", "tail", "uname",
+    "uptime", "vfox", "wc", "wget", "winget", "xrandr", "zoxide",
+}
+
+# Extension → language
+LANGUAGES = {
+    ".sh": "bash",
+    ".bash": "bash",
+    ".bashrc": "bash",
+    ".ps1": "pwsh",
+    ".psm1": "pwsh",
+    ".nu": "nu",
+}
+
+PRAGMA_OFF = "startup-lint: off"
+PRAGMA_ON = "startup-lint: on"
+
+_TOOL_RE = re.compile(
+    r"(?:^|[\s;|&({`])\^?(" + "|".join(
+        re.escape(t) for t in sorted(EXTERNAL_TOOLS, key=len, reverse=True)
+    ) + r")(?=$|[\s;|&)}`])"
+)
+
+
+def _finding(path: str, lineno: int, kind: str, rule: str,
+             message: str, line: str) -> Dict[str, object]:
+    return {
+        "file": path,
+        "line": lineno,
+        "kind": kind,  # "startup" or "prompt"
+        "rule": rule,
+        "message": message,
+        "code": line.strip(),
+    }
+
+
+def _strip_comment(line: str) -> str:
+    """Drop a trailing `#` comment that is not inside quotes."""
+    quote = None
+    for i, ch in enumerate(line):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+        elif ch == "#" and (i == 0 or line[i - 1] in " \t;"):
+            return line[:i]
+    return line
+
+
+def _code_lines(text: str, block_comments: bool = False):
+    """Yield (lineno, code) for lines that are not comments or disabled."""
+    enabled = True
+    in_block = False
+    for lineno, raw in enumerate(text.splitlines(), start=1):
+        stripped = raw.strip()
+        if PRAGMA_OFF in stripped:
+            enabled = False
+            continue
+        if PRAGMA_ON in stripped:
+            enabled = True
+            continue
+        if block_comments:
+            if in_block:
+                if "#>" in stripped:
+                    in_block = False
+                continue
+            if stripped.startswith("<#"):
+                in_block = "#>" not in stripped[2:]
+                continue
+        if not enabled:
+            continue
+        code = _strip_comment(raw)
+        if code.strip():
+            yield lineno, code
+
+
+def _spawns(code: str, lang: str) -> Optional[str]:
+    """Describe the process spawn on this line, if any."""
+    if lang == "bash" and ("$(" in code or "`" in code):
+        return "command substitution forks a subshell"
+    if lang == "bash" and "<(" in code:
+        return "process substitution forks a subshell"
+    match = _TOOL_RE.search(code)
+    if match:
+        return f"runs external `{match.group(1)}`"
+    return None
+
+
+class _Function:
+    def __init__(self, name: str, start: int):
+        self.name = name
+        self.start = start
+        self.lines: List[tuple] = []  # (lineno, code)
+
+
+def _scan_functions(lines, def_name) -> tuple:
+    """Split code lines into function bodies and top-level lines."""
+    functions: Dict[str, _Function] = {}
+    top_level = []
+    current = None
+    opened = False
+    depth = 0
+    for lineno, code in lines:
+        if current is None:
+            name = def_name(code)
+            if name is None:
+                top_level.append((lineno, code))
+                continue
+            current = _Function(name, lineno)
+            opened = "{" in code
+            depth = code.count("{") - code.count("}")
+            if opened:
+                current.lines.append((lineno, code[code.index("{") + 1:]))
+        else:
+            opened = opened or "{" in code
+            depth += code.count("{") - code.count("}")
+            current.lines.append((lineno, code))
+
+        if opened and depth <= 0:
+            functions[current.name] = current
+            current = None
+            opened = False
+            depth = 0
+    if current is not None:
+        functions[current.name] = current
+    return functions, top_level
+
+
+def _costly_functions(functions: Dict[str, _Function], lang: str) -> Set[str]:
+    """Functions that spawn processes directly or through another function."""
+    costly = {
+        name for name, fn in functions.items()
+        if any(_spawns(code, lang) for _, code in fn.lines)
+    }
+    changed = True
+    while changed:
+        changed = False
+        for name, fn in functions.items():
+            if name in costly:
+                continue
+            if any(_calls(code, costly) for _, code in fn.lines):
+                costly.add(name)
+                changed = True
+    return costly
+
+
+def _calls(code: str, names: Set[str]) -> Optional[str]:
+    for name in names:
+        if re.search(r"(?:^|[\s;|&({`$])" + re.escape(name) + r"(?=$|[\s;|&)}`])",
+                     code):
+            return name
+    return None
+
+
+def _prompt_findings(path, functions, prompt_refs, lang) -> List[Dict]:
+    """Spawns inside functions that run on every prompt render."""
+    findings = []
+    seen = set()
+    pending = list(prompt_refs)
+    while pending:
+        name = pending.pop()
+        if name in seen or name not in functions:
+            continue
+        seen.add(name)
+        for lineno, code in functions[name].lines:
+            reason = _spawns(code, lang)
+            if reason:
+                findings.append(_finding(
+                    path, lineno, "prompt", "prompt-spawn",
+                    f"`{name}` runs on every prompt and {reason}", code,
+                ))
+            callee = _calls(code, set(functions) - seen)
+            if callee:
+                pending.append(callee)
+    return findings
+
+
+# ---------------- bash ---------------- #
+_BASH_DEF = re.compile(
+    r"^\s*(?:function\s+([\w.:-]+)\s*(?:\(\s*\))?|([\w.:-]+)\s*\(\s*\))\s*\{?"
+)
+
+
+def _bash_def(code: str) -> Optional[str]:
+    match = _BASH_DEF.match(code)
+    return (match.group(1) or match.group(2)) if match else None
+
+
+def lint_bash(path: str, text: str) -> List[Dict]:
+    lines = list(_code_lines(text))
+    functions, top_level = _scan_functions(lines, _bash_def)
+    costly = _costly_functions(functions, "bash")
+    findings = []
+
+    prompt_refs: Set[str] = set()
+    for lineno, code in lines:
+        match = re.search(r"\b(PS1|PROMPT_COMMAND)\+?=(.*)", code)
+        if match:
+            refs = re.findall(r"[\w.:-]+", match.group(2))
+            prompt_refs.update(r for r in refs if r in functions)
+
+    for lineno, code in top_level:
+        if re.search(r"\beval\s+[\"']?\$\(", code):
+            findings.append(_finding(
+                path, lineno, "startup", "eval-subst",
+                "`eval \"$(...)\"` spawns the tool and re-parses its output "
+                "on every start; pre-render it at deploy time", code))
+        elif re.search(r"(?:\bsource|^\s*\.)\s+<\(", code):
+            findings.append(_finding(
+                path, lineno, "startup", "source-procsubst",
+                "`source <(...)` spawns the generator on every start; "
+                "cache its output", code))
+        elif re.search(r"\b(PS1|PROMPT_COMMAND)\+?=", code):
+            continue  # evaluated per prompt, covered below
+        else:
+            reason = _spawns(code, "bash")
+            callee = _calls(code, costly)
+            if reason:
+                findings.append(_finding(
+                    path, lineno, "startup", "top-level-spawn",
+                    f"top-level code {reason} on every start", code))
+            elif callee:
+                findings.append(_finding(
+                    path, lineno, "startup", "top-level-call",
+                    f"calls `{callee}`, which spawns processes, on every "
+                    "start", code))
+
+    findings.extend(_prompt_findings(path, functions, prompt_refs, "bash"))
+    return findings
+
+
+# ---------------- PowerShell ---------------- #
+_PWSH_DEF = re.compile(r"^\s*function\s+([\w.:-]+)", re.IGNORECASE)
+
+
+def _pwsh_def(code: str) -> Optional[str]:
+    match = _PWSH_DEF.match(code)
+    return match.group(1) if match else None
+
+
+_PWSH_IEX = re.compile(r"\b(Invoke-Expression|iex)\b", re.IGNORECASE)
+_PWSH_SLOW = re.compile(
+    r"\b(Get-Command|Get-WmiObject|Get-CimInstance|Invoke-WebRequest|"
+    r"Invoke-RestMethod|Start-Process)\b", re.IGNORECASE)
+
+
+def _pwsh_spawns(code: str) -> Optional[str]:
+    reason = _spawns(code, "pwsh")
+    if reason:
+        return reason
+    match = _PWSH_SLOW.search(code)
+    if match:
+        return f"calls slow cmdlet `{match.group(1)}`"
+    return None
+
+
+def lint_pwsh(path: str, text: str) -> List[Dict]:
+    lines = list(_code_lines(text, block_comments=True))
+    functions, top_level = _scan_functions(lines, _pwsh_def)
+    # PowerShell function names are case-insensitive
+    functions = {name.lower(): fn for name, fn in functions.items()}
+    costly = {
+        name for name, fn in functions.items()
+        if any(_pwsh_spawns(code) for _, code in fn.lines)
+    }
+    findings = []
+
+    for lineno, code in top_level:
+        lowered = code.lower()
+        if re.match(r"\s*(Set|New)-Alias\b", code, re.IGNORECASE):
+            continue  # naming a function is not calling it
+        if _PWSH_IEX.search(code):
+            findings.append(_finding(
+                path, lineno, "startup", "invoke-expression",
+                "`Invoke-Expression` of tool output spawns the tool and "
+                "re-parses its output on every start; pre-render it", code))
+            continue
+        reason = _pwsh_spawns(code)
+        callee = _calls(lowered, costly)
+        if reason:
+            findings.append(_finding(
+                path, lineno, "startup", "top-level-spawn",
+                f"top-level code {reason} on every start", code))
+        elif callee:
+            findings.append(_finding(
+                path, lineno, "startup", "top-level-call",
+                f"calls `{functions[callee].name}`, which is slow, on every "
+                "start", code))
+
+    if "prompt" in functions:
+        for lineno, code in functions["prompt"].lines:
+            reason = _pwsh_spawns(code)
+            if reason:
+                findings.append(_finding(
+                    path, lineno, "prompt", "prompt-spawn",
+                    f"`prompt` runs on every render and {reason}", code))
+    return findings
+
+
+# ---------------- nushell ---------------- #
+_NU_DEF = re.compile(r"^\s*(?:export\s+)?def(?:-env)?\s+([\w.:-]+)")
+
+
+def _nu_def(code: str) -> Optional[str]:
+    match = _NU_DEF.match(code)
+    return match.group(1) if match else None
+
+
+def lint_nu(path: str, text: str) -> List[Dict]:
+    lines = list(_code_lines(text))
+    functions, top_level = _scan_functions(lines, _nu_def)
+    costly = _costly_functions(functions, "nu")
+    findings = []
+
+    in_prompt = 0
+    for lineno, code in top_level:
+        if re.search(r"\$env\.(PROMPT_COMMAND\w*|config\.hooks\.pre_prompt)\s*=",
+                     code):
+            in_prompt = max(1, code.count("{") - code.count("}"))
+            if in_prompt and _spawns(code, "nu"):
+                findings.append(_finding(
+                    path, lineno, "prompt", "prompt-spawn",
+                    f"prompt closure {_spawns(code, 'nu')}", code))
+            continue
+        if in_prompt > 0:
+            in_prompt += code.count("{") - code.count("}")
+            reason = _spawns(code, "nu")
+            if reason:
+                findings.append(_finding(
+                    path, lineno, "prompt", "prompt-spawn",
+                    f"prompt closure {reason}", code))
+            continue
+
+        reason = _spawns(code, "nu")
+        callee = _calls(code, costly)
+        if reason:
+            findings.append(_finding(
+                path, lineno, "startup", "top-level-spawn",
+                f"top-level code {reason} on every start", code))
+        elif callee:
+            findings.append(_finding(
+                path, lineno, "startup", "top-level-call",
+                f"calls `{callee}`, which spawns processes, on every start",
+                code))
+    return findings
+
+
+_LINTERS = {"bash": lint_bash, "pwsh": lint_pwsh, "nu": lint_nu}
+
+
+def language_of(path: str) -> Optional[str]:
+    name = os.path.basename(path).lower()
+    if name in LANGUAGES:
+        return LANGUAGES[name]
+    return LANGUAGES.get(os.path.splitext(name)[1])
+
+
+def lint_file(path: str) -> List[Dict]:
+    """Lint a single dotfile; unknown file types yield no findings."""
+    lang = language_of(path)
+    if lang is None:
+        return []
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    findings = _LINTERS[lang](path, text)
+    return sorted(findings, key=lambda f: f["line"])
+
+
+def lint_tree(root: str = DOTFILES_DIR) -> List[Dict]:
+    """Lint every shell dotfile under `root`."""
+    findings = []
+    for dirpath, _dirnames, files in os.walk(root):
+        for name in sorted(files):
+            findings.extend(lint_file(os.path.join(dirpath, name)))
+    return findings
+
+
+def print_findings(findings: List[Dict], root: str = DOTFILES_DIR) -> None:
+    """Print findings as `file:line [kind] message`."""
+    for f in findings:
+        where = os.path.relpath(f["file"], root)
+        print(f"[LINT] {where}:{f['line']} [{f['kind']}] {f['message']}")
+        print(f"         {f['code']}")
+    if findings:
+        startup = sum(1 for f in findings if f["kind"] == "startup")
+        prompt = len(findings) - startup
+        print(f"[LINT] {startup} per-start and {prompt} per-prompt "
+              "cost finding(s)")
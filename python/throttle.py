@@ -0,0 +1,310 @@
+"""
+Bandwidth shaping and adaptive install concurrency.
+
+Provisioning several machines at once can fill the office uplink. Every
+download this tool makes itself (catalog and profile fetches, the winget
+bootstrap bundle, python/download.py) draws from one process-wide token
+bucket when --max-bandwidth is given. The bucket lets a short burst
+through and then holds the average rate; a caller that takes more than
+is available sleeps off the debt, so concurrent downloads share the rate
+roughly in proportion to what they ask for.
+
+winget downloads installers itself and cannot be shaped byte by byte.
+Their share of the link is steered instead by how many installs run at
+once: with --adaptive, a ConcurrencyController samples the measured
+download throughput, CPU use and disk queue depth every ADAPT_INTERVAL
+seconds and moves the install concurrency between 1 and --concurrency,
+additive increase while more installs buy more throughput,
+multiplicative decrease when the CPU or disk is saturated.
+
+`python main.py bench-link` checks both against a simulated link.
+"""
+
+import asyncio
+import ctypes
+import os
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from python.config import MAX_BANDWIDTH
+
+# Seconds of full rate the bucket holds, i.e. the largest burst
+BURST_SECONDS = 0.5
+CHUNK_SIZE = 64 * 1024
+
+# Seconds between controller decisions
+ADAPT_INTERVAL = 5.0
+# Above either, the machine is saturated and concurrency is halved
+CPU_HIGH = 85.0
+DISK_QUEUE_HIGH = 2.0
+# Throughput must grow by this fraction for another increase to pay off
+MIN_GAIN = 0.10
+# Share of --max-bandwidth at which the link counts as full
+LINK_FULL = 0.9
+# Intervals to stay put after an increase that bought nothing
+PROBE_HOLD = 6
+# Read on Windows by one typeperf running for the sampler's lifetime
+DISK_QUEUE_COUNTER = r"\PhysicalDisk(_Total)\Current Disk Queue Length"
+# /sys/block entries that are not disks, or stack on ones counted already
+VIRTUAL_DISKS = ("loop", "ram", "zram", "dm-", "md")
+
+_lock = threading.Lock()
+_bucket: Dict[str, Optional["TokenBucket"]] = {}
+
+
+class TokenBucket:
+    """Average `rate` bytes/s with bursts up to `burst` bytes; thread-safe."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate * BURST_SECONDS, CHUNK_SIZE))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, size: int) -> float:
+        """Take `size` bytes now; returns the seconds to wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= size
+            return max(0.0, -self.tokens / self.rate)
+
+    def consume(self, size: int) -> None:
+        delay = self.reserve(size)
+        if delay:
+            time.sleep(delay)
+
+    async def consume_async(self, size: int) -> None:
+        delay = self.reserve(size)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def get_bucket() -> Optional[TokenBucket]:
+    """The bucket for --max-bandwidth, or None when downloads are unlimited."""
+    with _lock:
+        if "global" not in _bucket:
+            _bucket["global"] = TokenBucket(MAX_BANDWIDTH) if MAX_BANDWIDTH else None
+        return _bucket["global"]
+
+
+def throttle(size: int, bucket: Optional[TokenBucket] = None) -> None:
+    """Account `size` downloaded bytes against the bandwidth limit."""
+    bucket = bucket or get_bucket()
+    if bucket:
+        bucket.consume(size)
+
+
+# System load
+
+
+class SystemSampler:
+    """CPU use (%) and disk queue depth since the previous sample."""
+
+    def __init__(self, interval: float = ADAPT_INTERVAL):
+        self._cpu = self._cpu_times()
+        self._queue: Optional[float] = None
+        self._typeperf: Optional[subprocess.Popen] = None
+        if os.name == "nt":
+            self._start_typeperf(interval)
+
+    def _start_typeperf(self, interval: float) -> None:
+        """Have typeperf print the disk queue every `interval` seconds."""
+        try:
+            self._typeperf = subprocess.Popen(
+                ["typeperf", DISK_QUEUE_COUNTER, "-si", str(max(1, round(interval)))],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+            )
+        except OSError:
+            return  # no disk signal
+        threading.Thread(target=self._read_typeperf, args=(self._typeperf.stdout,),
+                         daemon=True).start()
+
+    def _read_typeperf(self, stream) -> None:
+        # Rows are "timestamp","value"; headers and notices don't parse
+        for line in stream:
+            try:
+                self._queue = float(line.strip().rsplit(",", 1)[1].strip('"'))
+            except (IndexError, ValueError):
+                continue
+        self._queue = None  # typeperf exited
+
+    def close(self) -> None:
+        """Stop the typeperf reader, if any."""
+        if self._typeperf and self._typeperf.poll() is None:
+            self._typeperf.kill()
+            self._typeperf.wait()
+
+    @staticmethod
+    def _cpu_times():
+        """(idle, total) CPU time counters, or None if unavailable."""
+        if os.name == "nt":
+            idle, kernel, user = (ctypes.c_ulonglong(), ctypes.c_ulonglong(),
+                                  ctypes.c_ulonglong())
+            if ctypes.windll.kernel32.GetSystemTimes(
+                    ctypes.byref(idle), ctypes.byref(kernel), ctypes.byref(user)):
+                return idle.value, kernel.value + user.value  # kernel includes idle
+            return None
+        try:
+            with open("/proc/stat", "r") as f:
+                fields = [int(v) for v in f.readline().split()[1:]]
+            return fields[3] + fields[4], sum(fields)
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def _disk_queue(self) -> Optional[float]:
+        """Outstanding disk requests right now, or None if unavailable."""
+        if os.name == "nt":
+            return self._queue
+        try:
+            # Whole disks only (sda, nvme0n1, mmcblk0...); partitions would
+            # count requests twice
+            disks = {name for name in os.listdir("/sys/block")
+                     if not name.startswith(VIRTUAL_DISKS)}
+            with open("/proc/diskstats", "r") as f:
+                rows = [line.split() for line in f]
+            return float(sum(int(r[11]) for r in rows if len(r) > 11 and r[2] in disks))
+        except (OSError, ValueError):
+            return None
+
+    def sample(self) -> Dict[str, Optional[float]]:
+        cpu = None
+        now = self._cpu_times()
+        if now and self._cpu:
+            idle, total = now[0] - self._cpu[0], now[1] - self._cpu[1]
+            if total > 0:
+                cpu = 100.0 * (1 - idle / total)
+        self._cpu = now
+        return {"cpu": cpu, "disk_queue": self._disk_queue()}
+
+
+# Adaptive concurrency
+
+
+class AdaptiveSlots:
+    """An asyncio semaphore whose limit can change while it is in use."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        self._changed: Optional[asyncio.Condition] = None
+
+    def _condition(self) -> asyncio.Condition:
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+    async def set_limit(self, limit: int) -> None:
+        async with self._condition():
+            self.limit = max(1, limit)
+            self._condition().notify_all()
+
+    async def __aenter__(self) -> "AdaptiveSlots":
+        async with self._condition():
+            await self._condition().wait_for(lambda: self.active < self.limit)
+            self.active += 1
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        async with self._condition():
+            self.active -= 1
+            self._condition().notify_all()
+
+
+class ConcurrencyController:
+    """
+    AIMD control of an AdaptiveSlots limit between 1 and `maximum`.
+
+    decide() is the pure policy, given one sample of throughput (bytes/s),
+    cpu (%) and disk_queue; run() applies it every `interval` seconds
+    using download bytes reported through record_bytes(). Without
+    `slots` only decide() is usable (the bench-link simulation).
+    """
+
+    def __init__(self, slots: Optional[AdaptiveSlots], maximum: int,
+                 link_rate: Optional[float] = MAX_BANDWIDTH,
+                 interval: float = ADAPT_INTERVAL,
+                 sampler: Optional[Callable[[], Dict[str, Optional[float]]]] = None):
+        self.slots = slots
+        self.maximum = max(1, maximum)
+        self.link_rate = link_rate
+        self.interval = interval
+        self.sampler = sampler
+        self.limit = slots.limit if slots else 1
+        # Throughput seen at the limit in force before the last increase
+        self.baseline: Optional[float] = None
+        self.hold = 0
+        self.history = []
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def record_bytes(self, size: int) -> None:
+        with self._lock:
+            self._bytes += size
+
+    def decide(self, throughput: float, cpu: Optional[float] = None,
+               disk_queue: Optional[float] = None) -> int:
+        """New limit for one interval's measurements."""
+        limit = self.limit
+        if (cpu is not None and cpu > CPU_HIGH) or (
+                disk_queue is not None and disk_queue > DISK_QUEUE_HIGH):
+            limit = max(1, limit // 2)
+            self.baseline = None
+        elif self.link_rate and throughput >= self.link_rate * LINK_FULL:
+            self.baseline = None  # link full: more installs would only queue
+        elif self.baseline is not None and throughput < self.baseline * (1 + MIN_GAIN):
+            limit = max(1, limit - 1)  # the last increase bought nothing
+            self.baseline = None
+            self.hold = PROBE_HOLD
+        elif self.hold:
+            self.hold -= 1
+        elif limit < self.maximum:
+            self.baseline = throughput
+            limit += 1
+        else:
+            self.baseline = None
+        self.history.append({"limit": self.limit, "throughput": throughput,
+                             "cpu": cpu, "disk_queue": disk_queue, "next": limit})
+        self.limit = limit
+        return limit
+
+    def tick(self, sampler: Callable[[], Dict[str, Optional[float]]]) -> int:
+        """decide() on the bytes recorded since the last tick and a fresh sample."""
+        with self._lock:
+            size, self._bytes = self._bytes, 0
+        sample = sampler()
+        return self.decide(size / self.interval, sample.get("cpu"),
+                           sample.get("disk_queue"))
+
+    async def run(self) -> None:
+        """Adjust the slots until cancelled."""
+        loop = asyncio.get_running_loop()
+        system = None if self.sampler else SystemSampler(self.interval)
+        sampler = self.sampler or system.sample
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                limit = await loop.run_in_executor(None, self.tick, sampler)
+                if limit != self.slots.limit:
+                    await self.slots.set_limit(limit)
+        finally:
+            if system:
+                system.close()
+
+    def run_thread(self, stop: threading.Event, apply: Callable[[int], None]) -> None:
+        """
+        Blocking variant of run() for threaded callers (the planner's
+        install lane): pass each new limit to `apply` until `stop` is set.
+        """
+        system = None if self.sampler else SystemSampler(self.interval)
+        sampler = self.sampler or system.sample
+        try:
+            while not stop.wait(self.interval):
+                apply(self.tick(sampler))
+        finally:
+            if system:
+                system.close()
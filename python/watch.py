@@ -0,0 +1,214 @@
+"""
+Watch mode: redeploy changed dotfiles as soon as they are saved.
+
+Monitors the repo's dotfiles/ tree (inotify on Linux, mtime polling
+everywhere else), debounces bursts of events from editors that write
+several times per save, and redeploys only the files that changed via
+shells.deploy_profile, the same step configure_* use. No rc-file edits,
+no full shell reconfiguration.
+"""
+
+import os
+import select
+import struct
+import sys
+import time
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from python.config import DOTFILES_DIR
+from python.shells import SHELL_DOTFILES, deploy_profile
+
+# Quiet period after the last event before we redeploy (seconds)
+DEFAULT_DEBOUNCE = 0.03
+# Polling interval for the non-inotify fallback (seconds)
+DEFAULT_POLL_INTERVAL = 0.05
+
+# inotify constants (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE
+               | IN_DELETE | IN_DELETE_SELF | IN_MODIFY)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _deployable() -> Dict[str, str]:
+    """Map normalized repo paths of deployed dotfiles → shell id."""
+    return {
+        os.path.normcase(os.path.join(DOTFILES_DIR, rel)): shell_id
+        for shell_id, paths in SHELL_DOTFILES.items()
+        for rel in paths
+    }
+
+
+class _InotifyWatcher:
+    """Minimal recursive inotify watcher built on ctypes (no extra deps)."""
+
+    def __init__(self, root: str):
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6",
+                                 use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, str] = {}
+        for dirpath, _dirnames, _files in os.walk(root):
+            self._add(dirpath)
+
+    def _add(self, path: str) -> None:
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(path), _WATCH_MASK
+        )
+        if wd >= 0:
+            self._dirs[wd] = path
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        """Block up to `timeout` seconds and return the changed paths."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            base = self._dirs.get(wd)
+            if base is None:
+                continue
+            if mask & IN_DELETE_SELF:
+                self._dirs.pop(wd, None)
+                continue
+
+            path = os.path.join(base, os.fsdecode(name)) if name else base
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add(path)
+                continue
+            changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class _PollingWatcher:
+    """Portable fallback: compare (mtime, size) of every file each round."""
+
+    def __init__(self, root: str, interval: float = DEFAULT_POLL_INTERVAL):
+        self._root = root
+        self._interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, tuple]:
+        snapshot = {}
+        for dirpath, _dirnames, files in os.walk(self._root):
+            for name in files:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self._interval if deadline is None
+                       else max(0.0, min(self._interval,
+                                         deadline - time.monotonic())))
+            current = self._scan()
+            changed = {
+                path for path in set(current) | set(self._snapshot)
+                if current.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = current
+            if changed or (deadline is not None
+                           and time.monotonic() >= deadline):
+                return changed
+
+    def close(self) -> None:
+        pass
+
+
+def make_watcher(root: str = DOTFILES_DIR, polling: bool = False):
+    """Return an inotify watcher on Linux, a polling watcher otherwise."""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return _InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            print(f"[WARN] inotify unavailable ({e}), falling back to polling")
+    return _PollingWatcher(root)
+
+
+def _deploy_without_backup(relative_path: str) -> str:
+    # Every save would otherwise leave a .bak next to the deployed copy
+    return deploy_profile(relative_path, backup=False)
+
+
+def redeploy(paths: Iterable[str],
+             deploy: Callable[[str], str] = _deploy_without_backup) -> int:
+    """Redeploy the dotfiles among `paths`; return how many were deployed."""
+    targets = _deployable()
+    count = 0
+    for path in sorted(set(paths)):
+        shell_id = targets.get(os.path.normcase(os.path.abspath(path)))
+        if shell_id is None:
+            continue
+        if not os.path.exists(path):
+            print(f"[WARN] {path} was removed, keeping last deployed copy")
+            continue
+        rel = os.path.relpath(path, DOTFILES_DIR)
+        try:
+            deploy(rel)
+            count += 1
+        except Exception as e:
+            print(f"[ERROR] Failed to redeploy {rel} for {shell_id}: {e}")
+    return count
+
+
+def watch(debounce: float = DEFAULT_DEBOUNCE, polling: bool = False) -> None:
+    """Watch dotfiles/ and redeploy changed files until interrupted."""
+    watcher = make_watcher(DOTFILES_DIR, polling=polling)
+    kind = "polling" if isinstance(watcher, _PollingWatcher) else "inotify"
+    print(f"[INFO] Watching {DOTFILES_DIR} ({kind}), Ctrl+C to stop")
+
+    try:
+        while True:
+            pending = watcher.wait(None)
+            if not pending:
+                continue
+            started = time.perf_counter()
+            # Debounce: keep collecting until the tree is quiet
+            while True:
+                more = watcher.wait(debounce)
+                if not more:
+                    break
+                pending |= more
+            deployed = redeploy(pending)
+            if deployed:
+                elapsed = (time.perf_counter() - started) * 1000
+                print(f"[OK] Redeployed {deployed} file(s) in {elapsed:.0f} ms")
+    except KeyboardInterrupt:
+        print("\n[INFO] Stopped watching")
+    finally:
+        watcher.close()
@@ -1,6 +1,11 @@
-import subprocess
 import shutil
 
+from python.batch import install_batch
+from python.cache import cache_report
+from python.config import BATCH_INSTALL
+from python.engine import MAX_ATTEMPTS, TRANSIENT_EXIT_CODES, InstallEngine, is_transient
+from python.session import overhead_report
+
 
 def is_winget_installed():
     return shutil.which("winget") is not None
@@ -17,32 +22,114 @@ def install_winget():
     return False
 
 
-def install_apps(apps):
+def print_event(event) -> None:
+    """Terminal output for one install engine event (python/engine.py)."""
+    kind = event["type"]
+    if kind == "started":
+        app = event["app"]
+        retry = f", attempt {event['attempt']}" if event.get("attempt", 1) > 1 else ""
+        print(f"-> [{app['section']}] {app['name']} ({event['index']}/"
+              f"{event['total']}{retry}, {event['percent']:.0f}%, {event['eta']})")
+    elif kind == "downloading":
+        print(f"   {event['text']}", end="\r", flush=True)
+    elif kind == "output":
+        print(f"   {event['text']}")
+    elif kind == "done":
+        print("   [OK]")
+    elif kind == "failed":
+        # exit_code is None when winget never ran (or the engine itself failed)
+        print("   [FAILED]" if event["exit_code"] is not None else f"   [FAILED] {event['error']}")
+    elif kind == "retrying":
+        print(f"   [RETRY] {event['reason']} (0x{event['exit_code'] & 0xFFFFFFFF:08X}); "
+              f"attempt {event['attempt'] + 1} in {event['delay']:.0f}s")
+    elif kind == "timeout":
+        print(f"   [TIMEOUT] {event['reason']}; process tree killed")
+    elif kind == "cancelled":
+        print(f"   [CANCELLED] {event['app']['name']}")
+
+
+def install_app(app, stats=None, on_progress=None, max_attempts=MAX_ATTEMPTS) -> bool:
+    """
+    Install one catalog app with winget; True on success.
+
+    winget's output is passed through to the terminal. When `stats` is a
+    dict, the download size winget reports is stored in stats["bytes"];
+    `on_progress(done_bytes, total_bytes)` follows the download, and a
+    hung install that was killed leaves its reason in stats["timed_out"],
+    and a transient failure on the last of `max_attempts` leaves its reason
+    in stats["retry"], so a caller can schedule the next attempt itself
+    (the planner, with max_attempts=1). The run is not recorded in the history; callers (the planner) do that.
+    """
+    def on_event(event):
+        if event["type"] == "started":
+            return  # the caller announces the step
+        print_event(event)
+        if event["type"] == "timeout" and stats is not None:
+            stats["timed_out"] = event["reason"]
+        if event["type"] == "failed" and stats is not None and is_transient(event["exit_code"]):
+            stats["retry"] = TRANSIENT_EXIT_CODES[event["exit_code"] & 0xFFFFFFFF]
+        if event["type"] == "downloading" and event.get("total_bytes"):
+            if stats is not None:
+                stats["bytes"] = event["total_bytes"]
+            if on_progress:
+                on_progress(event["done_bytes"], event["total_bytes"])
+
+    # The planner's install lane decides how many of these run at once
+    results = InstallEngine(concurrency=1, record=False, adaptive=False,
+                            max_attempts=max_attempts).run([app], on_event)
+    return results.get(app["id"], False)
+
+
+def install_apps(apps, on_update=None, batch=None, on_event=None):
+    """
+    Install catalog apps in order, recording each run in the history.
+
+    Runs on the shared install engine (python/engine.py). Progress is
+    weighted by expected install time (python/progress.py);
+    `on_update(percent, eta_text, app)` is called as it moves and
+    `on_event(event)` receives every engine event as well. With
+    `batch` (default: the --batch flag) everything goes through a single
+    `winget import` instead (python/batch.py).
+    """
+    # Skip section toggles
+    apps = [a for a in apps if not a.get("is_section_toggle")]
     total = len(apps)
     if total == 0:
         return
 
+    if BATCH_INSTALL if batch is None else batch:
+        install_batch(apps)
+        return
+
+    def handle(event):
+        print_event(event)
+        if event["type"] == "finished":
+            for app in apps:
+                reason = event["timed_out"].get(app["id"])
+                if reason:
+                    print(f"[WARN] Timed out: [{app['section']}] {app['name']} ({reason})")
+                retry = event["retries"].get(app["id"])
+                if retry:
+                    outcome = "OK" if event["results"].get(app["id"]) else "FAILED"
+                    print(f"[INFO] Retried: [{app['section']}] {app['name']} - "
+                          f"{retry['attempts']} attempt(s), {retry['seconds']:.0f}s "
+                          f"lost to retries, {outcome}")
+            if event["concurrency"]:
+                steps = [1] + event["concurrency"]
+                changes = [n for i, n in enumerate(steps) if i == 0 or n != steps[i - 1]]
+                print(f"[INFO] Adaptive concurrency: {' -> '.join(map(str, changes))} "
+                      f"(peak {max(steps)})")
+        if on_update and event["type"] not in ("queued", "output", "finished"):
+            on_update(event["percent"], event["eta"], event["app"])
+        if on_event:
+            on_event(event)
+
     print(f"[*] Installing {total} application(s)...")
-    for i, app in enumerate(apps, start=1):
-        percent = int((i / total) * 100)
-        print(f"-> [{app['section']}] {app['name']} ({percent}%)")
-
-        if app.get("is_section_toggle"):
-            continue  # skip section toggles
-
-        try:
-            subprocess.run(
-                [
-                    "winget",
-                    "install",
-                    "-e",
-                    "--id",
-                    app["id"],
-                    "--accept-source-agreements",
-                    "--accept-package-agreements",
-                ],
-                check=True,
-            )
-            print("   [OK]")
-        except subprocess.CalledProcessError:
-            print("   [FAILED]")
\ No newline at end of file
+    InstallEngine().run(apps, handle)
+
+    summary = overhead_report()
+    if summary:
+        print(f"[INFO] {summary}")
+    cached = cache_report()
+    if cached:
+        print(f"[INFO] {cached}")
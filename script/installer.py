@@ -13,18 +13,31 @@ import sys
 import threading
 import tkinter as tk
 import logging
-import re
 import time
 from datetime import datetime
 from pathlib import Path
 from tkinter import ttk, messagebox, scrolledtext
-from typing import Dict, List, Optional, Callable
+from typing import Dict, List, Callable
 
-try:
-    import requests
-except ImportError:
-    subprocess.run([sys.executable, "-m", "pip", "install", "requests"])
-    import requests
+# Share helpers with the main python/ package (repo root is one level up)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from python.cache import cache_report  # noqa: E402
+from python.config import RESUME  # noqa: E402
+from python.download import download  # noqa: E402
+from python.engine import InstallEngine  # noqa: E402
+from python.history import load_history, record_run, save_history  # noqa: E402
+from python.journal import RunJournal, completed_steps, describe_resume  # noqa: E402
+from python.progress import WeightedProgress  # noqa: E402
+from python.rcfile import update_managed_block  # noqa: E402
+from python.session import overhead_report  # noqa: E402
+from python.shells import POSH_RETIRED, bash_entries, nushell_entries, posh_entries  # noqa: E402
+
+# Our managed block in the user's rc files. It has its own name because
+# this script deploys to Documents/Sampong_dotfile while python/shells.py
+# (main.py) deploys to DOTFILE_ROOT: sharing one block, each tool would
+# rewrite the other's paths on every run.
+RC_BLOCK = "Sampong_dotfile installer"
 
 
 class ModernStyle:
@@ -131,57 +144,6 @@ class Logger:
         self.log(level="SUCCESS", message=message, show_in_gui=show_in_gui)
 
 
-class WingetProgressParser:
-    """Parser for winget output to extract download progress."""
-
-    @staticmethod
-    def parse_progress(output_line: str) -> Optional[Dict]:
-        """Parse winget output line for progress information."""
-        # Common winget progress patterns
-        patterns = [
-            # Download progress: "  ██████████████████████████████  100%"
-            r'^\s*[█▓▒░\-\s]*\s*(\d+(?:\.\d+)?)%',
-            # Download progress with speed: "Downloading... 45.2 MB / 100.0 MB (45%)"
-            r'(\d+(?:\.\d+)?)\s*MB\s*/\s*(\d+(?:\.\d+)?)\s*MB\s*\((\d+)%\)',
-            # Simple percentage: "Progress: 75%"
-            r'Progress:\s*(\d+)%',
-            # Downloading indicator
-            r'Downloading\s+.*?(\d+)%',
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, output_line, re.IGNORECASE)
-            if match:
-                if len(match.groups()) >= 3:  # MB/MB pattern
-                    current_mb = float(match.group(1))
-                    total_mb = float(match.group(2))
-                    percentage = int(match.group(3))
-                    return {
-                        'percentage': percentage,
-                        'current_mb': current_mb,
-                        'total_mb': total_mb,
-                        'status': 'downloading'
-                    }
-                else:  # Simple percentage pattern
-                    percentage = int(match.group(1))
-                    return {
-                        'percentage': percentage,
-                        'status': 'downloading'
-                    }
-
-        # Check for other status indicators
-        if 'installing' in output_line.lower():
-            return {'status': 'installing', 'percentage': None}
-        elif 'verifying' in output_line.lower():
-            return {'status': 'verifying', 'percentage': None}
-        elif 'extracting' in output_line.lower():
-            return {'status': 'extracting', 'percentage': None}
-        elif 'completed' in output_line.lower() or 'successfully installed' in output_line.lower():
-            return {'status': 'completed', 'percentage': 100}
-
-        return None
-
-
 class ModernCheckbox(tk.Frame):
     """Custom modern checkbox widget."""
 
@@ -376,6 +338,7 @@ class ProgressDialog(tk.Toplevel):
             font=ModernStyle.FONT_MAIN
         )
         self.current_status = None
+        self.overall_label = None
         self.progress = None
         self.current_progress = None
         self.title(title)
@@ -409,14 +372,14 @@ class ProgressDialog(tk.Toplevel):
         progress_frame.pack(pady=10, padx=20, fill="x")
 
         # Overall progress
-        overall_label = tk.Label(
+        self.overall_label = tk.Label(
             progress_frame, text="Overall Progress:",
             bg=ModernStyle.BG_PRIMARY,
             fg=ModernStyle.FG_SECONDARY,
             font=ModernStyle.FONT_SMALL,
             anchor="w"
         )
-        overall_label.pack(fill="x")
+        self.overall_label.pack(fill="x")
 
         self.progress = ttk.Progressbar(
             progress_frame, mode='determinate',
@@ -501,10 +464,13 @@ class ProgressDialog(tk.Toplevel):
         self.view_logs_btn.pack(side="left")
 
     def update_progress(self, overall_value, current_value=None, status="", current_status="", log_message="",
-                        log_level="INFO"):
+                        log_level="INFO", eta=""):
         """Update progress dialog with enhanced logging and current item progress."""
         self.progress['value'] = overall_value
 
+        if eta:
+            self.overall_label.config(text=f"Overall Progress: {overall_value:.0f}% · {eta}")
+
         if current_value is not None:
             self.current_progress['value'] = current_value
 
@@ -541,94 +507,75 @@ class ProgressDialog(tk.Toplevel):
             self.logger.success("Operation completed successfully")
 
 
-def install_single_app_with_progress(apps: Dict, progress_callback: Callable):
-    """Install a single app with real-time progress tracking."""
-    app_name = apps.get("name", "Unknown")
-    app_id = apps.get("id", "")
-
-    try:
-        cmd = [
-            "winget", "install", "-e", "--id", app_id,
-            "--accept-source-agreements", "--accept-package-agreements"
-        ]
-
-        progress_callback(0, f"Starting {app_name} installation...", f"Executing: {' '.join(cmd)}")
-
-        # Start the process
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
-        )
-
-        current_progress = 0
-        last_status = "initializing"
-
-        # Read output line by line
-        while True:
-            output = process.stdout.readline()
-            if output == '' and process.poll() is not None:
-                break
-
-            if output:
-                output = output.strip()
-                if output:  # Only process non-empty lines
-                    # Parse progress from winget output
-                    progress_info = WingetProgressParser.parse_progress(output)
-
-                    if progress_info:
-                        status = progress_info.get('status', 'processing')
-                        percentage = progress_info.get('percentage')
-
-                        if percentage is not None:
-                            current_progress = percentage
-
-                            # Format status message based on available info
-                            if 'current_mb' in progress_info and 'total_mb' in progress_info:
-                                status_msg = f"Downloading {progress_info['current_mb']:.1f} MB / {progress_info['total_mb']:.1f} MB ({percentage}%)"
-                            else:
-                                status_msg = f"{status.title()} ({percentage}%)"
-
-                            progress_callback(current_progress, status_msg, f"Progress: {output}")
-                        else:
-                            # Status without percentage
-                            if status != last_status:
-                                status_msg = f"{status.title()}..."
-                                progress_callback(current_progress, status_msg, f"Status: {output}")
-                                last_status = status
-                    else:
-                        # Log other output
-                        if any(keyword in output.lower() for keyword in
-                               ['downloading', 'installing', 'verifying', 'extracting']):
-                            progress_callback(current_progress, f"{app_name}: {output}", output)
-
-        # Wait for process to complete
-        return_code = process.wait()
-
-        # Read any remaining stderr
-        stderr_output = process.stderr.read()
+def engine_progress_handler(progress_dialog: "ProgressDialog", heading: Callable[[Dict], str]) -> Callable:
+    """
+    Map install engine events (python/engine.py) onto a ProgressDialog.
 
-        if return_code == 0:
-            progress_callback(100, f"✅ {app_name} installed successfully", f"Installation completed successfully")
-            return True
-        else:
-            error_msg = f"❌ {app_name} installation failed (Exit code: {return_code})"
-            if stderr_output:
-                error_msg += f"\nError: {stderr_output}"
-            progress_callback(0, error_msg, error_msg)
-            return False
+    heading(event) gives the status line for the app an event belongs to.
+    """
+    def on_event(event: Dict):
+        kind = event["type"]
+        if kind in ("queued", "finished"):
+            return
 
-    except subprocess.TimeoutExpired:
-        error_msg = f"⏰ {app_name} installation timed out"
-        progress_callback(0, error_msg, error_msg)
-        return False
-    except Exception as er:
-        error_msg = f"❌ {app_name} installation error: {str(er)}"
-        progress_callback(0, error_msg, error_msg)
-        return False
+        app_name = event["app"].get("name", "Unknown")
+        status = heading(event)
+        overall, eta = event["percent"], event["eta"]
+
+        if kind == "started":
+            progress_dialog.reset_current_progress()
+            progress_dialog.update_progress(overall, 0, status, "Preparing installation...",
+                                            f"Starting installation of {app_name}", eta=eta)
+        elif kind == "downloading":
+            percentage = int(event["fraction"] * 100)
+            if event.get("total_bytes"):
+                current_status = (f"Downloading {event['done_bytes'] / 1024 ** 2:.1f} MB / "
+                                  f"{event['total_bytes'] / 1024 ** 2:.1f} MB ({percentage}%)")
+            else:
+                current_status = f"Downloading ({percentage}%)"
+            # Redraws update the bars only; they would flood the log
+            progress_dialog.update_progress(overall, percentage, status, current_status, eta=eta)
+        elif kind == "installing":
+            progress_dialog.update_progress(overall, None, status, "Installing...",
+                                            f"Status: installing {app_name}", eta=eta)
+        elif kind == "output":
+            text = event["text"]
+            if any(keyword in text.lower() for keyword in
+                   ['downloading', 'installing', 'verifying', 'extracting', 'error', 'failed']):
+                progress_dialog.update_progress(overall, None, status, log_message=text, eta=eta)
+        elif kind == "done":
+            progress_dialog.update_progress(overall, 100, status, f"✅ {app_name} installed successfully",
+                                            f"{app_name} installed in {event['seconds']:.0f}s",
+                                            "SUCCESS", eta=eta)
+        elif kind == "failed":
+            error_msg = f"❌ {app_name} installation failed (Exit code: {event['exit_code']})"
+            if event.get("error"):
+                error_msg += f"\nError: {event['error']}"
+            progress_dialog.update_progress(overall, 0, status, error_msg.splitlines()[0],
+                                            error_msg, "ERROR", eta=eta)
+        elif kind == "retrying":
+            progress_dialog.update_progress(overall, 0, status, f"Retrying in {event['delay']:.0f}s...",
+                                            f"🔁 {app_name}: {event['reason']} (attempt {event['attempt']}), "
+                                            f"retrying in {event['delay']:.0f}s", "WARNING", eta=eta)
+        elif kind == "timeout":
+            error_msg = f"⏰ {app_name} timed out: {event['reason']}; installer stopped"
+            progress_dialog.update_progress(overall, 0, status, "Timed out",
+                                            error_msg, "ERROR", eta=eta)
+        elif kind == "cancelled":
+            progress_dialog.update_progress(overall, 0, status, "Cancelled",
+                                            f"{app_name} was cancelled", "WARNING", eta=eta)
+
+    return on_event
+
+
+def log_retries(logger: Logger, apps: List[Dict], engine: InstallEngine):
+    """Log attempts and time lost to retries per app after an engine run."""
+    for application in apps:
+        retry = engine.retries.get(application.get("id"))
+        if retry:
+            outcome = "installed" if engine.results.get(application.get("id")) else "still failed"
+            logger.info(f"🔁 {application.get('name', 'Unknown')}: {retry['attempts']} attempt(s), "
+                        f"{retry['seconds']:.0f}s lost to retries, {outcome}")
 
 
 def setup_styles():
@@ -691,10 +638,8 @@ def _configure_nushell_with_logging(dotfiles_dir: Path, logger: Logger):
     theme_path = next((p for p in theme_paths if p.exists()), None)
     if theme_path:
         logger.info(f"Found Oh-My-Posh theme: {theme_path}")
-        omp_line = f'oh-my-posh init nu --config "{theme_path}"\n'
-        env_content = env_nu.read_text() if env_nu.exists() else ""
-        if "oh-my-posh init nu" not in env_content:
-            env_nu.write_text(env_content + "\n" + omp_line)
+        omp_line = f'oh-my-posh init nu --config "{theme_path}"'
+        if update_managed_block(str(env_nu), [omp_line], name=RC_BLOCK, legacy=[omp_line]):
             logger.success("Added Oh-My-Posh configuration to env.nu")
         else:
             logger.info("Oh-My-Posh already configured in env.nu")
@@ -702,10 +647,9 @@ def _configure_nushell_with_logging(dotfiles_dir: Path, logger: Logger):
         logger.warning("Oh-My-Posh spaceship theme not found")
 
     # Source custom profile
-    include_line = f"use {main_profile}\n"
-    config_content = config_nu.read_text() if config_nu.exists() else ""
-    if str(main_profile) not in config_content:
-        config_nu.write_text(config_content + include_line)
+    entries = nushell_entries(str(main_profile))
+    legacy = entries + [f"use {main_profile}"]  # written by older versions
+    if update_managed_block(str(config_nu), entries, name=RC_BLOCK, legacy=legacy):
         logger.success("Added custom profile source to config.nu")
     else:
         logger.info("Custom profile already sourced in config.nu")
@@ -724,12 +668,9 @@ def _configure_bash_with_logging(dotfiles_dir: Path, logger: Logger):
 
     bashrc = Path.home() / ".bashrc"
     logger.info(f"Configuring .bashrc: {bashrc}")
-    bashrc.touch()
 
-    source_line = f'source "{main_sh}"\n'
-    bashrc_content = bashrc.read_text() if bashrc.exists() else ""
-    if str(main_sh) not in bashrc_content:
-        bashrc.write_text(bashrc_content + f"\n# Source Sampong bash customizations\n{source_line}")
+    lines = bash_entries(str(main_sh))
+    if update_managed_block(str(bashrc), lines, name=RC_BLOCK, legacy=lines):
         logger.success("Added custom script source to .bashrc")
     else:
         logger.info("Custom script already sourced in .bashrc")
@@ -748,27 +689,16 @@ def _configure_powershell_with_logging(logger: Logger):
         logger.info(f"PowerShell profile path: {profile_path}")
 
         profile_path.parent.mkdir(parents=True, exist_ok=True)
-        profile_path.touch()
 
-        entries = [
+        entries = posh_entries("~/Documents/Sampong_dotfile/PowerShell/posh_profile.ps1")
+        legacy = entries + POSH_RETIRED + [
+            # Same entry as written by older versions (single-quoted)
             "Import-Module (Resolve-Path '~/Documents/Sampong_dotfile/PowerShell/posh_profile.ps1')",
-            "Import-Module -Name Microsoft.WinGet.CommandNotFound",
-            'Invoke-Expression "$(vfox activate pwsh)"'
         ]
-
-        profile_content = profile_path.read_text() if profile_path.exists() else ""
-
-        added_entries = []
-        for entry in entries:
-            if entry not in profile_content:
-                profile_content += f"\n{entry}"
-                added_entries.append(entry)
-
-        if added_entries:
-            profile_path.write_text(profile_content)
-            logger.success(f"Added {len(added_entries)} entries to PowerShell profile")
-            for entry in added_entries:
-                logger.info(f"Added: {entry}")
+        if update_managed_block(str(profile_path), entries, name=RC_BLOCK, legacy=legacy):
+            logger.success(f"Updated {len(entries)} entries in PowerShell profile")
+            for entry in entries:
+                logger.info(f"Entry: {entry}")
         else:
             logger.info("PowerShell profile already configured")
 
@@ -1128,26 +1058,32 @@ class EnvSetupGUI:
                 progress_dialog.update_progress(20, 10, "Downloading...", "Connecting to server...",
                                                 f"Downloading from: {url}")
 
-                # Download with progress tracking
-                response = requests.get(url, stream=True)
-                response.raise_for_status()
-
-                total_size = int(response.headers.get('content-length', 0))
-                downloaded = 0
-
-                with open(temp_path, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                            downloaded += len(chunk)
+                # Ranged download over several connections; resumes from the
+                # .part file after an interruption (python/download.py)
+                def on_download(downloaded, total_size, bytes_per_second):
+                    speed = f"{bytes_per_second / 1024 / 1024:.1f} MB/s"
+                    if total_size:
+                        download_progress = int((downloaded / total_size) * 100)
+                        progress_dialog.update_progress(
+                            30, download_progress,
+                            "Downloading winget installer...",
+                            f"Downloaded {downloaded // 1024 // 1024} MB / {total_size // 1024 // 1024} MB "
+                            f"({download_progress}%, {speed})"
+                        )
+                    else:
+                        progress_dialog.update_progress(
+                            30, None, "Downloading winget installer...",
+                            f"Downloaded {downloaded // 1024 // 1024} MB ({speed})"
+                        )
 
-                            if total_size > 0:
-                                download_progress = int((downloaded / total_size) * 100)
-                                progress_dialog.update_progress(
-                                    30, download_progress,
-                                    "Downloading winget installer...",
-                                    f"Downloaded {downloaded // 1024 // 1024} MB / {total_size // 1024 // 1024} MB ({download_progress}%)"
-                                )
+                result = download(url, str(temp_path), on_progress=on_download)
+                progress_dialog.update_progress(
+                    55, 100, "Downloading winget installer...", "Download finished",
+                    f"Downloaded {result['bytes'] // 1024 // 1024} MB in {result['seconds']:.1f}s "
+                    f"({result['bytes_per_second'] / 1024 / 1024:.1f} MB/s over {result['connections']} "
+                    f"connection(s), {result['resumed_bytes'] // 1024 // 1024} MB resumed), "
+                    f"SHA-256 {result['sha256']}"
+                )
 
                 progress_dialog.update_progress(60, 100, "Installing winget...", "Download completed",
                                                 f"Saved to: {temp_path}")
@@ -1201,45 +1137,30 @@ class EnvSetupGUI:
             progress_dialog.update_progress(0, 0, "Starting installation...", "Preparing...",
                                             f"Installing {total} applications")
 
-            successful_installs = 0
-            failed_installs = 0
-
-            for i, application in enumerate(apps):
-                app_name = application.get("name", "Unknown")
-
-                # Update overall progress
-                overall_progress = int((i / total) * 100)
-                progress_dialog.update_progress(
-                    overall_progress, 0,
-                    f"Installing {app_name}... ({i + 1}/{total})",
-                    "Preparing installation...",
-                    f"Starting installation of {app_name}"
-                )
-
-                # Reset current progress for this app
-                progress_dialog.reset_current_progress()
-
-                # Define progress callback for this app
-                def app_progress_callback(current_progress, status, log_msg):
-                    progress_dialog.update_progress(
-                        overall_progress, current_progress,
-                        f"Installing {app_name}... ({i + 1}/{total})",
-                        status, log_msg
-                    )
-
-                # Install the app with progress tracking
-                success = install_single_app_with_progress(application, app_progress_callback)
-
-                if success:
-                    successful_installs += 1
-                else:
-                    failed_installs += 1
-
-                # Small delay to show completion status
-                time.sleep(0.5)
+            # One engine for every front end; it weighs overall progress by
+            # expected install time and records each run in the history
+            engine = InstallEngine()
+            results = engine.run(apps, engine_progress_handler(
+                progress_dialog,
+                lambda event: f"Installing {event['app'].get('name', 'Unknown')}... "
+                              f"({event['index']}/{event['total']})"
+            ))
+            successful_installs = sum(results.values())
+            failed_installs = len(results) - successful_installs
+
+            overhead = overhead_report()
+            if overhead:
+                progress_dialog.logger.info(overhead)
+            cached = cache_report()
+            if cached:
+                progress_dialog.logger.info(cached)
 
             # Final summary
             summary = f"Installation completed: {successful_installs} successful, {failed_installs} failed"
+            if engine.timed_out:
+                names = [a.get("name", a.get("id")) for a in apps if a.get("id") in engine.timed_out]
+                summary += f" ({len(names)} timed out: {', '.join(names)})"
+            log_retries(progress_dialog.logger, apps, engine)
             progress_dialog.update_progress(
                 100, 100,
                 "Installation completed!",
@@ -1345,13 +1266,49 @@ class EnvSetupGUI:
         selected_apps = self.get_selected_apps()
         selected_shells = self.get_selected_shells()
 
+        # Every step is journaled; with --resume, steps the last run finished are skipped
+        journal = RunJournal()
+        keys = ([f"app:{a.get('id', '')}" for a in selected_apps]
+                + [f"shell:{sh.get('id', '')}" for sh in selected_shells])
+        if RESUME:
+            done = completed_steps()
+            self.logger.info(describe_resume(done, keys))
+            selected_apps = [a for a in selected_apps if f"app:{a.get('id', '')}" not in done]
+            selected_shells = [sh for sh in selected_shells if f"shell:{sh.get('id', '')}" not in done]
+            journal.resume([key for key in keys if key not in done])
+        else:
+            journal.begin(keys)
+
         progress_dialog = ProgressDialog(self.root, "Complete Environment Setup")
 
+        def journal_event(handler: Callable) -> Callable:
+            """Journal engine events on their way to the dialog."""
+            def on_event(event: Dict):
+                if event["type"] == "started":
+                    journal.start(event["key"])
+                elif event["type"] in ("done", "failed"):
+                    journal.outcome(event["key"], event["type"])
+                elif event["type"] == "timeout":
+                    journal.outcome(event["key"], "timed_out")
+                elif event["type"] == "cancelled":
+                    journal.outcome(event["key"], "skipped")
+                handler(event)
+            return on_event
+
         def install_all_worker():
             try:
                 total_phases = 2
                 current_phase = 0
 
+                # One weighted bar across both phases (apps dominate the time)
+                history = load_history()
+                shell_keys = [f"shell:{sh.get('id', '')}" for sh in selected_shells]
+                weighted = WeightedProgress.for_steps(
+                    [f"app:{a.get('id', '')}" for a in selected_apps] + shell_keys,
+                    history,
+                    defaults={key: 5.0 for key in shell_keys}
+                )
+
                 # Phase 1: Install applications
                 if selected_apps:
                     current_phase += 1
@@ -1361,49 +1318,36 @@ class EnvSetupGUI:
                                                     "Starting application installation phase")
 
                     total_apps = len(selected_apps)
-                    successful_apps = 0
-
-                    for i, application in enumerate(selected_apps):
-                        app_name = application.get("name", "Unknown")
-
-                        # Calculate phase progress (0-50% for apps)
-                        phase_progress = int((i / total_apps) * 50)
-
-                        progress_dialog.update_progress(
-                            phase_progress, 0,
-                            f"Phase {current_phase}/{total_phases}: Installing {app_name}... ({i + 1}/{total_apps})",
-                            "Preparing installation...",
-                            f"Installing {app_name}"
-                        )
-
-                        # Define progress callback for this app
-                        def app_progress_callback(current_progress, status, log_msg):
-                            progress_dialog.update_progress(
-                                phase_progress, current_progress,
-                                f"Phase {current_phase}/{total_phases}: Installing {app_name}... ({i + 1}/{total_apps})",
-                                status, log_msg
-                            )
-
-                        # Install the app with progress tracking
-                        success = install_single_app_with_progress(application, app_progress_callback)
-
-                        if success:
-                            successful_apps += 1
-
-                        time.sleep(0.3)  # Brief pause between apps
+                    engine = InstallEngine(history=history, progress=weighted)
+                    results = engine.run(
+                        selected_apps,
+                        journal_event(engine_progress_handler(
+                            progress_dialog,
+                            lambda event: f"Phase {current_phase}/{total_phases}: Installing "
+                                          f"{event['app'].get('name', 'Unknown')}... "
+                                          f"({event['index']}/{event['total']})"
+                        ))
+                    )
+                    successful_apps = sum(results.values())
+                    apps_summary = f"Apps phase completed: {successful_apps}/{total_apps} successful"
+                    if engine.timed_out:
+                        names = [a.get("name", a.get("id")) for a in selected_apps
+                                 if a.get("id") in engine.timed_out]
+                        apps_summary += f", timed out: {', '.join(names)}"
+                    log_retries(progress_dialog.logger, selected_apps, engine)
 
                     progress_dialog.update_progress(
-                        50, 100,
+                        weighted.percent(), 100,
                         f"Phase {current_phase}/{total_phases} completed",
                         "Application phase finished",
-                        f"Apps phase completed: {successful_apps}/{total_apps} successful",
+                        apps_summary,
                         "SUCCESS" if successful_apps == total_apps else "WARNING"
                     )
 
                 # Phase 2: Configure shells
                 if selected_shells:
                     current_phase += 1
-                    progress_dialog.update_progress(50, 0,
+                    progress_dialog.update_progress(weighted.percent(), 0,
                                                     f"Phase {current_phase}/{total_phases}: Configuring shells...",
                                                     "Starting shell configuration phase...",
                                                     "Starting shell configuration phase")
@@ -1414,11 +1358,13 @@ class EnvSetupGUI:
                     for i, shell in enumerate(selected_shells):
                         shell_name = shell.get("name", "Unknown")
 
-                        # Calculate phase progress (50-100% for shells)
-                        phase_progress = 50 + int((i / total_shells) * 50)
+                        key = f"shell:{shell.get('id', '')}"
+                        shell_ok = False
+                        started = time.perf_counter()
+                        journal.start(key)
 
                         progress_dialog.update_progress(
-                            phase_progress, 0,
+                            weighted.percent(), 0,
                             f"Phase {current_phase}/{total_phases}: Configuring {shell_name}... ({i + 1}/{total_shells})",
                             "Starting configuration...",
                             f"Configuring {shell_name}"
@@ -1427,13 +1373,13 @@ class EnvSetupGUI:
                         try:
                             # Configuration steps with progress updates
                             progress_dialog.update_progress(
-                                phase_progress, 33,
+                                weighted.percent(), 33,
                                 current_status="Creating directories...",
                                 log_message=f"Creating dotfiles directory for {shell_name}"
                             )
 
                             progress_dialog.update_progress(
-                                phase_progress, 66,
+                                weighted.percent(), 66,
                                 current_status="Writing configuration files...",
                                 log_message=f"Writing configuration files for {shell_name}"
                             )
@@ -1441,23 +1387,29 @@ class EnvSetupGUI:
                             configure_shell_with_logging(shell, progress_dialog.logger)
 
                             progress_dialog.update_progress(
-                                phase_progress, 100,
+                                weighted.percent(), 100,
                                 current_status="Configuration completed",
                                 log_message=f"✅ {shell_name} configured successfully",
                                 log_level="SUCCESS"
                             )
 
                             successful_shells += 1
+                            shell_ok = True
 
                         except Exception as er:
                             error_msg = f"❌ {shell_name} configuration failed: {str(er)}"
                             progress_dialog.update_progress(
-                                phase_progress, 0,
+                                weighted.percent(), 0,
                                 current_status="Configuration failed",
                                 log_message=error_msg,
                                 log_level="ERROR"
                             )
 
+                        journal.outcome(key, "done" if shell_ok else "failed")
+                        record_run(history, key, time.perf_counter() - started, shell_ok)
+                        save_history(history)
+                        weighted.finish(key)
+
                         time.sleep(0.3)  # Brief pause between shells
 
                     progress_dialog.update_progress(
@@ -1468,6 +1420,8 @@ class EnvSetupGUI:
                         "SUCCESS" if successful_shells == total_shells else "WARNING"
                     )
 
+                journal.end()
+
                 # Final summary
                 final_message = "🎉 Complete environment setup finished!"
                 progress_dialog.update_progress(100, 100, final_message, "All phases completed", final_message,